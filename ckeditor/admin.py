@@ -0,0 +1,60 @@
+from __future__ import absolute_import
+
+from django.core.exceptions import FieldDoesNotExist
+
+from .companions import defer_rich_text
+
+_changelist_classes = {}
+
+
+def _lists_fields_only(model, list_display):
+    # Callables, ModelAdmin and model methods may read the HTML of any field.
+    for name in list_display:
+        if name == 'action_checkbox':
+            continue
+        if not isinstance(name, str):
+            return False
+        try:
+            model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return False
+    return True
+
+
+def get_changelist_class(changelist):
+    """
+    Return a subclass of the ChangeList class ``changelist`` deferring the
+    HTML of the rich text fields which are not in ``list_display``, when it
+    only lists fields of the model.
+    """
+    try:
+        return _changelist_classes[changelist]
+    except KeyError:
+        class RichTextChangeList(changelist):
+            def get_queryset(self, *args, **kwargs):
+                queryset = super(RichTextChangeList, self).get_queryset(*args, **kwargs)
+                if not getattr(self.model_admin, 'defer_rich_text', True):
+                    return queryset
+                if not _lists_fields_only(self.model, self.list_display):
+                    return queryset
+                return defer_rich_text(queryset, keep=self.list_display)
+
+        RichTextChangeList.__name__ = str('RichText%s' % changelist.__name__)
+        return _changelist_classes.setdefault(changelist, RichTextChangeList)
+
+
+class RichTextChangeListMixin(object):
+    """
+    ModelAdmin mixin loading the changelist without the HTML of the rich text
+    fields, i.e. to show their companion excerpt instead::
+
+        class ArticleAdmin(RichTextChangeListMixin, admin.ModelAdmin):
+            list_display = ['title', 'content_excerpt', 'content_word_count']
+
+    Nothing is deferred when ``list_display`` contains other names than the
+    fields of the model, or when ``defer_rich_text`` is False.
+    """
+    defer_rich_text = True
+
+    def get_changelist(self, request, **kwargs):
+        return get_changelist_class(super(RichTextChangeListMixin, self).get_changelist(request, **kwargs))
@@ -0,0 +1,267 @@
+"""
+Trimmed CKEditor bundles.
+
+The ``buildckeditorbundle`` management command concatenates ``ckeditor.js``
+with the plugins, languages, skin and styles used by CKEDITOR_CONFIGS, which
+CKEditor would otherwise load one request at a time, into a content-hashed
+script with precompressed siblings. The widget media reference the bundle
+instead of ``ckeditor.js`` when its manifest exists.
+
+The bundle is written to ``ckeditor/bundle/`` in CKEDITOR_BUNDLE_ROOT (default
+STATIC_ROOT). Use a directory of STATICFILES_DIRS to have ``collectstatic``
+copy it with the other static files.
+"""
+from __future__ import absolute_import
+
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+BUNDLE_DIR = 'ckeditor/bundle'
+MANIFEST_NAME = 'manifest.json'
+DEFAULT_LANGUAGE = 'en'
+DEFAULT_SKIN = 'moono-lisa'
+
+_registered_plugin_re = re.compile(r'CKEDITOR\.plugins\.add\(\s*["\']([\w-]+)["\']')
+_requires_re = re.compile(r'requires\s*:\s*(?:"([^"]*)"|\'([^\']*)\'|\[([^\]]*)\])')
+_lang_re = re.compile(r'\blang\s*:\s*"([^"]*)"')
+
+_manifests = {}
+_manifests_lock = threading.Lock()
+
+
+def get_bundle_root():
+    return getattr(settings, 'CKEDITOR_BUNDLE_ROOT', None) or settings.STATIC_ROOT
+
+
+def get_manifest_path():
+    root = get_bundle_root()
+    if not root:
+        return None
+    return os.path.join(root, BUNDLE_DIR, MANIFEST_NAME)
+
+
+def get_manifest():
+    """
+    Return the manifest of the bundle, or None when no bundle was built. The
+    manifest is read once per process.
+    """
+    path = get_manifest_path()
+    try:
+        return _manifests[path]
+    except KeyError:
+        manifest = None
+        if path and os.path.exists(path):
+            with io.open(path, encoding='utf-8') as f:
+                manifest = json.load(f)
+        with _manifests_lock:
+            return _manifests.setdefault(path, manifest)
+
+
+def get_bundle_path():
+    """
+    Return the static path of the bundle, or None when no bundle was built.
+    """
+    manifest = get_manifest()
+    return manifest['bundle'] if manifest else None
+
+
+@receiver(setting_changed)
+def clear_manifests(setting, **kwargs):
+    if setting in ('CKEDITOR_BUNDLE_ROOT', 'STATIC_ROOT'):
+        with _manifests_lock:
+            _manifests.clear()
+
+
+def get_source_dir():
+    """
+    Return the directory of the CKEditor distribution.
+    """
+    path = finders.find('ckeditor/ckeditor/ckeditor.js')
+    return os.path.dirname(path) if path else None
+
+
+def _read(path):
+    with io.open(path, encoding='utf-8-sig') as f:
+        return f.read().strip()
+
+
+def _split(value):
+    if isinstance(value, (list, tuple)):
+        return [name.strip() for name in value if name.strip()]
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+
+def _language_code(language):
+    language = language.lower()
+    return {'zh-hans': 'zh-cn', 'zh-hant': 'zh'}.get(language, language)
+
+
+class Bundle(object):
+    """
+    Files of the CKEditor distribution in ``source_dir`` used by ``configs``
+    in ``languages``, in the order they are concatenated.
+    """
+    def __init__(self, source_dir, configs, languages=()):
+        self.source_dir = source_dir
+        core = _read(self.get_path('ckeditor.js'))
+        self.core_plugins = set(_registered_plugin_re.findall(core))
+        self.languages = self.get_languages(configs, languages)
+        self.skin = self.get_skin(configs)
+        self.plugins = self.get_plugins(configs)
+        self.styles = any(config.get('stylesSet', 'default') == 'default' for config in configs)
+
+    def get_path(self, *parts):
+        return os.path.join(self.source_dir, *parts)
+
+    def get_languages(self, configs, languages):
+        requested = [DEFAULT_LANGUAGE] + list(languages)
+        for config in configs:
+            requested.extend(_split(config.get('language')))
+            requested.extend(_split(config.get('defaultLanguage')))
+        found = []
+        for language in requested:
+            # CKEditor falls back to the language without region, then to the default language.
+            language = _language_code(language)
+            for code in (language, language.split('-')[0]):
+                if os.path.exists(self.get_path('lang', '%s.js' % code)):
+                    if code not in found:
+                        found.append(code)
+                    break
+        return found
+
+    def get_skin(self, configs):
+        skins = set(config.get('skin', DEFAULT_SKIN) for config in configs)
+        # A page has a single skin, and skins outside of the distribution are loaded from their path.
+        if len(skins) != 1:
+            return None
+        skin = skins.pop()
+        if ',' in skin or not os.path.exists(self.get_path('skins', skin, 'skin.js')):
+            return None
+        return skin
+
+    def get_plugin_info(self, name):
+        """
+        Return the required plugins and the languages of the plugin ``name``.
+        """
+        source = _read(self.get_path('plugins', name, 'plugin.js'))
+        requires = _requires_re.search(source)
+        if requires:
+            requires = requires.group(1) or requires.group(2) or re.sub(r'["\'\s]', '', requires.group(3))
+        lang = _lang_re.search(source)
+        return _split(requires), _split(lang.group(1) if lang else '')
+
+    def get_plugins(self, configs):
+        """
+        Return the (name, languages) of the plugins of the distribution used
+        by the configurations and not built into ``ckeditor.js``, with their
+        requirements first.
+        """
+        plugins = []
+        seen = set()
+
+        def add(name):
+            if name in seen or name in self.core_plugins:
+                return
+            seen.add(name)
+            if not os.path.exists(self.get_path('plugins', name, 'plugin.js')):
+                # External plugins are loaded from their own path.
+                return
+            requires, langs = self.get_plugin_info(name)
+            for required in requires:
+                add(required)
+            plugins.append((name, langs))
+
+        for config in configs:
+            removed = set(_split(config.get('removePlugins')))
+            for name in _split(config.get('plugins')) + _split(config.get('extraPlugins')):
+                if name not in removed:
+                    add(name)
+        return plugins
+
+    def get_plugin_language(self, language, available):
+        # The language CKEditor picks for a plugin, see CKEDITOR.editor's plugin loading.
+        if language in available:
+            return language
+        if language.split('-')[0] in available:
+            return language.split('-')[0]
+        if DEFAULT_LANGUAGE in available:
+            return DEFAULT_LANGUAGE
+        return available[0] if available else None
+
+    def get_files(self):
+        """
+        Return the paths, relative to the distribution, of the bundled files.
+        """
+        files = ['ckeditor.js']
+        files.extend('lang/%s.js' % language for language in self.languages)
+        if self.skin:
+            files.append('skins/%s/skin.js' % self.skin)
+        for name, available in self.plugins:
+            files.append('plugins/%s/plugin.js' % name)
+            for language in self.languages:
+                plugin_language = self.get_plugin_language(language, available)
+                path = 'plugins/%s/lang/%s.js' % (name, plugin_language)
+                if plugin_language and path not in files and os.path.exists(self.get_path(*path.split('/'))):
+                    files.append(path)
+        if self.styles:
+            files.append('styles.js')
+        return files
+
+    def get_content(self):
+        return '\n'.join(_read(self.get_path(*path.split('/'))) for path in self.get_files()) + '\n'
+
+
+def compress_gzip(data):
+    out = io.BytesIO()
+    # A fixed mtime gives the same file for the same bundle.
+    with gzip.GzipFile(fileobj=out, mode='wb', compresslevel=9, mtime=0) as f:
+        f.write(data)
+    return out.getvalue()
+
+
+def write(bundle, root=None):
+    """
+    Write the bundle, its compressed siblings and the manifest. Return the
+    manifest.
+    """
+    directory = os.path.join(root or get_bundle_root(), BUNDLE_DIR)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    data = bundle.get_content().encode('utf-8')
+    name = 'ckeditor.%s.js' % hashlib.sha256(data).hexdigest()[:12]
+    outputs = [(name, data), (name + '.gz', compress_gzip(data))]
+    if brotli is not None:
+        outputs.append((name + '.br', brotli.compress(data)))
+    for filename, content in outputs:
+        with open(os.path.join(directory, filename), 'wb') as f:
+            f.write(content)
+
+    manifest = {
+        'bundle': '%s/%s' % (BUNDLE_DIR, name),
+        'files': bundle.get_files(),
+        'plugins': [name for name, languages in bundle.plugins],
+        'languages': bundle.languages,
+        'skin': bundle.skin,
+        'sizes': dict((filename, len(content)) for filename, content in outputs),
+    }
+    with io.open(os.path.join(directory, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        f.write(json.dumps(manifest, indent=2, sort_keys=True))
+    with _manifests_lock:
+        _manifests.clear()
+    return manifest
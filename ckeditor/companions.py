@@ -0,0 +1,183 @@
+"""
+Companion fields of rich text fields.
+
+A ``RichTextField(companions=True)`` named ``content`` adds three fields to its
+model, computed from the HTML when the model is saved:
+
+- ``content_text``, the plain text of the HTML,
+- ``content_excerpt``, the first ``excerpt_length`` characters of the text,
+  cut at a word boundary,
+- ``content_word_count``, the number of words of the text.
+
+``companions`` may also be a list of some of ``'text'``, ``'excerpt'`` and
+``'word_count'``. Listings can then show the excerpt and defer the HTML with
+``defer_rich_text()`` or ``RichTextChangeListMixin``.
+"""
+from __future__ import absolute_import
+
+import re
+
+from django.conf import settings
+from django.db import models
+
+try:
+    from html.parser import HTMLParser
+except ImportError:
+    from HTMLParser import HTMLParser
+
+KINDS = ('text', 'excerpt', 'word_count')
+ELLIPSIS = '…'
+
+# Elements ending a line of text.
+LINE_ELEMENTS = frozenset([
+    'address', 'blockquote', 'br', 'caption', 'dd', 'div', 'dt', 'figcaption', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'hr', 'li', 'p', 'pre', 'tr',
+])
+SKIPPED_ELEMENTS = frozenset(['script', 'style', 'template'])
+
+_spaces_re = re.compile(r'[^\S\n]+')
+_lines_re = re.compile(r' *\n[\n ]*')
+
+
+def get_excerpt_length():
+    return getattr(settings, 'CKEDITOR_EXCERPT_LENGTH', 200)
+
+
+def get_kinds(companions):
+    if companions is True:
+        return KINDS
+    unknown = set(companions) - set(KINDS)
+    if unknown:
+        raise ValueError('Unknown companions %s, use some of %s.' % (', '.join(sorted(unknown)), ', '.join(KINDS)))
+    return tuple(kind for kind in KINDS if kind in companions)
+
+
+def get_companion_name(name, kind):
+    return '%s_%s' % (name, kind)
+
+
+def make_field(kind, excerpt_length):
+    if kind == 'excerpt':
+        return models.CharField(max_length=excerpt_length + 1, blank=True, default='', editable=False)
+    if kind == 'word_count':
+        return models.PositiveIntegerField(default=0, editable=False)
+    return models.TextField(blank=True, default='', editable=False)
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        HTMLParser.__init__(self, convert_charrefs=True)
+        self.parts = []
+        self.skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_ELEMENTS:
+            self.skipping += 1
+        elif tag in LINE_ELEMENTS:
+            self.parts.append('\n')
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_ELEMENTS:
+            self.skipping = max(self.skipping - 1, 0)
+        elif tag in LINE_ELEMENTS:
+            self.parts.append('\n')
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.parts.append(data)
+
+
+def get_text(html):
+    """
+    Return the plain text of ``html``, a line per block.
+    """
+    if not html:
+        return ''
+    extractor = _TextExtractor()
+    extractor.feed(html)
+    extractor.close()
+    text = _spaces_re.sub(' ', ''.join(extractor.parts).replace('\xa0', ' '))
+    return _lines_re.sub('\n', text).strip()
+
+
+def get_excerpt(text, length):
+    """
+    Return the first ``length`` characters of ``text`` on one line, cut at a
+    word boundary and followed by an ellipsis when the text is longer.
+    """
+    text = ' '.join(text.split())
+    if len(text) <= length:
+        return text
+    excerpt = text[:length + 1].rsplit(' ', 1)[0] if ' ' in text[:length + 1] else text[:length]
+    return excerpt.rstrip(' ,.;:') + ELLIPSIS
+
+
+def count_words(text):
+    return len(text.split())
+
+
+def get_values(html, kinds, excerpt_length):
+    """
+    Return a dictionary of the value of each kind of companion of ``html``.
+    """
+    text = get_text(html)
+    values = {}
+    if 'text' in kinds:
+        values['text'] = text
+    if 'excerpt' in kinds:
+        values['excerpt'] = get_excerpt(text, excerpt_length)
+    if 'word_count' in kinds:
+        values['word_count'] = count_words(text)
+    return values
+
+
+def get_rich_text_fields(model):
+    """
+    Return the names of the rich text fields of ``model``.
+    """
+    from .fields import RichTextField
+
+    return [field.name for field in model._meta.concrete_fields if isinstance(field, RichTextField)]
+
+
+def defer_rich_text(queryset, keep=()):
+    """
+    Return ``queryset`` deferring the HTML of its rich text fields, except
+    the ones named in ``keep``.
+    """
+    names = [name for name in get_rich_text_fields(queryset.model) if name not in keep]
+    return queryset.defer(*names) if names else queryset
+
+
+def update_companions(model, field_name, excerpt_length=None, batch_size=500, using=None):
+    """
+    Compute the companion fields of ``field_name`` for all the rows of
+    ``model``, ``batch_size`` rows at a time. The companions are the fields of
+    ``model`` named after ``field_name``, so it works with the historical
+    models of data migrations. Return the number of rows updated.
+    """
+    field_names = set(field.name for field in model._meta.concrete_fields)
+    kinds = [kind for kind in KINDS if get_companion_name(field_name, kind) in field_names]
+    if not kinds:
+        return 0
+    if excerpt_length is None:
+        excerpt_length = get_excerpt_length()
+    companion_names = [get_companion_name(field_name, kind) for kind in kinds]
+
+    manager = model._default_manager.db_manager(using)
+    count = 0
+    last_pk = None
+    while True:
+        queryset = manager.order_by('pk')
+        if last_pk is not None:
+            queryset = queryset.filter(pk__gt=last_pk)
+        rows = list(queryset.values_list('pk', field_name)[:batch_size])
+        if not rows:
+            return count
+        objs = []
+        for pk, html in rows:
+            values = get_values(str(html or ''), kinds, excerpt_length)
+            objs.append(model(pk=pk, **dict((get_companion_name(field_name, kind), values[kind]) for kind in kinds)))
+        manager.bulk_update(objs, companion_names)
+        count += len(objs)
+        last_pk = rows[-1][0]
@@ -0,0 +1,201 @@
+"""
+Compressed storage of rich text.
+
+A ``RichTextField(compress=True)`` stores its HTML compressed, in the same text
+column: a marker naming the compression method followed by the base64 of the
+compressed bytes. The marker starts with a control character, which is not
+allowed in HTML. Values without a marker are read as they are, so existing
+rows keep working and are compressed when they are saved again, or in batches
+with ``compress_rows()`` from a data migration.
+
+With compression enabled, values read from the database are decompressed on
+first attribute access. Querysets returning values (``values()``,
+``values_list()``) give CompressedText objects, which are decompressed when
+cast with ``str()``. Without compression, compressed values are decompressed
+when they are read, so that compression can be turned off. Lookups other than
+``isnull`` do not work on compressed values.
+"""
+from __future__ import absolute_import
+
+import base64
+import zlib
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import ExpressionWrapper, F, TextField
+from django.db.models.query_utils import DeferredAttribute
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MARKER = '\x01ckz:'
+METHODS = ('zlib', 'zstd')
+
+if zstandard is None:
+    DECODE_ERRORS = (ValueError, zlib.error)
+else:
+    DECODE_ERRORS = (ValueError, zlib.error, zstandard.ZstdError)
+
+
+def get_method(compress):
+    """
+    Return the compression method of the ``compress`` option of a field.
+    """
+    method = getattr(settings, 'CKEDITOR_COMPRESSION', 'zlib') if compress is True else compress
+    if method not in METHODS:
+        raise ImproperlyConfigured('Unknown compression method "%s", use one of %s.' % (method, ', '.join(METHODS)))
+    if method == 'zstd' and zstandard is None:
+        raise ImproperlyConfigured('The zstd compression requires the zstandard package.')
+    return method
+
+
+def get_min_length():
+    return getattr(settings, 'CKEDITOR_COMPRESS_MIN_LENGTH', 256)
+
+
+def is_compressed(value):
+    return isinstance(value, str) and value.startswith(MARKER)
+
+
+def compress(text, method='zlib'):
+    """
+    Return the stored form of ``text`` compressed with ``method``.
+    """
+    data = text.encode('utf-8')
+    if method == 'zstd':
+        data = zstandard.ZstdCompressor().compress(data)
+    else:
+        data = zlib.compress(data, 6)
+    return '%s%s:%s' % (MARKER, method, base64.b64encode(data).decode('ascii'))
+
+
+def decompress(value):
+    """
+    Return the text of a value stored by compress().
+    """
+    method, _, data = value[len(MARKER):].partition(':')
+    data = base64.b64decode(data.encode('ascii'))
+    if method == 'zstd':
+        if zstandard is None:
+            raise ImproperlyConfigured('The zstd compression requires the zstandard package.')
+        data = zstandard.ZstdDecompressor().decompress(data)
+    else:
+        data = zlib.decompress(data)
+    return data.decode('utf-8')
+
+
+def read(value):
+    """
+    Return ``value`` decompressed when it is compressed. Values which cannot
+    be decoded are returned as they are.
+    """
+    if not is_compressed(value):
+        return value
+    try:
+        return decompress(value)
+    except DECODE_ERRORS:
+        return value
+
+
+class CompressedText(object):
+    """
+    A compressed value read from the database, decompressed when cast to str.
+    """
+    def __init__(self, data):
+        self.data = data
+        self._text = None
+
+    @property
+    def decompressed(self):
+        return self._text is not None
+
+    def __str__(self):
+        if self._text is None:
+            self._text = decompress(self.data)
+        return self._text
+
+    def __eq__(self, other):
+        if isinstance(other, CompressedText):
+            other = str(other)
+        return str(self) == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(str(self))
+
+    def __len__(self):
+        return len(str(self))
+
+    def __repr__(self):
+        return '<CompressedText: %d characters stored>' % len(self.data)
+
+
+class CompressedTextDescriptor(DeferredAttribute):
+    """
+    Replaces a CompressedText by its text on first attribute access, the
+    descriptor of the fields with compression enabled. Unlike
+    DeferredAttribute, it is a data descriptor so that it sees every access.
+    """
+    def __get__(self, instance, cls=None):
+        value = super(CompressedTextDescriptor, self).__get__(instance, cls)
+        if isinstance(value, CompressedText):
+            # Converted like an uncompressed value read from the database.
+            value = self.field.from_db_value(str(value), None, None)
+            instance.__dict__[self.field.attname] = value
+        return value
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.field.attname] = value
+
+
+def compress_rows(model, field_name, method='zlib', batch_size=500, using=None):
+    """
+    Compress the uncompressed values of ``field_name`` of all the rows of
+    ``model``, ``batch_size`` rows per transaction. Return the number of
+    rows compressed. Meant for RunPython data migrations::
+
+        def compress_content(apps, schema_editor):
+            compress_rows(apps.get_model('blog', 'Article'), 'content')
+    """
+    return _convert_rows(model, field_name, batch_size, using, lambda value: (
+        compress(value, method) if value and not is_compressed(value) else None
+    ))
+
+
+def decompress_rows(model, field_name, batch_size=500, using=None):
+    """
+    Decompress the compressed values of ``field_name``, the reverse of
+    compress_rows().
+    """
+    return _convert_rows(model, field_name, batch_size, using, lambda value: (
+        decompress(value) if is_compressed(value) else None
+    ))
+
+
+def _convert_rows(model, field_name, batch_size, using, convert):
+    manager = model._default_manager.db_manager(using)
+    # The stored values, without the conversions of the field.
+    stored = ExpressionWrapper(F(field_name), output_field=TextField())
+    count = 0
+    last_pk = None
+    while True:
+        queryset = manager.order_by('pk')
+        if last_pk is not None:
+            queryset = queryset.filter(pk__gt=last_pk)
+        rows = list(queryset.values_list('pk', stored)[:batch_size])
+        if not rows:
+            return count
+        changed = []
+        for pk, value in rows:
+            converted = convert(value)
+            if converted is not None:
+                changed.append(model(**{'pk': pk, field_name: converted}))
+        if changed:
+            # One UPDATE in a transaction for the batch.
+            manager.bulk_update(changed, [field_name])
+            count += len(changed)
+        last_pk = rows[-1][0]
@@ -0,0 +1,74 @@
+"""
+Configurations served as scripts.
+
+With CKEDITOR_CONFIG_SCRIPTS, the JSON of a shared widget configuration is
+not rendered into each textarea. It is served once by the
+``ckeditor_config_script`` view, at a URL containing the signed parameters
+of the configuration and a hash of its content, and the textareas only carry
+the name and version of their configuration. The URL of a configuration
+changes with its content, so browsers can cache it for good.
+"""
+from __future__ import absolute_import
+
+import hashlib
+import json
+
+from django.conf import settings
+from django.core import signing
+from django.utils.encoding import force_str
+
+try:
+    from django.urls import reverse
+except ImportError:  # Django < 2.0
+    from django.core.urlresolvers import reverse
+
+SALT = 'ckeditor.config-script'
+GLOBAL_NAME = 'djangoCKEditorConfigs'
+VERSION_LENGTH = 12
+
+
+def is_enabled():
+    return getattr(settings, 'CKEDITOR_CONFIG_SCRIPTS', False)
+
+
+def get_version(config_json, plugin_resources_json):
+    """
+    Return the version of a configuration, a hash of its content.
+    """
+    content = '%s\n%s' % (config_json, plugin_resources_json)
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()[:VERSION_LENGTH]
+
+
+def sign(params):
+    """
+    Return the token of ``params``. The same parameters always give the same
+    token, so the URL of a configuration is stable.
+    """
+    data = json.dumps(params, sort_keys=True, separators=(',', ':'), default=force_str)
+    payload = signing.b64_encode(data.encode('utf-8'))
+    return signing.Signer(salt=SALT).sign(payload.decode('ascii'))
+
+
+def unsign(token):
+    """
+    Return the parameters signed in ``token``, or None when it is invalid.
+    """
+    try:
+        payload = signing.Signer(salt=SALT).unsign(token)
+        return json.loads(signing.b64_decode(payload.encode('ascii')).decode('utf-8'))
+    except (signing.BadSignature, ValueError, TypeError):
+        return None
+
+
+def get_url(token, version):
+    return reverse('ckeditor_config_script', args=[token, version])
+
+
+def render_script(version, config_json, plugin_resources_json):
+    """
+    Return the script registering a configuration under its version, where
+    ``ckeditor-init.js`` looks it up.
+    """
+    return '(window.%s = window.%s || {})["%s"] = {"config": %s, "externalPluginResources": %s};\n' % (
+        GLOBAL_NAME, GLOBAL_NAME, version, config_json, plugin_resources_json,
+    )
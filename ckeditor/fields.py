@@ -1,37 +1,116 @@
 from __future__ import absolute_import
 
 from django import forms
+from django.conf import settings
 from django.db import models
 
+from . import companions, compression
+from .sanitizer import canonicalize
 from .widgets import CKEditorWidget
 
 
+class CanonicalHTML(str):
+    """
+    HTML already canonicalized by a form field, not canonicalized again on save.
+    """
+
+
+def get_canonicalize(value):
+    if value is None:
+        return getattr(settings, 'CKEDITOR_CANONICALIZE_HTML', False)
+    return value
+
+
 class RichTextField(models.TextField):
 
     def __init__(self, *args, **kwargs):
         self.config_name = kwargs.pop("config_name", "default")
         self.extra_plugins = kwargs.pop("extra_plugins", [])
         self.external_plugin_resources = kwargs.pop("external_plugin_resources", [])
+        self.canonicalize = kwargs.pop("canonicalize", None)
+        compress = kwargs.pop("compress", False)
+        self.compression = compression.get_method(compress) if compress else None
+        if self.compression:
+            self.descriptor_class = compression.CompressedTextDescriptor
+        self.companions = companions.get_kinds(kwargs.pop("companions", None) or ())
+        self.excerpt_length = kwargs.pop("excerpt_length", None) or companions.get_excerpt_length()
         super(RichTextField, self).__init__(*args, **kwargs)
 
+    def contribute_to_class(self, cls, name, *args, **kwargs):
+        super(RichTextField, self).contribute_to_class(cls, name, *args, **kwargs)
+        # Abstract models leave the companions to the concrete models copying the field.
+        if cls._meta.abstract:
+            return
+        for kind in self.companions:
+            companion_name = companions.get_companion_name(name, kind)
+            if not hasattr(cls, companion_name):
+                cls.add_to_class(companion_name, companions.make_field(kind, self.excerpt_length))
+
     def formfield(self, **kwargs):
         defaults = {
             'form_class': self._get_form_class(),
             'config_name': self.config_name,
             'extra_plugins': self.extra_plugins,
-            'external_plugin_resources': self.external_plugin_resources
+            'external_plugin_resources': self.external_plugin_resources,
+            'canonicalize': self.canonicalize,
         }
         defaults.update(kwargs)
         return super(RichTextField, self).formfield(**defaults)
 
+    def from_db_value(self, value, expression, connection, *args):
+        if compression.is_compressed(value):
+            if self.compression:
+                # Decompressed on first access, see CompressedTextDescriptor.
+                return compression.CompressedText(value)
+            # Compressed before compression was turned off.
+            value = compression.read(value)
+        if value and get_canonicalize(self.canonicalize):
+            # Saved canonicalized, or before canonicalization was enabled: not canonicalized again unless changed.
+            return CanonicalHTML(value)
+        return value
+
+    def get_prep_value(self, value):
+        if isinstance(value, compression.CompressedText):
+            return value.data
+        value = super(RichTextField, self).get_prep_value(value)
+        if (self.compression and value and not compression.is_compressed(value) and
+                len(value) >= compression.get_min_length()):
+            value = compression.compress(value, self.compression)
+        return value
+
+    def pre_save(self, model_instance, add):
+        raw = model_instance.__dict__.get(self.attname)
+        if isinstance(raw, compression.CompressedText) and not raw.decompressed:
+            # Saved back as it was read.
+            return raw
+        value = super(RichTextField, self).pre_save(model_instance, add)
+        if value and not isinstance(value, CanonicalHTML) and get_canonicalize(self.canonicalize):
+            value = CanonicalHTML(canonicalize(value, self.config_name))
+            setattr(model_instance, self.attname, value)
+        if self.companions:
+            values = companions.get_values(value, self.companions, self.excerpt_length)
+            for kind, companion_value in values.items():
+                setattr(model_instance, companions.get_companion_name(self.name, kind), companion_value)
+        return value
+
     @staticmethod
     def _get_form_class():
         return RichTextFormField
 
 
 class RichTextFormField(forms.fields.CharField):
+    widget_class = CKEditorWidget
 
-    def __init__(self, config_name='default', extra_plugins=None, external_plugin_resources=None, *args, **kwargs):
-        kwargs.update({'widget': CKEditorWidget(config_name=config_name, extra_plugins=extra_plugins,
-                                                external_plugin_resources=external_plugin_resources)})
+    def __init__(self, config_name='default', extra_plugins=None, external_plugin_resources=None,
+                 canonicalize=None, *args, **kwargs):
+        kwargs.update({'widget': self.widget_class(config_name=config_name, extra_plugins=extra_plugins,
+                                                   external_plugin_resources=external_plugin_resources)})
+        self.config_name = config_name
+        self.canonicalize = canonicalize
         super(RichTextFormField, self).__init__(*args, **kwargs)
+
+    def clean(self, value):
+        value = super(RichTextFormField, self).clean(value)
+        if value and get_canonicalize(self.canonicalize):
+            value = CanonicalHTML(canonicalize(value, self.config_name))
+        return value
@@ -0,0 +1,53 @@
+from __future__ import absolute_import
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ckeditor import bundles
+from ckeditor.widgets import get_resolved_config
+
+
+class Command(BaseCommand):
+    """
+    Builds the CKEditor bundle of the plugins, languages and skin used by
+    CKEDITOR_CONFIGS, referenced by the widget media instead of ckeditor.js.
+    """
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--language', action='append', dest='languages',
+            help='Language used by the editors, may be repeated. '
+                 'Defaults to CKEDITOR_BUNDLE_LANGUAGES or LANGUAGE_CODE.',
+        )
+        parser.add_argument('--source', help='Directory of the CKEditor distribution.')
+        parser.add_argument(
+            '--output', help='Root directory of the bundle, defaults to CKEDITOR_BUNDLE_ROOT or STATIC_ROOT.',
+        )
+
+    def handle(self, *args, **options):
+        source_dir = options['source'] or bundles.get_source_dir()
+        if not source_dir:
+            raise CommandError("The CKEditor distribution was not found")
+        root = options['output'] or bundles.get_bundle_root()
+        if not root:
+            raise CommandError("Set CKEDITOR_BUNDLE_ROOT or STATIC_ROOT, or pass --output")
+
+        languages = (
+            options['languages']
+            or getattr(settings, 'CKEDITOR_BUNDLE_LANGUAGES', None)
+            or [settings.LANGUAGE_CODE]
+        )
+        config_names = list(getattr(settings, 'CKEDITOR_CONFIGS', None) or ['default'])
+        configs = [get_resolved_config(name).config for name in config_names]
+
+        bundle = bundles.Bundle(source_dir, configs, languages)
+        manifest = bundles.write(bundle, root)
+        self.stdout.write("Bundled %d files (plugins: %s, languages: %s) into %s" % (
+            len(manifest['files']),
+            ', '.join(manifest['plugins']) or '-',
+            ', '.join(manifest['languages']),
+            manifest['bundle'],
+        ))
+        for filename, size in sorted(manifest['sizes'].items()):
+            self.stdout.write("  %s: %d bytes" % (filename, size))
+        if bundles.brotli is None:
+            self.stdout.write("Install brotli to write a .br file")
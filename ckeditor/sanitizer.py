@@ -0,0 +1,405 @@
+"""
+Write-time canonicalization of the HTML of rich text fields.
+
+``canonicalize(html, config_name)`` parses the HTML once and rebuilds it:
+
+- elements, attributes, styles and classes are filtered by an allow-list
+  compiled from the ``allowedContent`` and ``extraAllowedContent`` of the
+  configuration, which use the syntax of CKEditor's Advanced Content Filter
+  (i.e. ``'p h1 h2; a[!href,target]; img{width,height}[!src,alt]'``).
+  Without ``allowedContent`` (CKEditor then derives the allowed content from
+  its plugins), or with ``allowedContent: True``, every element is kept,
+- scripts, event handler and ``srcdoc`` attributes, comments and unsafe
+  URLs are removed in any case,
+- redundant markup is collapsed: spans without attributes are unwrapped,
+  empty inline elements without attributes are removed and adjacent
+  identical inline elements are merged,
+- whitespace is minified outside of ``pre`` and ``textarea`` elements.
+
+The result of canonicalize() is canonical: canonicalizing it again gives the
+same HTML.
+"""
+from __future__ import absolute_import
+
+import re
+import threading
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from .widgets import get_resolved_config
+
+try:
+    from html.parser import HTMLParser
+except ImportError:
+    from HTMLParser import HTMLParser
+
+VOID_ELEMENTS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param', 'source', 'track', 'wbr',
+])
+# Removed with their content whatever the allow-list.
+DROPPED_ELEMENTS = frozenset(['script', 'style', 'head', 'title', 'meta', 'link', 'xml', 'template', 'noscript'])
+BLOCK_ELEMENTS = frozenset([
+    'address', 'article', 'aside', 'blockquote', 'body', 'caption', 'dd', 'div', 'dl', 'dt', 'figcaption', 'figure',
+    'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'html', 'li', 'main', 'nav', 'ol', 'p',
+    'pre', 'section', 'table', 'tbody', 'td', 'tfoot', 'th', 'thead', 'tr', 'ul',
+])
+# Inline elements without meaning when they are empty, merged when adjacent.
+FORMATTING_ELEMENTS = frozenset([
+    'b', 'big', 'cite', 'code', 'del', 'em', 'font', 'i', 'ins', 'kbd', 'q', 's', 'samp', 'small', 'span', 'strike',
+    'strong', 'sub', 'sup', 'tt', 'u', 'var',
+])
+PREFORMATTED_ELEMENTS = frozenset(['pre', 'textarea'])
+# Namespaced links, i.e. xlink:href, are URLs too. srcset contains a list of them.
+URL_ATTRIBUTES = frozenset([
+    'action', 'background', 'cite', 'codebase', 'data', 'dynsrc', 'formaction', 'href', 'icon', 'longdesc',
+    'lowsrc', 'manifest', 'poster', 'src',
+])
+# Removed whatever the allow-list, srcdoc is a document of its own.
+DROPPED_ATTRIBUTES = frozenset(['srcdoc'])
+ALLOWED_PROTOCOLS = frozenset(['ftp', 'http', 'https', 'mailto', 'tel'])
+
+_whitespace_re = re.compile(r'[ \t\n\r\f]+')
+_scheme_re = re.compile(r'^([a-z][a-z0-9+.-]*):')
+_url_ignored_re = re.compile(r'[\x00-\x20]+')
+_rule_groups_re = re.compile(r'\[([^\]]*)\]|\{([^}]*)\}|\(([^)]*)\)')
+_event_handler_re = re.compile(r'^on[a-z]+$')
+_unsafe_style_re = re.compile(r'expression\s*\(|javascript:|behavior\s*:|-moz-binding', re.IGNORECASE)
+
+
+def _compile_names(names):
+    """
+    Return a function matching the names of a rule, which may use ``*``.
+    """
+    names = set(name for name in names if name)
+    if '*' in names:
+        return lambda name: True
+    patterns = [re.escape(name).replace('\\*', '.*') for name in names if '*' in name]
+    if patterns:
+        pattern = re.compile('^(?:%s)$' % '|'.join(patterns))
+        return lambda name: name in names or bool(pattern.match(name))
+    return names.__contains__
+
+
+class Rule(object):
+    """
+    Attributes, styles and classes allowed on an element.
+    """
+    def __init__(self):
+        self.attributes = []
+        self.styles = []
+        self.classes = []
+        # Rules are alternatives, the element is allowed when the required attributes of one are present.
+        self.required = []
+
+    def extend(self, attributes, styles, classes):
+        required = set()
+        for attribute in attributes:
+            if attribute.startswith('!'):
+                attribute = attribute[1:]
+                required.add(attribute)
+            self.attributes.append(attribute)
+        self.styles.extend(styles)
+        self.classes.extend(classes)
+        self.required.append(required)
+
+    def allows(self, attrs):
+        return any(required.issubset(attrs) for required in self.required)
+
+    def compile(self, common=None):
+        if common is not None:
+            self.attributes.extend(common.attributes)
+            self.styles.extend(common.styles)
+            self.classes.extend(common.classes)
+        self.allows_attribute = _compile_names(self.attributes)
+        self.allows_style = _compile_names(self.styles)
+        self.allows_class = _compile_names(self.classes)
+        return self
+
+
+class Policy(object):
+    """
+    Allow-list compiled from rules in the syntax of CKEditor's Advanced
+    Content Filter. A None policy allows every element and attribute.
+    """
+    def __init__(self, allowed_content):
+        rules = {}
+        common = Rule()
+        for text in allowed_content.split(';'):
+            groups = _rule_groups_re.findall(text)
+            elements = _rule_groups_re.sub(' ', text).split()
+            attributes, styles, classes = [], [], []
+            for attribute_group, style_group, class_group in groups:
+                attributes.extend(name.strip().lower() for name in attribute_group.split(','))
+                styles.extend(name.strip().lower() for name in style_group.split(','))
+                classes.extend(name.strip() for name in class_group.split(','))
+            for element in elements:
+                element = element.lower()
+                rule = common if element == '*' else rules.setdefault(element, Rule())
+                rule.extend(attributes, styles, classes)
+        self.rules = dict((element, rule.compile(common)) for element, rule in rules.items())
+
+    def get_rule(self, tag):
+        return self.rules.get(tag)
+
+
+_policies = {}
+_policies_lock = threading.Lock()
+
+
+def get_policy(config_name='default'):
+    """
+    Return the Policy of ``config_name``, compiled on first use, or None when
+    the configuration has no allowedContent or allows any content.
+    """
+    try:
+        return _policies[config_name]
+    except KeyError:
+        config = get_resolved_config(config_name).config
+        allowed_content = config.get('allowedContent')
+        if allowed_content is None or allowed_content is True:
+            # Only the unsafe markup is removed.
+            policy = None
+        else:
+            if not isinstance(allowed_content, str):
+                raise ImproperlyConfigured(
+                    'CKEDITOR_CONFIGS["%s"]["allowedContent"] must be a string or True '
+                    'to canonicalize HTML.' % config_name
+                )
+            extra = config.get('extraAllowedContent')
+            policy = Policy(';'.join([allowed_content, extra]) if extra else allowed_content)
+        with _policies_lock:
+            return _policies.setdefault(config_name, policy)
+
+
+@receiver(setting_changed)
+def clear_policies(setting, **kwargs):
+    if setting == 'CKEDITOR_CONFIGS':
+        with _policies_lock:
+            _policies.clear()
+
+
+class Element(object):
+    def __init__(self, tag, attrs, parent):
+        self.tag = tag
+        self.attrs = attrs
+        self.parent = parent
+        self.children = []
+
+
+def _is_safe_url(value):
+    match = _scheme_re.match(_url_ignored_re.sub('', value).lower())
+    return match is None or match.group(1) in ALLOWED_PROTOCOLS
+
+
+def _is_safe_srcset(value):
+    return all(_is_safe_url(candidate.split()[0]) for candidate in value.split(',') if candidate.strip())
+
+
+def _filter_style(value, rule):
+    declarations = []
+    seen = {}
+    for declaration in value.split(';'):
+        name, sep, style_value = declaration.partition(':')
+        name, style_value = name.strip().lower(), _whitespace_re.sub(' ', style_value.strip())
+        if not sep or not name or not style_value or _unsafe_style_re.search(style_value):
+            continue
+        if rule is not None and not rule.allows_style(name):
+            continue
+        # A property set twice keeps its last value.
+        if name in seen:
+            declarations[seen[name]] = None
+        seen[name] = len(declarations)
+        declarations.append('%s:%s' % (name, style_value))
+    return '; '.join(declaration for declaration in declarations if declaration)
+
+
+def _filter_attrs(tag, attrs, rule):
+    filtered = {}
+    for name, value in attrs:
+        if value is None:
+            value = ''
+        if _event_handler_re.match(name) or name in DROPPED_ATTRIBUTES or name in filtered:
+            continue
+        if name == 'srcset':
+            if not _is_safe_srcset(value):
+                continue
+        elif name in URL_ATTRIBUTES or name.endswith(':href'):
+            if not _is_safe_url(value) and not (tag == 'img' and name == 'src' and value.startswith('data:image/')):
+                continue
+        if name == 'style':
+            value = _filter_style(value, rule)
+        elif name == 'class':
+            value = ' '.join(sorted(set(
+                class_name for class_name in value.split() if rule is None or rule.allows_class(class_name)
+            )))
+        elif rule is not None and not rule.allows_attribute(name):
+            continue
+        if value or name not in ('style', 'class'):
+            filtered[name] = value
+    return filtered
+
+
+class _TreeBuilder(HTMLParser):
+    """
+    Builds the tree of allowed elements, unwrapping the other ones.
+    """
+    def __init__(self, policy):
+        HTMLParser.__init__(self, convert_charrefs=True)
+        self.policy = policy
+        self.root = Element(None, {}, None)
+        self.current = self.root
+        # Tags of the open elements, None for unwrapped ones.
+        self.stack = []
+        self.dropping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if self.dropping:
+            if tag not in VOID_ELEMENTS:
+                self.dropping += 1
+            return
+        if tag in DROPPED_ELEMENTS:
+            if tag not in VOID_ELEMENTS:
+                self.dropping = 1
+            return
+        element = self.make_element(tag, attrs)
+        if element is not None:
+            self.current.children.append(element)
+        if tag in VOID_ELEMENTS:
+            return
+        if element is not None:
+            self.current = element
+        self.stack.append((tag, element))
+
+    def handle_startendtag(self, tag, attrs):
+        if self.dropping or tag in DROPPED_ELEMENTS:
+            return
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_ELEMENTS:
+            self.handle_endtag(tag)
+
+    def make_element(self, tag, attrs):
+        if self.policy is None:
+            rule = None
+        else:
+            rule = self.policy.get_rule(tag)
+            if rule is None:
+                return None
+        filtered = _filter_attrs(tag, attrs, rule)
+        if rule is not None and not rule.allows(filtered):
+            return None
+        return Element(tag, filtered, self.current)
+
+    def handle_endtag(self, tag):
+        if self.dropping:
+            self.dropping -= 1
+            return
+        # Close up to the matching open element, ignore stray end tags.
+        for index in range(len(self.stack) - 1, -1, -1):
+            if self.stack[index][0] == tag:
+                del self.stack[index:]
+                self.current = self.root
+                for open_tag, element in reversed(self.stack):
+                    if element is not None:
+                        self.current = element
+                        break
+                return
+
+    def handle_data(self, data):
+        if not self.dropping and data:
+            self.current.children.append(data)
+
+
+def _is_block(node):
+    return isinstance(node, Element) and node.tag in BLOCK_ELEMENTS
+
+
+def _collapse(element, preformatted=False):
+    """
+    Collapse the redundant markup and whitespace of the children of ``element``.
+    Return False when the element is empty and can be removed.
+    """
+    children = []
+
+    def append(child):
+        previous = children[-1] if children else None
+        if not isinstance(child, Element):
+            if isinstance(previous, Element) or previous is None:
+                children.append(child)
+            else:
+                text = previous + child
+                children[-1] = text if preformatted else _whitespace_re.sub(' ', text)
+        elif (isinstance(previous, Element) and child.tag in FORMATTING_ELEMENTS and
+              child.tag == previous.tag and child.attrs == previous.attrs):
+            previous.children.extend(child.children)
+            _collapse(previous, preformatted)
+        else:
+            children.append(child)
+
+    for child in element.children:
+        if isinstance(child, Element):
+            if not _collapse(child, preformatted or child.tag in PREFORMATTED_ELEMENTS):
+                continue
+            if child.tag in ('span', 'font') and not child.attrs:
+                for grandchild in child.children:
+                    append(grandchild)
+                continue
+        elif not preformatted:
+            child = _whitespace_re.sub(' ', child)
+        append(child)
+
+    if not preformatted and (element.tag is None or element.tag in BLOCK_ELEMENTS):
+        # Whitespace next to blocks, after line breaks and at the edges of blocks is not rendered.
+        for index, child in enumerate(children):
+            if isinstance(child, Element):
+                continue
+            previous = children[index - 1] if index else None
+            following = children[index + 1] if index + 1 < len(children) else None
+            if previous is None or _is_block(previous) or (isinstance(previous, Element) and previous.tag == 'br'):
+                child = child.lstrip(' ')
+            if following is None or _is_block(following):
+                child = child.rstrip(' ')
+            children[index] = child
+        children = [child for child in children if isinstance(child, Element) or child]
+    element.children = children
+
+    if element.tag in FORMATTING_ELEMENTS and not element.attrs and not children:
+        return False
+    return True
+
+
+def _escape(text, quote=False):
+    text = text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('\xa0', '&nbsp;')
+    if quote:
+        text = text.replace('"', '&quot;')
+    return text
+
+
+def _serialize(element, out):
+    for child in element.children:
+        if not isinstance(child, Element):
+            out.append(_escape(child))
+            continue
+        attrs = ''.join(' %s="%s"' % (name, _escape(value, True)) for name, value in sorted(child.attrs.items()))
+        if child.tag in VOID_ELEMENTS:
+            out.append('<%s%s />' % (child.tag, attrs))
+        else:
+            out.append('<%s%s>' % (child.tag, attrs))
+            _serialize(child, out)
+            out.append('</%s>' % child.tag)
+
+
+def canonicalize(html, config_name='default'):
+    """
+    Return the canonical form of ``html`` for the allow-list of ``config_name``.
+    """
+    if not html:
+        return html
+    builder = _TreeBuilder(get_policy(config_name))
+    builder.feed(html)
+    builder.close()
+    _collapse(builder.root)
+    out = []
+    _serialize(builder.root, out)
+    return ''.join(out)
@@ -21,7 +21,18 @@
         };
   }
 
+  var lazy = el && el.getAttribute('data-lazy') == 'true';
+  // External plugins are registered once per page.
+  var registeredPlugins = {};
+  // Textareas waiting for ckeditor.js in lazy mode.
+  var pendingTextareas = [];
+  var observer = null;
+
   function runInitialisers() {
+    if (lazy) {
+      initialiseLazyCKEditor();
+      return;
+    }
     if (!window.CKEDITOR) {
       setTimeout(runInitialisers, 100);
       return;
@@ -32,24 +43,146 @@
   }
 
   if (document.readyState != 'loading' && document.body) {
-    document.addEventListener('DOMContentLoaded', initialiseCKEditor);
+    if (!lazy) {
+      document.addEventListener('DOMContentLoaded', initialiseCKEditor);
+    }
     runInitialisers();
   } else {
     document.addEventListener('DOMContentLoaded', runInitialisers);
   }
 
+  function registerExternalPlugins(ext) {
+    for (var j=0; j<ext.length; ++j) {
+      var key = ext[j].join('|');
+      if (!registeredPlugins[key]) {
+        registeredPlugins[key] = true;
+        CKEDITOR.plugins.addExternal(ext[j][0], ext[j][1], ext[j][2]);
+      }
+    }
+  }
+
+  function getEditorConfig(t) {
+    var version = t.getAttribute('data-config-version');
+    if (version) {
+      // Registered by the config script of the widget media.
+      return (window.djangoCKEditorConfigs || {})[version] || null;
+    }
+    return {
+      config: JSON.parse(t.getAttribute('data-config')),
+      externalPluginResources: JSON.parse(t.getAttribute('data-external-plugin-resources'))
+    };
+  }
+
+  function findTextareas(root) {
+    var textareas = Array.prototype.slice.call(root.querySelectorAll('textarea[data-type=ckeditortype]'));
+    if (root.matches && root.matches('textarea[data-type=ckeditortype]')) {
+      textareas.push(root);
+    }
+    return textareas;
+  }
+
+  function isPending(t) {
+    return t.getAttribute('data-processed') == '0' && t.id.indexOf('__prefix__') == -1;
+  }
+
+  function initialiseTextarea(t) {
+    var editorConfig = getEditorConfig(t);
+    if (!editorConfig) {
+      return;
+    }
+    t.setAttribute('data-processed', '1');
+    registerExternalPlugins(editorConfig.externalPluginResources);
+    CKEDITOR.replace(t.id, editorConfig.config);
+  }
+
   function initialiseCKEditor() {
-    var textareas = Array.prototype.slice.call(document.querySelectorAll('textarea[data-type=ckeditortype]'));
+    var textareas = findTextareas(document);
     for (var i=0; i<textareas.length; ++i) {
-      var t = textareas[i];
-      if (t.getAttribute('data-processed') == '0' && t.id.indexOf('__prefix__') == -1) {
-        t.setAttribute('data-processed', '1');
-        var ext = JSON.parse(t.getAttribute('data-external-plugin-resources'));
-        for (var j=0; j<ext.length; ++j) {
-          CKEDITOR.plugins.addExternal(ext[j][0], ext[j][1], ext[j][2]);
+      if (isPending(textareas[i])) {
+        initialiseTextarea(textareas[i]);
+      }
+    }
+  }
+
+  function loadCKEditor() {
+    if (document.getElementById('ckeditor-script')) {
+      return;
+    }
+    var script = document.createElement('script');
+    script.id = 'ckeditor-script';
+    script.async = true;
+    script.src = el.getAttribute('data-ckeditor-script');
+    script.onload = function() {
+      var textareas = pendingTextareas;
+      pendingTextareas = [];
+      for (var i=0; i<textareas.length; ++i) {
+        requestEditor(textareas[i]);
+      }
+    };
+    document.head.appendChild(script);
+  }
+
+  // Instantiates the editor of a textarea, loading ckeditor.js first if needed.
+  function requestEditor(t) {
+    if (!isPending(t)) {
+      return;
+    }
+    if (observer) {
+      observer.unobserve(t);
+    }
+    if (window.CKEDITOR) {
+      initialiseTextarea(t);
+    } else if (pendingTextareas.indexOf(t) == -1) {
+      pendingTextareas.push(t);
+      loadCKEditor();
+    }
+  }
+
+  function observeTextareas(root) {
+    var textareas = findTextareas(root);
+    for (var i=0; i<textareas.length; ++i) {
+      if (textareas[i].getAttribute('data-processed') != '0') {
+        continue;
+      }
+      if (observer) {
+        observer.observe(textareas[i]);
+      } else {
+        requestEditor(textareas[i]);
+      }
+    }
+  }
+
+  function initialiseLazyCKEditor() {
+    if (window.IntersectionObserver) {
+      observer = new IntersectionObserver(function(entries) {
+        for (var i=0; i<entries.length; ++i) {
+          if (entries[i].isIntersecting) {
+            requestEditor(entries[i].target);
+          }
         }
-        CKEDITOR.replace(t.id, JSON.parse(t.getAttribute('data-config')));
+      }, {rootMargin: '200px'});
+    }
+    observeTextareas(document);
+
+    document.addEventListener('focusin', function(e) {
+      if (e.target && e.target.matches && e.target.matches('textarea[data-type=ckeditortype]')) {
+        requestEditor(e.target);
       }
+    });
+
+    // Forms added later, i.e. admin inlines, are observed when they are inserted.
+    if (window.MutationObserver) {
+      new MutationObserver(function(mutations) {
+        for (var i=0; i<mutations.length; ++i) {
+          for (var j=0; j<mutations[i].addedNodes.length; ++j) {
+            if (mutations[i].addedNodes[j].nodeType == 1) {
+              observeTextareas(mutations[i].addedNodes[j]);
+            }
+          }
+        }
+      }).observe(document.body, {childList: true, subtree: true});
+    } else {
+      initialiseCKEditorInInlinedForms();
     }
   }
 
@@ -59,7 +192,11 @@
         e.target.matches('.add-row a') ||
         e.target.matches('.grp-add-handler')
       )) {
-        initialiseCKEditor();
+        if (lazy) {
+          observeTextareas(document);
+        } else {
+          initialiseCKEditor();
+        }
       }
     });
   }
@@ -0,0 +1,10 @@
+from __future__ import absolute_import
+
+from django.urls import re_path
+
+from . import views
+
+urlpatterns = [
+    re_path(r'^config/(?P<token>[\w:-]+)/(?P<version>[0-9a-f]+)\.js$', views.config_script,
+            name='ckeditor_config_script'),
+]
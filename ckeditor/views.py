@@ -0,0 +1,34 @@
+from __future__ import absolute_import
+
+from django.core.exceptions import ImproperlyConfigured
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+
+from . import config_scripts
+from .widgets import encode_plugin_resources, get_resolved_config
+
+
+def config_script(request, token, version):
+    """
+    Serve the configuration signed in ``token`` as a script. The response of
+    the current version is cached for good, an outdated version is served
+    with the current configuration but not cached.
+    """
+    params = config_scripts.unsign(token)
+    if params is None:
+        return HttpResponseForbidden('Invalid signature.')
+    try:
+        resolved = get_resolved_config(params['n'], params['e'])
+    except ImproperlyConfigured:
+        raise Http404('Unknown configuration.')
+
+    config_json = resolved.get_json(params['l'], tuple(tuple(default) for default in params['d']))
+    plugin_resources_json = encode_plugin_resources(params.get('r', resolved.external_plugin_resources))
+    response = HttpResponse(
+        config_scripts.render_script(version, config_json, plugin_resources_json),
+        content_type='application/javascript; charset=utf-8',
+    )
+    if config_scripts.get_version(config_json, plugin_resources_json) == version:
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    else:
+        response['Cache-Control'] = 'no-cache'
+    return response
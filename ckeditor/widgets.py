@@ -1,17 +1,24 @@
 from __future__ import absolute_import
 
+import copy
+import threading
+from types import MappingProxyType
+
 from django import forms
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
 from django.core.serializers.json import DjangoJSONEncoder
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 from django.utils.encoding import force_str
 from django.utils.functional import Promise
-from django.utils.html import conditional_escape
+from django.utils.html import conditional_escape, format_html
 from django.utils.safestring import mark_safe
 from django.utils.translation import get_language
 
 from js_asset import JS, static
 
+from . import bundles, config_scripts
 from .configs import DEFAULT_CONFIG
 
 try:
@@ -42,11 +49,196 @@ class LazyEncoder(DjangoJSONEncoder):
     def default(self, obj):
         if isinstance(obj, Promise):
             return force_str(obj)
+        if isinstance(obj, MappingProxyType):
+            return dict(obj)
         return super(LazyEncoder, self).default(obj)
 
 
 json_encode = LazyEncoder().encode
 
+
+def freeze(value):
+    """
+    Return a read-only copy of a configuration value: dictionaries become
+    mapping proxies and lists become tuples.
+    """
+    if isinstance(value, dict):
+        return MappingProxyType(dict((k, freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def thaw(value):
+    """
+    Return a mutable copy of a value returned by freeze().
+    """
+    if isinstance(value, (dict, MappingProxyType)):
+        return dict((k, thaw(v)) for k, v in value.items())
+    if isinstance(value, tuple):
+        return [thaw(v) for v in value]
+    return value
+
+
+def get_language_code():
+    """
+    Return the CKEditor code of the active language.
+    """
+    lang = get_language()
+    if lang == 'zh-hans':
+        lang = 'zh-cn'
+    elif lang == 'zh-hant':
+        lang = 'zh'
+    return lang
+
+
+class ResolvedConfig(object):
+    """
+    Configuration of a ``config_name`` merged with DEFAULT_CONFIG, shared by
+    every widget using it. ``config`` is read-only; the overlays adding the
+    language and the widget defaults are computed on first use and cached.
+    """
+    def __init__(self, config, external_plugin_resources, config_name='default', extra_plugins=None):
+        self.config = freeze(config)
+        self.external_plugin_resources = tuple(external_plugin_resources)
+        self.config_name = config_name
+        self.extra_plugins = tuple(extra_plugins or ())
+        self._overlays = {}
+        self._encoded = {}
+        self._scripts = {}
+
+    def get(self, language, defaults=()):
+        """
+        Return the read-only configuration for ``language``. ``defaults`` is
+        a tuple of (key, value) pairs used when the configuration lacks the key.
+        """
+        key = (language, defaults)
+        try:
+            return self._overlays[key]
+        except KeyError:
+            config = dict(defaults)
+            config.update(self.config)
+            config['language'] = language
+            overlay = self._overlays[key] = MappingProxyType(config)
+            return overlay
+
+    def get_json(self, language, defaults=()):
+        """
+        Return the configuration for ``language`` encoded to JSON, memoized.
+        """
+        key = (language, defaults)
+        try:
+            return self._encoded[key]
+        except KeyError:
+            encoded = self._encoded[key] = json_encode(self.get(language, defaults))
+            return encoded
+
+    def get_script(self, language, defaults=(), external_plugin_resources=None):
+        """
+        Return the token and version of the config script serving the
+        configuration for ``language``, memoized. See ``config_scripts``.
+        """
+        own_resources = encode_plugin_resources(self.external_plugin_resources)
+        if external_plugin_resources is None:
+            resources = own_resources
+        else:
+            resources = encode_plugin_resources(external_plugin_resources)
+        key = (language, defaults, resources)
+        try:
+            return self._scripts[key]
+        except KeyError:
+            params = {
+                'n': self.config_name,
+                'e': self.extra_plugins,
+                'l': language,
+                'd': defaults,
+            }
+            if resources != own_resources:
+                params['r'] = external_plugin_resources
+            script = self._scripts[key] = (
+                config_scripts.sign(params),
+                config_scripts.get_version(self.get_json(language, defaults), resources),
+            )
+            return script
+
+
+_resolved_configs = {}
+_resolved_configs_lock = threading.Lock()
+_encoded_plugin_resources = {}
+
+
+def _resolve_config(config_name, extra_plugins):
+    config = DEFAULT_CONFIG.copy()
+
+    # Try to get valid config from settings.
+    configs = getattr(settings, 'CKEDITOR_CONFIGS', None)
+    if configs:
+        if isinstance(configs, dict):
+            # Make sure the config_name exists.
+            if config_name in configs:
+                named_config = configs[config_name]
+                # Make sure the configuration is a dictionary.
+                if not isinstance(named_config, dict):
+                    raise ImproperlyConfigured('CKEDITOR_CONFIGS["%s"] \
+                            setting must be a dictionary type.' %
+                                               config_name)
+                # Override defaults with settings config.
+                config.update(named_config)
+            else:
+                raise ImproperlyConfigured("No configuration named '%s' \
+                        found in your CKEDITOR_CONFIGS setting." %
+                                           config_name)
+        else:
+            raise ImproperlyConfigured('CKEDITOR_CONFIGS setting must be a\
+                    dictionary type.')
+
+    plugins = (
+        extra_plugins
+        or config.pop("extra_plugins", None)
+        or []
+    )
+    config.pop("extra_plugins", None)
+
+    if plugins:
+        config['extraPlugins'] = ','.join(plugins)
+
+    external_plugin_resources = config.pop("external_plugin_resources", None) or []
+    return ResolvedConfig(config, external_plugin_resources, config_name, extra_plugins)
+
+
+def get_resolved_config(config_name='default', extra_plugins=None):
+    """
+    Return the shared ResolvedConfig of ``config_name``, resolved from
+    CKEDITOR_CONFIGS on first use.
+    """
+    key = (config_name, tuple(extra_plugins or ()))
+    try:
+        return _resolved_configs[key]
+    except KeyError:
+        resolved = _resolve_config(config_name, extra_plugins)
+        with _resolved_configs_lock:
+            return _resolved_configs.setdefault(key, resolved)
+
+
+def encode_plugin_resources(resources):
+    """
+    Return the JSON of a list of external plugin resources, memoized.
+    """
+    key = tuple((force_str(a), force_str(b), force_str(c)) for a, b, c in resources)
+    try:
+        return _encoded_plugin_resources[key]
+    except KeyError:
+        encoded = _encoded_plugin_resources[key] = json_encode([list(resource) for resource in key])
+        return encoded
+
+
+@receiver(setting_changed)
+def clear_resolved_configs(setting, **kwargs):
+    if setting == 'CKEDITOR_CONFIGS':
+        with _resolved_configs_lock:
+            _resolved_configs.clear()
+
+
 class CKEditorWidget(forms.Textarea):
     """
     Widget providing CKEditor for Rich Text Editing.
@@ -68,63 +260,141 @@ class CKEditorWidget(forms.Textarea):
 
     def __init__(self, config_name='default', extra_plugins=None, external_plugin_resources=None, *args, **kwargs):
         super(CKEditorWidget, self).__init__(*args, **kwargs)
-        # Setup config from defaults.
-        self.config = DEFAULT_CONFIG.copy()
-
-        # Try to get valid config from settings.
-        configs = getattr(settings, 'CKEDITOR_CONFIGS', None)
-        if configs:
-            if isinstance(configs, dict):
-                # Make sure the config_name exists.
-                if config_name in configs:
-                    config = configs[config_name]
-                    # Make sure the configuration is a dictionary.
-                    if not isinstance(config, dict):
-                        raise ImproperlyConfigured('CKEDITOR_CONFIGS["%s"] \
-                                setting must be a dictionary type.' %
-                                                   config_name)
-                    # Override defaults with settings config.
-                    self.config.update(config)
-                else:
-                    raise ImproperlyConfigured("No configuration named '%s' \
-                            found in your CKEDITOR_CONFIGS setting." %
-                                               config_name)
-            else:
-                raise ImproperlyConfigured('CKEDITOR_CONFIGS setting must be a\
-                        dictionary type.')
+        # The configuration is shared between widgets, ``config`` copies it when accessed.
+        self._resolved_config = get_resolved_config(config_name, extra_plugins)
+        self._config = None
 
-        extra_plugins = (
-            extra_plugins
-            or self.config.pop("extra_plugins", None)
+        self.external_plugin_resources = (
+            external_plugin_resources
+            or self._resolved_config.external_plugin_resources
             or []
         )
 
-        if extra_plugins:
-            self.config['extraPlugins'] = ','.join(extra_plugins)
+    @property
+    def config(self):
+        """
+        A mutable copy of the configuration of this widget. Changing it makes
+        the widget render its own configuration instead of the shared one.
+        """
+        if self._config is None:
+            self._config = thaw(self._resolved_config.config)
+        return self._config
 
-        self.external_plugin_resources = (
-            external_plugin_resources
-            or self.config.pop("external_plugin_resources", None)
-            or []
+    @config.setter
+    def config(self, value):
+        self._config = value
+
+    def __deepcopy__(self, memo):
+        obj = super(CKEditorWidget, self).__deepcopy__(memo)
+        if self._config is not None:
+            obj._config = copy.deepcopy(self._config, memo)
+        return obj
+
+    @property
+    def media(self):
+        js = list(CKEditorWidget.Media.js)
+        bundle_path = bundles.get_bundle_path()
+        if bundle_path:
+            js[1] = bundle_path
+        if getattr(settings, 'CKEDITOR_LAZY_INIT', False):
+            # ckeditor.js is loaded by ckeditor-init.js when the first editor is needed.
+            init_js, ckeditor_js = js
+            js = [JS(init_js.js, dict(init_js.attrs, **{
+                'data-lazy': 'true',
+                'data-ckeditor-script': static(ckeditor_js),
+            }))]
+        if self._uses_config_script():
+            js.append(config_scripts.get_url(*self.get_config_script()))
+        return forms.Media(js=js)
+
+    def get_config_defaults(self):
+        """
+        Return a tuple of (key, value) pairs added to the configuration when
+        it does not define the key.
+        """
+        return ()
+
+    def _uses_shared_config(self):
+        return self._config is None and type(self)._set_config is CKEditorWidget._set_config
+
+    def get_config(self):
+        """
+        Return the configuration rendered for the active language.
+        """
+        if self._uses_shared_config():
+            return self._resolved_config.get(get_language_code(), self.get_config_defaults())
+        for key, value in self.get_config_defaults():
+            self.config.setdefault(key, value)
+        self._set_config()
+        return self.config
+
+    def get_config_json(self):
+        """
+        Return the configuration rendered for the active language encoded to
+        JSON. The JSON of the shared configuration is memoized.
+        """
+        if self._uses_shared_config():
+            return self._resolved_config.get_json(get_language_code(), self.get_config_defaults())
+        return json_encode(self.get_config())
+
+    def _uses_config_script(self):
+        return config_scripts.is_enabled() and self._uses_shared_config()
+
+    def get_config_script(self):
+        """
+        Return the token and version of the config script serving the shared
+        configuration for the active language.
+        """
+        return self._resolved_config.get_script(
+            get_language_code(), self.get_config_defaults(), self.external_plugin_resources,
         )
 
-    def render(self, name, value, attrs=None, renderer=None):
-        if renderer is None:
-            renderer = get_default_renderer()
+    def _get_render_context(self, name, value, attrs):
         if value is None:
             value = ''
         final_attrs = self.build_attrs(self.attrs, attrs, name=name)
-        self._set_config()
-        external_plugin_resources = [[force_str(a), force_str(b), force_str(c)]
-                                     for a, b, c in self.external_plugin_resources]
-
-        return mark_safe(renderer.render('ckeditor/widget.html', {
+        context = {
             'final_attrs': flatatt(final_attrs),
             'value': conditional_escape(force_str(value)),
             'id': final_attrs['id'],
-            'config': json_encode(self.config),
-            'external_plugin_resources': json_encode(external_plugin_resources)
-        }))
+        }
+        if self._uses_config_script():
+            # The configuration is served once by the config script added to the media.
+            context['config_name'] = self._resolved_config.config_name
+            context['config_version'] = self.get_config_script()[1]
+        else:
+            context['config'] = self.get_config_json()
+            context['external_plugin_resources'] = encode_plugin_resources(self.external_plugin_resources)
+        return context
+
+    def render(self, name, value, attrs=None, renderer=None):
+        context = self._get_render_context(name, value, attrs)
+        if getattr(settings, 'CKEDITOR_RENDER_WITHOUT_TEMPLATE', False):
+            return self._render_markup(context)
+        if renderer is None:
+            renderer = get_default_renderer()
+        return mark_safe(renderer.render('ckeditor/widget.html', context))
+
+    def _render_markup(self, context):
+        """
+        Build the markup of ckeditor/widget.html without the template engine.
+        """
+        if 'config_version' in context:
+            config_attrs = format_html(
+                ' data-config-name="{0}" data-config-version="{1}"',
+                context['config_name'], context['config_version'],
+            )
+        else:
+            config_attrs = format_html(
+                ' data-config="{0}" data-external-plugin-resources="{1}"',
+                context['config'], context['external_plugin_resources'],
+            )
+        return format_html(
+            '<div class="django-ckeditor-widget" data-field-id="{0}" style="display: inline-block;">\n'
+            '    <textarea{1} data-processed="0"{2} data-id="{0}" data-type="ckeditortype">{3}</textarea>\n'
+            '</div>',
+            context['id'], context['final_attrs'], config_attrs, context['value'],
+        )
 
     def build_attrs(self, base_attrs, extra_attrs=None, **kwargs):
         """
@@ -137,9 +407,5 @@ class CKEditorWidget(forms.Textarea):
         return attrs
 
     def _set_config(self):
-        lang = get_language()
-        if lang == 'zh-hans':
-            lang = 'zh-cn'
-        elif lang == 'zh-hant':
-            lang = 'zh'
-        self.config['language'] = lang
+        # Only used for widgets whose configuration was changed, or by subclasses overriding it.
+        self.config['language'] = get_language_code()
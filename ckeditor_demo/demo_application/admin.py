@@ -2,7 +2,14 @@ from __future__ import absolute_import
 
 from django.contrib import admin
 
+from ckeditor.admin import RichTextChangeListMixin
+
 from . import models
 
 admin.site.register(models.ExampleModel)
 admin.site.register(models.ExampleNonUploadModel)
+
+
+@admin.register(models.ExampleCompanionModel)
+class ExampleCompanionModelAdmin(RichTextChangeListMixin, admin.ModelAdmin):
+    list_display = ['content_excerpt', 'content_word_count']
@@ -0,0 +1,39 @@
+from __future__ import absolute_import
+
+import copy
+import timeit
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from ckeditor_uploader.widgets import CKEditorUploadingWidget
+
+
+class Command(BaseCommand):
+    """
+    Measures the cost of copying and rendering one upload widget, as Django
+    does for each form of an admin inline.
+    """
+    def add_arguments(self, parser):
+        parser.add_argument('--number', type=int, default=2000, help='Number of widgets rendered per run.')
+        parser.add_argument('--repeat', type=int, default=5, help='Number of runs, the fastest is reported.')
+
+    def handle(self, *args, **options):
+        legacy = CKEditorUploadingWidget(config_name='my-custom-toolbar')
+        # A changed configuration is copied and encoded on each render, like before memoization.
+        legacy.config
+        shared = CKEditorUploadingWidget(config_name='my-custom-toolbar')
+
+        cases = [
+            ('per-widget config (before)', legacy, False),
+            ('shared memoized config', shared, False),
+            ('shared config without template', shared, True),
+        ]
+        for label, widget, without_template in cases:
+            with override_settings(CKEDITOR_RENDER_WITHOUT_TEMPLATE=without_template):
+                def render(widget=widget):
+                    copy.deepcopy(widget).render('content', '<p>Hello</p>', {'id': 'id_content'})
+
+                render()
+                best = min(timeit.repeat(render, number=options['number'], repeat=options['repeat']))
+            self.stdout.write('%-32s %8.1f us/widget' % (label, best / options['number'] * 1e6))
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.25 on 2026-10-18 12:33
+
+import ckeditor.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('demo_application', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExampleCompressedModel',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content', ckeditor.fields.RichTextField()),
+            ],
+        ),
+    ]
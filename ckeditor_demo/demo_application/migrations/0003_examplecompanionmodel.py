@@ -0,0 +1,24 @@
+# Generated by Django 3.2.25 on 2026-10-18 12:36
+
+import ckeditor.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('demo_application', '0002_examplecompressedmodel'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExampleCompanionModel',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content', ckeditor.fields.RichTextField()),
+                ('content_text', models.TextField(blank=True, default='', editable=False)),
+                ('content_excerpt', models.CharField(blank=True, default='', editable=False, max_length=51)),
+                ('content_word_count', models.PositiveIntegerField(default=0, editable=False)),
+            ],
+        ),
+    ]
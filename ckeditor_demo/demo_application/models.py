@@ -12,3 +12,11 @@ class ExampleModel(models.Model):
 
 class ExampleNonUploadModel(models.Model):
     content = RichTextField()
+
+
+class ExampleCompressedModel(models.Model):
+    content = RichTextField(compress=True)
+
+
+class ExampleCompanionModel(models.Model):
+    content = RichTextField(companions=True, excerpt_length=50)
@@ -0,0 +1,78 @@
+from __future__ import absolute_import, unicode_literals
+
+import json
+import os.path
+
+from django.core.files.base import ContentFile
+from django.test.utils import override_settings
+
+from ckeditor_uploader import index
+from ckeditor_uploader.utils import storage
+
+from .utils import UploadTestCase
+
+try:
+    from django.urls import reverse
+except ImportError:
+    from django.core.urlresolvers import reverse
+
+FILENAMES = ['a.png', 'b.jpg', 'c.pdf', 'd.mp4', 'e.png']
+
+
+@override_settings(CKEDITOR_IMAGE_BACKEND=None)
+class BrowseJsonTestCase(UploadTestCase):
+
+    def setUp(self):
+        super(BrowseJsonTestCase, self).setUp()
+        self.paths = []
+        for filename in FILENAMES:
+            path = storage.save(os.path.join('uploads', '1', '2020', filename), ContentFile(b'content'))
+            index.add_file(path, '1')
+            self.paths.append(path)
+
+    def _get_all_pages(self, **params):
+        params['limit'] = 2
+        pages = []
+        while True:
+            response = self.client.get(reverse('ckeditor_browse_json'), params)
+            self.assertEqual(200, response.status_code)
+            data = json.loads(response.content)
+            pages.append([f['name'] for f in data['files']])
+            if not data['next']:
+                return pages
+            params['cursor'] = data['next']
+
+    def test_pages_from_storage(self):
+        self.assertEqual([['e.png', 'd.mp4'], ['c.pdf', 'b.jpg'], ['a.png']], self._get_all_pages())
+
+    @override_settings(CKEDITOR_UPLOAD_INDEX=True)
+    def test_pages_from_index(self):
+        self.assertEqual([['e.png', 'd.mp4'], ['c.pdf', 'b.jpg'], ['a.png']], self._get_all_pages())
+
+    def test_type_filter(self):
+        self.assertEqual([['e.png', 'b.jpg'], ['a.png']], self._get_all_pages(type='image'))
+        self.assertEqual([['d.mp4']], self._get_all_pages(type='video'))
+
+    @override_settings(CKEDITOR_UPLOAD_INDEX=True)
+    def test_search_filter(self):
+        self.assertEqual([['c.pdf']], self._get_all_pages(q='C.P'))
+
+    def test_entry_fields(self):
+        response = self.client.get(reverse('ckeditor_browse_json'), {'limit': 1})
+        entry = json.loads(response.content)['files'][0]
+        self.assertEqual(storage.url(self.paths[-1]), entry['src'])
+        self.assertEqual(entry['src'], entry['thumb'])
+        self.assertTrue(entry['is_image'])
+        self.assertFalse(entry['is_video'])
+        self.assertEqual('.png', entry['extension'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('ckeditor_browse_json'), {'cursor': '_w'})
+        self.assertEqual(400, response.status_code)
+
+    @override_settings(CKEDITOR_BROWSE_PAGE_SIZE=2)
+    def test_browse_renders_first_page(self):
+        response = self.client.get(reverse('ckeditor_browse'))
+        self.assertEqual(['e.png', 'd.mp4'], [os.path.basename(f['path']) for f in response.context['files']])
+        self.assertTrue(response.context['next_cursor'])
+        self.assertContains(response, 'ckeditorBrowseLoadMore')
@@ -0,0 +1,66 @@
+from __future__ import absolute_import, unicode_literals
+
+import json
+
+from django.core.cache import cache
+from django.test.utils import override_settings
+
+from ckeditor_uploader import browse_cache
+from ckeditor_uploader.utils import storage
+
+from .utils import UploadTestCase
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+try:
+    from django.urls import reverse
+except ImportError:
+    from django.core.urlresolvers import reverse
+
+GIF = 'ckeditor/galleriffic/css/loader.gif'
+
+
+@override_settings(CKEDITOR_BROWSE_CACHE_TIMEOUT=60, CKEDITOR_IMAGE_BACKEND=None)
+class BrowseCacheTestCase(UploadTestCase):
+
+    def setUp(self):
+        cache.clear()
+        super(BrowseCacheTestCase, self).setUp()
+
+    def _browse(self):
+        return [f['src'] for f in self.client.get(reverse('ckeditor_browse')).context['files']]
+
+    def test_cache_hit_avoids_storage(self):
+        url = self.upload(GIF)['url']
+        self.assertEqual([url], self._browse())
+
+        with mock.patch('ckeditor_uploader.views.walk_storage', side_effect=AssertionError('storage listed')), \
+                mock.patch.object(storage, 'url', side_effect=AssertionError('storage url')):
+            self.assertEqual([url], self._browse())
+            response = self.client.get(reverse('ckeditor_browse_json'))
+        self.assertEqual([url], [f['src'] for f in json.loads(response.content)['files']])
+
+    def test_upload_invalidates(self):
+        first_url = self.upload(GIF)['url']
+        self.assertEqual([first_url], self._browse())
+
+        second_url = self.upload(GIF)['url']
+        self.assertEqual(sorted([first_url, second_url]), sorted(self._browse()))
+
+    def test_delete_invalidates(self):
+        self.upload(GIF)
+        path = self.client.get(reverse('ckeditor_browse')).context['files'][0]['path']
+
+        self.client.delete('%s?path=%s' % (reverse('ckeditor_delete'), path))
+        self.assertEqual([], self._browse())
+
+    def test_invalidated_while_listing(self):
+        files, version = browse_cache.get_files('1')
+        self.assertIsNone(files)
+        # An upload finishes while the stale list is built.
+        browse_cache.invalidate('1')
+        browse_cache.set_files('1', ['stale'], version)
+        self.assertIsNone(browse_cache.get_files('1')[0])
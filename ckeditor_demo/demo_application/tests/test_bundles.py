@@ -0,0 +1,66 @@
+from __future__ import absolute_import, unicode_literals
+
+import gzip
+import io
+import os
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from django.test.utils import override_settings
+
+from ckeditor import bundles
+from ckeditor.widgets import CKEditorWidget
+
+CONFIGS = {
+    'default': {'extraPlugins': 'embed,codesnippet', 'language': 'de-ch'},
+    'small': {'removePlugins': 'codesnippet', 'extraPlugins': 'codesnippet'},
+}
+
+
+@override_settings(CKEDITOR_CONFIGS=CONFIGS)
+class BundleTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_files(self):
+        configs = [CONFIGS['default'], {'language': 'fr-ca', 'stylesSet': 'custom'}]
+        bundle = bundles.Bundle(bundles.get_source_dir(), configs, ['zh-hans', 'xx'])
+        self.assertEqual(['en', 'zh-cn', 'de-ch', 'fr-ca'], bundle.languages)
+        # embed requires embedbase, the other requirements are built into ckeditor.js.
+        self.assertEqual(['embedbase', 'embed', 'codesnippet'], [name for name, languages in bundle.plugins])
+        files = bundle.get_files()
+        self.assertEqual('ckeditor.js', files[0])
+        self.assertIn('plugins/codesnippet/lang/fr-ca.js', files)
+        # The plugin has no Swiss German translation, CKEditor uses German instead.
+        self.assertIn('plugins/codesnippet/lang/de.js', files)
+        self.assertNotIn('plugins/codesnippet/lang/de-ch.js', files)
+        self.assertNotIn('styles.js', bundles.Bundle(bundles.get_source_dir(), configs[1:]).get_files())
+        self.assertIn('styles.js', files)
+
+    def test_command(self):
+        with override_settings(CKEDITOR_BUNDLE_ROOT=self.root):
+            self.assertIsNone(bundles.get_bundle_path())
+            call_command('buildckeditorbundle', language=['fr'], stdout=io.StringIO())
+            manifest = bundles.get_manifest()
+            path = bundles.get_bundle_path()
+            self.assertEqual(manifest['bundle'], path)
+            self.assertIn('lang/fr.js', manifest['files'])
+            self.assertIn('lang/de-ch.js', manifest['files'])
+
+            with open(os.path.join(self.root, path), 'rb') as f:
+                content = f.read()
+            with gzip.open(os.path.join(self.root, path + '.gz')) as f:
+                self.assertEqual(content, f.read())
+            self.assertIn(b'CKEDITOR.plugins.setLang("codesnippet","fr"', content)
+
+            js = CKEditorWidget().media._js
+            self.assertEqual(path, js[1])
+            self.assertNotIn('ckeditor/ckeditor/ckeditor.js', js)
+
+        self.assertIn('ckeditor/ckeditor/ckeditor.js', CKEditorWidget().media._js)
@@ -0,0 +1,133 @@
+from __future__ import absolute_import, unicode_literals
+
+import json
+import os.path
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.staticfiles.finders import find
+from django.test.utils import override_settings
+
+from ckeditor_uploader import chunked, utils
+from ckeditor_uploader.models import ChunkedUpload
+
+from .utils import UploadTestCase
+
+try:
+    from django.urls import reverse
+except ImportError:
+    from django.core.urlresolvers import reverse
+
+
+class ChunkedUploadTestCase(UploadTestCase):
+
+    def setUp(self):
+        super(ChunkedUploadTestCase, self).setUp()
+        self.temp_dir = tempfile.mkdtemp()
+        self.settings_override = override_settings(CKEDITOR_CHUNKED_UPLOAD_DIR=self.temp_dir, CKEDITOR_CHUNK_SIZE=1000)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        super(ChunkedUploadTestCase, self).tearDown()
+
+    def init(self, filename, size):
+        response = self.client.post(reverse('ckeditor_chunked_init'), {'filename': filename, 'size': size})
+        return response.status_code, json.loads(response.content)
+
+    def put(self, upload_id, offset, data):
+        response = self.client.put(
+            '%s?offset=%d' % (reverse('ckeditor_chunked_upload', args=[upload_id]), offset),
+            data, content_type='application/octet-stream',
+        )
+        return response.status_code, json.loads(response.content)
+
+    def finalize(self, upload_id):
+        response = self.client.post(reverse('ckeditor_chunked_finalize', args=[upload_id]))
+        return response.status_code, json.loads(response.content)
+
+    def upload_chunks(self, filename, data):
+        status, upload = self.init(filename, len(data))
+        self.assertEqual((200, 0, 1000), (status, upload['offset'], upload['chunk_size']))
+        upload_id = upload['upload_id']
+        for offset in range(0, len(data), 1000):
+            status, upload = self.put(upload_id, offset, data[offset:offset + 1000])
+            self.assertEqual(200, status)
+            self.assertEqual(min(offset + 1000, len(data)), upload['offset'])
+        return upload_id
+
+    def test_upload(self):
+        with open(find('ckeditor/ckeditor/LICENSE.md'), 'rb') as fp:
+            data = fp.read()
+        upload_id = self.upload_chunks('LICENSE.md', data)
+
+        status, result = self.finalize(upload_id)
+        self.assertEqual((200, '1'), (status, result['uploaded']))
+        with utils.storage.open(result['url'][len(settings.MEDIA_URL):]) as fp:
+            self.assertEqual(data, fp.read())
+        self.assertFalse(ChunkedUpload.objects.exists())
+        self.assertEqual([], os.listdir(self.temp_dir))
+
+    @override_settings(CKEDITOR_IMAGE_BACKEND='pillow')
+    def test_image_upload(self):
+        with open(find('ckeditor/ckeditor/plugins/codesnippet/lib/highlight/styles/pojoaque.jpg'), 'rb') as fp:
+            data = fp.read()
+        status, result = self.finalize(self.upload_chunks('pojoaque.jpg', data))
+        self.assertEqual(200, status)
+        path = result['url'][len(settings.MEDIA_URL):]
+        self.assertTrue(utils.storage.exists(utils.get_thumb_filename(path)))
+
+    def test_resume(self):
+        data = b'x' * 2500
+        status, upload = self.init('data.txt', len(data))
+        upload_id = upload['upload_id']
+        self.put(upload_id, 0, data[:1000])
+
+        # A chunk sent again after a lost response is rejected with the offset to resume from.
+        status, upload = self.put(upload_id, 0, data[:1000])
+        self.assertEqual((409, 1000), (status, upload['offset']))
+        response = self.client.get(reverse('ckeditor_chunked_upload', args=[upload_id]))
+        self.assertEqual(1000, json.loads(response.content)['offset'])
+
+        status, upload = self.finalize(upload_id)
+        self.assertEqual((400, 'Upload incomplete.'), (status, upload['error']))
+
+        self.assertEqual(413, self.put(upload_id, 1000, data[1000:2001])[0])
+        self.put(upload_id, 1000, data[1000:2000])
+        self.put(upload_id, 2000, data[2000:])
+        self.assertEqual(200, self.finalize(upload_id)[0])
+
+    def test_concurrent_chunk(self):
+        status, upload = self.init('data.txt', 2000)
+        upload = ChunkedUpload.objects.get(upload_id=upload['upload_id'])
+
+        class Stream(object):
+            # Another request appends its chunk while this one is received, without waiting for a lock.
+            chunks = [b'y' * 1000, b'']
+
+            def read(self, size):
+                if self.chunks[0]:
+                    chunked.append(ChunkedUpload.objects.get(pk=upload.pk), 0, BytesIO(b'x' * 1000))
+                return self.chunks.pop(0)
+
+        with self.assertRaises(chunked.ChunkError) as cm:
+            chunked.append(upload, 0, Stream())
+        self.assertEqual(409, cm.exception.status)
+        self.assertEqual(1000, ChunkedUpload.objects.get(pk=upload.pk).offset)
+        with open(chunked.get_temp_path(upload), 'rb') as fp:
+            self.assertEqual(b'x' * 1000, fp.read())
+        self.assertEqual([upload.upload_id], os.listdir(self.temp_dir))
+
+    @override_settings(CKEDITOR_UPLOAD_MAX_SIZE={'image': 100, 'video': 1000, 'file': 100})
+    def test_size_limits(self):
+        self.assertEqual(413, self.init('video.mp4', 1001)[0])
+        status, result = self.finalize(self.upload_chunks('data.txt', b'x' * 500))
+        self.assertEqual({'uploaded': '0', 'error': {'message': 'File too large.'}}, result)
+        self.assertFalse(ChunkedUpload.objects.exists())
+
+    def test_unknown_upload(self):
+        self.assertEqual(404, self.put('0' * 32, 0, b'x')[0])
+        self.assertEqual(404, self.finalize('0' * 32)[0])
@@ -0,0 +1,97 @@
+from __future__ import absolute_import, unicode_literals
+
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from ckeditor import companions
+from ckeditor.fields import RichTextField
+
+from ..models import ExampleCompanionModel
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+HTML = (
+    '<h1>Title</h1><p>First&nbsp;paragraph, with <strong>bold</strong> text.</p>'
+    '<script>alert(1)</script><ul><li>One</li><li>Two</li></ul>'
+)
+
+
+class CompanionsTestCase(SimpleTestCase):
+
+    def test_text(self):
+        self.assertEqual(
+            'Title\nFirst paragraph, with bold text.\nOne\nTwo',
+            companions.get_text(HTML),
+        )
+        self.assertEqual('', companions.get_text(None))
+
+    def test_excerpt(self):
+        self.assertEqual('Short text', companions.get_excerpt('Short\ntext', 20))
+        self.assertEqual('First paragraph…', companions.get_excerpt('First paragraph, with bold text.', 20))
+        self.assertEqual('Abcde…', companions.get_excerpt('Abcdefghij', 5))
+
+    def test_kinds(self):
+        self.assertEqual(companions.KINDS, companions.get_kinds(True))
+        self.assertEqual(('text', 'word_count'), companions.get_kinds(['word_count', 'text']))
+        with self.assertRaises(ValueError):
+            RichTextField(companions=['summary'])
+
+    def test_fields(self):
+        names = [field.name for field in ExampleCompanionModel._meta.fields]
+        self.assertEqual(['id', 'content', 'content_text', 'content_excerpt', 'content_word_count'], names)
+        self.assertEqual(51, ExampleCompanionModel._meta.get_field('content_excerpt').max_length)
+        name, path, args, kwargs = ExampleCompanionModel._meta.get_field('content').deconstruct()
+        self.assertNotIn('companions', kwargs)
+
+
+class CompanionFieldsTestCase(TestCase):
+
+    def test_computed_on_save(self):
+        obj = ExampleCompanionModel.objects.create(content=HTML)
+        obj = ExampleCompanionModel.objects.get(pk=obj.pk)
+        self.assertEqual('Title\nFirst paragraph, with bold text.\nOne\nTwo', obj.content_text)
+        self.assertEqual('Title First paragraph, with bold text. One Two', obj.content_excerpt)
+        self.assertEqual(8, obj.content_word_count)
+
+        obj.content = '<p>%s</p>' % ' '.join(['word'] * 20)
+        obj.save()
+        obj.refresh_from_db()
+        self.assertEqual(20, obj.content_word_count)
+        self.assertEqual(' '.join(['word'] * 10) + '…', obj.content_excerpt)
+
+    def test_defer_rich_text(self):
+        ExampleCompanionModel.objects.create(content=HTML)
+        obj = companions.defer_rich_text(ExampleCompanionModel.objects.all()).get()
+        self.assertEqual({'content'}, obj.get_deferred_fields())
+        obj = companions.defer_rich_text(ExampleCompanionModel.objects.all(), keep=['content']).get()
+        self.assertEqual(set(), obj.get_deferred_fields())
+
+    def test_update_companions(self):
+        pks = [ExampleCompanionModel.objects.create(content=HTML).pk for i in range(3)]
+        ExampleCompanionModel.objects.update(content_text='', content_excerpt='', content_word_count=0)
+        self.assertEqual(3, companions.update_companions(ExampleCompanionModel, 'content', excerpt_length=50,
+                                                         batch_size=2))
+        for obj in ExampleCompanionModel.objects.filter(pk__in=pks):
+            self.assertEqual(8, obj.content_word_count)
+
+    def test_changelist(self):
+        ExampleCompanionModel.objects.create(content=HTML)
+        User.objects.create_superuser('admin', 'admin@example.com', 'admin')
+        self.client.login(username='admin', password='admin')
+        response = self.client.get(reverse('admin:demo_application_examplecompanionmodel_changelist'))
+        self.assertContains(response, 'Title First paragraph')
+        self.assertEqual({'content'}, response.context['cl'].result_list[0].get_deferred_fields())
+
+        model_admin = admin.site._registry[ExampleCompanionModel]
+        url = reverse('admin:demo_application_examplecompanionmodel_changelist')
+        with mock.patch.object(model_admin, 'list_display', ['content_excerpt', '__str__']):
+            response = self.client.get(url)
+        self.assertEqual(set(), response.context['cl'].result_list[0].get_deferred_fields())
+        with mock.patch.object(model_admin, 'defer_rich_text', False):
+            response = self.client.get(url)
+        self.assertEqual(set(), response.context['cl'].result_list[0].get_deferred_fields())
@@ -0,0 +1,110 @@
+from __future__ import absolute_import, unicode_literals
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from ckeditor import compression
+from ckeditor.fields import RichTextField
+
+from ..models import ExampleCompressedModel, ExampleNonUploadModel
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+HTML = '<p>%s</p>' % ' '.join(['Lorem ipsum dolor sit amet.'] * 100)
+
+
+def get_stored(model, pk):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT content FROM %s WHERE id = %%s' % model._meta.db_table, [pk])
+        return cursor.fetchone()[0]
+
+
+class CompressTestCase(SimpleTestCase):
+
+    def test_round_trip(self):
+        stored = compression.compress(HTML + '☃')
+        self.assertTrue(stored.startswith(compression.MARKER + 'zlib:'))
+        self.assertLess(len(stored), len(HTML) / 5)
+        self.assertEqual(HTML + '☃', compression.decompress(stored))
+
+    def test_method(self):
+        self.assertEqual('zlib', compression.get_method(True))
+        with self.assertRaises(ImproperlyConfigured):
+            RichTextField(compress='lzma')
+        with mock.patch('ckeditor.compression.zstandard', None):
+            with self.assertRaises(ImproperlyConfigured):
+                compression.get_method('zstd')
+
+
+class CompressedFieldTestCase(TestCase):
+
+    def test_stored_compressed(self):
+        obj = ExampleCompressedModel.objects.create(content=HTML)
+        self.assertTrue(get_stored(ExampleCompressedModel, obj.pk).startswith(compression.MARKER + 'zlib:'))
+        self.assertEqual(HTML, obj.content)
+
+        short = ExampleCompressedModel.objects.create(content='<p>Short</p>')
+        self.assertEqual('<p>Short</p>', get_stored(ExampleCompressedModel, short.pk))
+
+    def test_lazy_decompression(self):
+        pk = ExampleCompressedModel.objects.create(content=HTML).pk
+        with mock.patch('ckeditor.compression.decompress', wraps=compression.decompress) as decompress:
+            obj = ExampleCompressedModel.objects.get(pk=pk)
+            obj.save()
+            self.assertFalse(decompress.called)
+            self.assertEqual(HTML, obj.content)
+            self.assertIsInstance(obj.content, str)
+            self.assertEqual(1, decompress.call_count)
+
+        value = ExampleCompressedModel.objects.values_list('content', flat=True).get(pk=pk)
+        self.assertEqual(HTML, str(value))
+        self.assertEqual(value, HTML)
+
+    def test_uncompressed_rows(self):
+        obj = ExampleCompressedModel.objects.create(content='<p>Short</p>')
+        ExampleCompressedModel.objects.filter(pk=obj.pk).update(content=compression.compress('<p>Old</p>'))
+        # Read back by a field without compression too.
+        ExampleNonUploadModel.objects.create(pk=obj.pk, content=compression.compress(HTML))
+        self.assertEqual(HTML, ExampleNonUploadModel.objects.get(pk=obj.pk).content)
+        self.assertEqual('<p>Old</p>', ExampleCompressedModel.objects.get(pk=obj.pk).content)
+
+    def test_marker_in_html(self):
+        # Read as it is by a field without compression, as the descriptor is not installed.
+        obj = ExampleNonUploadModel.objects.create(content='ckz:zlib:eJzLSM3JyQcABiwCFQ==')
+        self.assertEqual('ckz:zlib:eJzLSM3JyQcABiwCFQ==', ExampleNonUploadModel.objects.get(pk=obj.pk).content)
+        self.assertNotIsInstance(ExampleNonUploadModel.__dict__['content'], compression.CompressedTextDescriptor)
+        self.assertIsInstance(ExampleCompressedModel.__dict__['content'], compression.CompressedTextDescriptor)
+
+    def test_undecodable_value(self):
+        value = compression.MARKER + 'zlib:not base64'
+        obj = ExampleNonUploadModel.objects.create(content=value)
+        self.assertEqual(value, ExampleNonUploadModel.objects.get(pk=obj.pk).content)
+
+    def test_compress_rows(self):
+        pks = [ExampleNonUploadModel.objects.create(content=HTML + str(i)).pk for i in range(5)]
+        ExampleNonUploadModel.objects.create(content='')
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(5, compression.compress_rows(ExampleNonUploadModel, 'content', batch_size=2))
+        self.assertEqual(3, len([query for query in queries if query['sql'].startswith('UPDATE')]))
+        self.assertTrue(all(get_stored(ExampleNonUploadModel, pk).startswith(compression.MARKER) for pk in pks))
+        self.assertEqual(HTML + '3', ExampleNonUploadModel.objects.get(pk=pks[3]).content)
+        self.assertEqual(0, compression.compress_rows(ExampleNonUploadModel, 'content'))
+
+        self.assertEqual(5, compression.decompress_rows(ExampleNonUploadModel, 'content'))
+        self.assertEqual(HTML + '3', get_stored(ExampleNonUploadModel, pks[3]))
+
+    @override_settings(CKEDITOR_CANONICALIZE_HTML=True)
+    def test_canonicalized(self):
+        obj = ExampleCompressedModel.objects.create(content=HTML.replace('<p>', '<p><script>x</script>'))
+        obj = ExampleCompressedModel.objects.get(pk=obj.pk)
+        self.assertEqual(HTML, obj.content)
+        # Not canonicalized again when saved unchanged.
+        with mock.patch('ckeditor.fields.canonicalize') as canonicalize:
+            obj.save()
+        self.assertFalse(canonicalize.called)
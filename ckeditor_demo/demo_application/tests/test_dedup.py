@@ -0,0 +1,92 @@
+from __future__ import absolute_import, unicode_literals
+
+import json
+import os.path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test.utils import override_settings
+
+from ckeditor_uploader import utils
+from ckeditor_uploader.models import DeduplicatedUpload
+
+from .utils import UploadTestCase, get_user_upload_directory, remove_user_upload_directory
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+try:
+    from django.urls import reverse
+except ImportError:
+    from django.core.urlresolvers import reverse
+
+
+def count_files(user_path='1'):
+    return sum(len(files) for _, _, files in os.walk(get_user_upload_directory(user_path)))
+
+
+@override_settings(CKEDITOR_IMAGE_BACKEND='pillow', CKEDITOR_UPLOAD_DEDUPLICATE='user')
+class DeduplicationTestCase(UploadTestCase):
+
+    def delete(self, url):
+        response = self.client.delete('%s?path=%s' % (reverse('ckeditor_delete'), url[len(settings.MEDIA_URL):]))
+        return json.loads(response.content)
+
+    def test_same_content_stored_once(self):
+        url = self.upload()['url']
+        files = count_files()
+        with mock.patch('ckeditor_uploader.backends.pillow_backend.PillowBackend.save_as') as save_as:
+            self.assertEqual(url, self.upload()['url'])
+        self.assertFalse(save_as.called)
+        self.assertEqual(files, count_files())
+        self.assertEqual(2, DeduplicatedUpload.objects.get().references)
+
+        self.assertNotEqual(url, self.upload('ckeditor/ckeditor/skins/moono/images/hidpi/close.png')['url'])
+
+    def test_delete_last_reference(self):
+        url = self.upload()['url']
+        self.upload()
+        path = url[len(settings.MEDIA_URL):]
+
+        self.assertEqual({'success': 1}, self.delete(url))
+        self.assertTrue(utils.storage.exists(path))
+        self.assertEqual({'success': 1}, self.delete(url))
+        self.assertFalse(utils.storage.exists(path))
+        self.assertFalse(utils.storage.exists(utils.get_thumb_filename(path)))
+        self.assertFalse(DeduplicatedUpload.objects.exists())
+
+    def test_scope(self):
+        url = self.upload()['url']
+        User.objects.create_superuser('other', 'other@example.com', 'other')
+        self.client.login(username='other', password='other')
+        try:
+            self.assertNotEqual(url, self.upload()['url'])
+            with override_settings(CKEDITOR_UPLOAD_DEDUPLICATE='global'):
+                DeduplicatedUpload.objects.all().delete()
+                other_url = self.upload()['url']
+                self.assertIn('/2/', other_url)
+                self.client.login(username='test', password='test')
+                # Copied to the directory of the user, who can delete it.
+                with mock.patch('ckeditor_uploader.backends.pillow_backend.PillowBackend.save_as') as save_as:
+                    url = self.upload()['url']
+                self.assertFalse(save_as.called)
+                self.assertIn('/1/', url)
+                path = url[len(settings.MEDIA_URL):]
+                self.assertTrue(utils.storage.exists(utils.get_thumb_filename(path)))
+                self.assertEqual(1, DeduplicatedUpload.objects.get().references)
+                self.assertEqual({'success': 1}, self.delete(url))
+                self.assertFalse(utils.storage.exists(path))
+                self.assertTrue(utils.storage.exists(other_url[len(settings.MEDIA_URL):]))
+        finally:
+            remove_user_upload_directory('2')
+
+    @override_settings(CKEDITOR_UPLOAD_DEDUPLICATE=None)
+    def test_disabled(self):
+        url = self.upload()['url']
+        self.assertNotEqual(url, self.upload()['url'])
+        self.assertFalse(DeduplicatedUpload.objects.exists())
+        # The deduplication tables are not queried.
+        with mock.patch('ckeditor_uploader.dedup.release', side_effect=AssertionError('released')):
+            self.assertEqual({'success': 1}, self.delete(url))
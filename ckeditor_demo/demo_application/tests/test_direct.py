@@ -0,0 +1,105 @@
+from __future__ import absolute_import, unicode_literals
+
+import json
+import os.path
+from io import BytesIO
+
+from django.conf import settings
+from django.test.utils import override_settings
+
+from PIL import Image
+
+from ckeditor_uploader import utils
+from ckeditor_uploader.models import UploadedFile
+
+from .utils import UploadTestCase
+
+try:
+    from django.urls import reverse
+except ImportError:
+    from django.core.urlresolvers import reverse
+
+
+def make_image(size=(800, 600)):
+    data = BytesIO()
+    Image.new('RGB', size, (200, 100, 50)).save(data, format='PNG')
+    return data.getvalue()
+
+
+@override_settings(CKEDITOR_IMAGE_BACKEND='pillow')
+class DirectUploadTestCase(UploadTestCase):
+
+    def sign(self, filename, size):
+        return self.client.post(reverse('ckeditor_direct_sign'), {'filename': filename, 'size': size})
+
+    def put(self, target, data):
+        return self.client.generic(target['method'], target['url'], data, content_type='application/octet-stream')
+
+    def confirm(self, token):
+        return self.client.post(reverse('ckeditor_direct_confirm'), {'token': token})
+
+    def upload_direct(self, filename, data):
+        signed = json.loads(self.sign(filename, len(data)).content)
+        self.assertEqual(200, self.put(signed['upload'], data).status_code)
+        return signed, self.confirm(signed['token'])
+
+    def test_upload_file(self):
+        signed = json.loads(self.sign('notes.txt', 10).content)
+        self.assertEqual(200, self.put(signed['upload'], b'some notes').status_code)
+        # Not served until confirmed.
+        self.assertFalse(utils.storage.exists(signed['path']))
+        response = self.confirm(signed['token'])
+        self.assertTrue(signed['path'].startswith(os.path.join(settings.CKEDITOR_UPLOAD_PATH, '1')))
+        data = json.loads(response.content)
+        self.assertEqual('1', data['uploaded'])
+        self.assertEqual(utils.get_media_url(signed['path']), data['url'])
+        with utils.storage.open(signed['path']) as fp:
+            self.assertEqual(b'some notes', fp.read())
+
+    @override_settings(CKEDITOR_UPLOAD_INDEX=True, CKEDITOR_FORCE_JPEG_COMPRESSION=True)
+    def test_upload_image_is_processed(self):
+        signed, response = self.upload_direct('photo.png', make_image())
+        path = json.loads(response.content)['url'][len(settings.MEDIA_URL):]
+        self.assertEqual(os.path.splitext(signed['path'])[0] + '.jpg', path)
+        self.assertFalse(utils.storage.exists(signed['path']))
+        self.assertTrue(utils.storage.exists(utils.get_thumb_filename(path)))
+        self.assertTrue(UploadedFile.objects.filter(path=path, user_path='1').exists())
+
+    def test_invalid_token(self):
+        signed = json.loads(self.sign('notes.txt', 10).content)
+        url = reverse('ckeditor_direct_upload', args=[signed['token'] + 'x'])
+        response = self.client.put(url, b'some notes', content_type='application/octet-stream')
+        self.assertEqual(403, response.status_code)
+        self.assertEqual(403, self.confirm(signed['token'] + 'x').status_code)
+        self.assertEqual(404, self.confirm(signed['token']).status_code)
+
+    def test_upload_once(self):
+        signed = json.loads(self.sign('notes.txt', 10).content)
+        self.assertEqual(200, self.put(signed['upload'], b'some notes').status_code)
+        self.assertEqual(409, self.put(signed['upload'], b'other note').status_code)
+
+    def test_size(self):
+        signed = json.loads(self.sign('notes.txt', 5).content)
+        self.assertEqual(413, self.put(signed['upload'], b'some notes').status_code)
+        self.assertFalse(utils.storage.exists(signed['path']))
+
+        with override_settings(CKEDITOR_UPLOAD_MAX_SIZE={'file': 5}):
+            self.assertEqual(413, self.sign('notes.txt', 10).status_code)
+
+    @override_settings(CKEDITOR_ALLOW_NONIMAGE_FILES=False)
+    def test_nonimage_rejected(self):
+        self.assertEqual(400, self.sign('page.html', 10).status_code)
+        signed, response = self.upload_direct('notes.jpg', b'some notes')
+        self.assertEqual('0', json.loads(response.content)['uploaded'])
+        self.assertFalse(utils.storage.exists(signed['path']))
+
+    def test_unconfirmed_removed(self):
+        signed = json.loads(self.sign('notes.txt', 10).content)
+        self.put(signed['upload'], b'some notes')
+        with override_settings(CKEDITOR_DIRECT_UPLOAD_EXPIRY=0):
+            self.sign('notes.txt', 10)
+        self.assertEqual(404, self.confirm(signed['token']).status_code)
+
+    def test_requires_staff(self):
+        self.client.logout()
+        self.assertEqual(302, self.sign('notes.txt', 10).status_code)
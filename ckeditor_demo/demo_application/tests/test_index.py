@@ -0,0 +1,70 @@
+from __future__ import absolute_import, unicode_literals
+
+import os.path
+
+from django.core.management import call_command
+from django.test.utils import override_settings
+
+from ckeditor_uploader.models import UploadedFile
+from ckeditor_uploader.utils import storage
+
+from .utils import UploadTestCase
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+try:
+    from django.urls import reverse
+except ImportError:
+    from django.core.urlresolvers import reverse
+
+
+@override_settings(CKEDITOR_UPLOAD_INDEX=True, CKEDITOR_IMAGE_BACKEND='pillow')
+class UploadIndexTestCase(UploadTestCase):
+
+    def test_upload_is_indexed(self):
+        self.upload('ckeditor/ckeditor/skins/moono/images/hidpi/close.png')
+
+        entry = UploadedFile.objects.get()
+        self.assertEqual('1', entry.user_path)
+        self.assertTrue(entry.is_image)
+        self.assertFalse(entry.is_video)
+        self.assertTrue(entry.thumbnail_path)
+        self.assertTrue(storage.exists(entry.thumbnail_path))
+        self.assertEqual(storage.size(entry.path), entry.size)
+        self.assertIsNotNone(entry.modified)
+
+    def test_browse_reads_index(self):
+        self.upload('ckeditor/ckeditor/skins/moono/images/hidpi/close.png')
+        entry = UploadedFile.objects.get()
+
+        with mock.patch('ckeditor_uploader.views.walk_storage', side_effect=AssertionError('storage listed')):
+            response = self.client.get(reverse('ckeditor_browse'))
+
+        self.assertEqual(200, response.status_code)
+        files = response.context['files']
+        self.assertEqual([entry.path], [f['path'] for f in files])
+        self.assertEqual(storage.url(entry.thumbnail_path), files[0]['thumb'])
+
+    def test_delete_removes_entry(self):
+        self.upload('ckeditor/ckeditor/skins/moono/images/hidpi/close.png')
+        entry = UploadedFile.objects.get()
+
+        response = self.client.delete('%s?path=%s' % (reverse('ckeditor_delete'), entry.path))
+
+        self.assertEqual(200, response.status_code)
+        self.assertFalse(UploadedFile.objects.exists())
+        self.assertFalse(storage.exists(entry.path))
+
+    def test_backfill_command(self):
+        self.upload('ckeditor/ckeditor/skins/moono/images/hidpi/close.png')
+        self.upload('ckeditor/ckeditor/LICENSE.md')
+        expected = dict(UploadedFile.objects.values_list('path', 'thumbnail_path'))
+        UploadedFile.objects.all().delete()
+
+        call_command('indexckeditoruploads', stdout=open(os.devnull, 'w'))
+
+        self.assertEqual(expected, dict(UploadedFile.objects.values_list('path', 'thumbnail_path')))
+        self.assertEqual({'1'}, set(UploadedFile.objects.values_list('user_path', flat=True)))
@@ -0,0 +1,103 @@
+from __future__ import absolute_import, unicode_literals
+
+import json
+import os.path
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test.utils import override_settings
+
+from ckeditor_uploader import utils
+from ckeditor_uploader.jobs import DatabaseJobRunner
+from ckeditor_uploader.models import UploadedFile, UploadJob
+
+from .utils import IMAGE, UploadTestCase
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+try:
+    from django.urls import reverse
+except ImportError:
+    from django.core.urlresolvers import reverse
+
+
+@override_settings(CKEDITOR_UPLOAD_ASYNC=True, CKEDITOR_IMAGE_BACKEND='pillow')
+class AsyncUploadTestCase(UploadTestCase):
+
+    def browse_files(self):
+        return json.loads(self.client.get(reverse('ckeditor_browse_json')).content)['files']
+
+    def test_image_processed_by_job(self):
+        data = self.upload(IMAGE)
+        self.assertEqual('1', data['uploaded'])
+
+        job = UploadJob.objects.get()
+        self.assertEqual(('process_image', '1', UploadJob.PENDING), (job.task, job.user_path, job.status))
+        thumbnail = os.path.join(settings.MEDIA_ROOT, utils.get_thumb_filename(job.path))
+        self.assertFalse(os.path.exists(thumbnail))
+
+        files = self.browse_files()
+        self.assertTrue(files[0]['pending'])
+        self.assertEqual(utils.PENDING_THUMBNAIL, files[0]['thumb'])
+
+        call_command('runckeditorjobs', once=True, stdout=StringIO())
+
+        self.assertFalse(UploadJob.objects.exists())
+        self.assertTrue(os.path.exists(thumbnail))
+        files = self.browse_files()
+        self.assertNotIn('pending', files[0])
+        self.assertEqual(data['url'], files[0]['src'])
+
+    @override_settings(CKEDITOR_UPLOAD_INDEX=True)
+    def test_processed_image_renamed(self):
+        self.upload(IMAGE)
+        with mock.patch('ckeditor_uploader.backends.pillow_backend.PillowBackend.process_saved',
+                        return_value='uploads/1/renamed.jpg'):
+            call_command('runckeditorjobs', once=True, stdout=StringIO())
+        self.assertEqual(['uploads/1/renamed.jpg'], list(UploadedFile.objects.values_list('path', flat=True)))
+
+    def test_delete_removes_jobs(self):
+        data = self.upload(IMAGE)
+        path = data['url'][len(settings.MEDIA_URL):]
+        self.client.delete('%s?path=%s' % (reverse('ckeditor_delete'), path))
+        self.assertFalse(UploadJob.objects.exists())
+
+        # The job table is not queried when the processing is not deferred.
+        with override_settings(CKEDITOR_UPLOAD_ASYNC=False):
+            path = self.upload(IMAGE)['url'][len(settings.MEDIA_URL):]
+            with mock.patch.object(UploadJob.objects, 'filter', side_effect=AssertionError('jobs queried')):
+                response = self.client.delete('%s?path=%s' % (reverse('ckeditor_delete'), path))
+        self.assertEqual(200, response.status_code)
+
+    def test_non_image_processed_inline(self):
+        data = self.upload('ckeditor/ckeditor/LICENSE.md')
+        self.assertEqual('1', data['uploaded'])
+        self.assertFalse(UploadJob.objects.exists())
+
+    def test_failed_job(self):
+        UploadJob.objects.create(task='process_image', path='uploads/1/missing.jpg', user_path='1')
+        runner = DatabaseJobRunner()
+        self.assertEqual(1, runner.run_pending(max_attempts=2))
+        self.assertEqual(UploadJob.PENDING, UploadJob.objects.get().status)
+        self.assertEqual(1, runner.run_pending(max_attempts=2))
+        job = UploadJob.objects.get()
+        self.assertEqual((UploadJob.FAILED, 2), (job.status, job.attempts))
+        self.assertTrue(job.error)
+        self.assertEqual(0, runner.run_pending(max_attempts=2))
+
+    def test_running_job_not_claimed_twice(self):
+        job = UploadJob.objects.create(task='process_image', path='uploads/1/a.jpg', user_path='1',
+                                       status=UploadJob.RUNNING)
+        runner = DatabaseJobRunner()
+        with mock.patch('ckeditor_uploader.jobs.run_task') as run_task:
+            self.assertEqual(0, runner.run_pending())
+            self.assertFalse(run_task.called)
+            # Abandoned by a dead worker.
+            UploadJob.objects.filter(pk=job.pk).update(updated=job.updated.replace(year=2000))
+            self.assertEqual(1, runner.requeue_stale(60))
+            self.assertEqual(1, runner.run_pending())
+        run_task.assert_called_once_with('process_image', 'uploads/1/a.jpg', '1')
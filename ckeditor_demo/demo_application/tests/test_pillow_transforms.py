@@ -0,0 +1,132 @@
+from __future__ import absolute_import, unicode_literals
+
+import math
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase
+from django.test.utils import override_settings
+
+from PIL import Image, ImageChops, ImageDraw, ImageStat
+
+from ckeditor_uploader.backends import pillow_transforms
+
+from .utils import UploadTestCase
+
+
+def make_image(size=(2000, 1500), format='JPEG', orientation=None):
+    image = Image.linear_gradient('L').resize(size).convert('RGB')
+    draw = ImageDraw.Draw(image)
+    for i in range(0, size[0], 100):
+        draw.ellipse((i, i // 2, i + 300, i // 2 + 200), outline=(255, 0, 0), width=8)
+    data = BytesIO()
+    kwargs = {}
+    if orientation:
+        exif = Image.Exif()
+        exif[pillow_transforms.ORIENTATION_TAG] = orientation
+        kwargs['exif'] = exif
+    image.save(data, format=format, **kwargs)
+    return data.getvalue()
+
+
+def psnr(data1, data2):
+    image1 = Image.open(BytesIO(data1)).convert('RGB')
+    image2 = Image.open(BytesIO(data2)).convert('RGB')
+    mse = sum(ImageStat.Stat(ImageChops.difference(image1, image2)).sum2) / (3.0 * image1.size[0] * image1.size[1])
+    return 10 * math.log10(255 ** 2 / mse) if mse else float('inf')
+
+
+class ReducedDecodeTestCase(SimpleTestCase):
+
+    def test_jpeg_draft(self):
+        image = pillow_transforms.reduce_image(Image.open(BytesIO(make_image())), (200, 150))
+        image.load()
+        # Decoded at 1/4 scale, still at least twice the target size.
+        self.assertEqual((500, 375), image.size)
+
+    def test_png_reduce(self):
+        image = pillow_transforms.reduce_image(Image.open(BytesIO(make_image(format='PNG'))), (200, 150))
+        self.assertEqual((400, 300), image.size)
+
+    def test_small_image_not_reduced(self):
+        image = Image.open(BytesIO(make_image(size=(300, 200))))
+        self.assertIs(image, pillow_transforms.reduce_image(image, (200, 150)))
+        self.assertEqual((300, 200), image.size)
+
+    def test_compress_quality(self):
+        for format in ('JPEG', 'PNG'):
+            data = make_image(format=format)
+            full = pillow_transforms.compress_image(data, 200, 0, 90)[1]
+            reduced = pillow_transforms.compress_image(data, 200, 0, 90, reduced_decode=True)[1]
+            self.assertEqual((200, 150), Image.open(BytesIO(reduced)).size)
+            self.assertGreater(psnr(full, reduced), 30)
+
+    def test_compress_rotated(self):
+        data = make_image(orientation=6)
+        full = pillow_transforms.compress_image(data, 200, 0, 90)[1]
+        reduced = pillow_transforms.compress_image(data, 200, 0, 90, reduced_decode=True)[1]
+        self.assertEqual((200, 266), Image.open(BytesIO(full)).size)
+        self.assertEqual((200, 266), Image.open(BytesIO(reduced)).size)
+        self.assertGreater(psnr(full, reduced), 30)
+
+    def test_thumbnail(self):
+        data = make_image()
+        full = pillow_transforms.create_thumbnail(data, (75, 75))
+        reduced = pillow_transforms.create_thumbnail(data, (75, 75), reduced_decode=True)
+        self.assertEqual((75, 56), Image.open(BytesIO(reduced)).size)
+        self.assertGreater(psnr(full, reduced), 30)
+
+
+def make_screenshot(size=(600, 400), mode='RGB'):
+    image = Image.new(mode, size, 'white')
+    draw = ImageDraw.Draw(image)
+    for i in range(0, size[1], 40):
+        draw.rectangle((20, i, size[0] - 20, i + 20), fill=(40, 90, 200, 255))
+        draw.text((30, i + 5), 'Flat colour screenshot', fill=(0, 0, 0, 255))
+    return image
+
+
+class AdaptiveFormatTestCase(SimpleTestCase):
+    formats = ['JPEG', 'WEBP', 'PNG']
+
+    def test_flat_image_to_png(self):
+        image = make_screenshot()
+        img_format, data, candidates = pillow_transforms.encode_adaptive(image, self.formats, 75, 35)
+        self.assertEqual('PNG', img_format)
+        self.assertEqual(['JPEG', 'WEBP', 'PNG'], [c[0] for c in candidates])
+        self.assertEqual(min(c[1] for c in candidates if c[2] >= 35), len(data))
+
+    def test_photo_not_png(self):
+        image = Image.open(BytesIO(make_image(size=(600, 400))))
+        img_format, data, candidates = pillow_transforms.encode_adaptive(image, self.formats, 75, 35)
+        self.assertIn(img_format, ('JPEG', 'WEBP'))
+        self.assertGreaterEqual(pillow_transforms.get_psnr(image, data), 35)
+
+    def test_transparency_skips_jpeg(self):
+        image = make_screenshot(mode='RGBA')
+        image.putpixel((0, 0), (0, 0, 0, 0))
+        img_format, data, candidates = pillow_transforms.encode_adaptive(image, self.formats, 75, 35)
+        self.assertNotIn('JPEG', [c[0] for c in candidates])
+        self.assertTrue(pillow_transforms.has_alpha(Image.open(BytesIO(data))))
+
+    def test_single_format(self):
+        img_format, data, candidates = pillow_transforms.encode_adaptive(make_screenshot(), ['JPEG'], 75, 35)
+        self.assertEqual('JPEG', Image.open(BytesIO(data)).format)
+        self.assertEqual([('JPEG', len(data), None)], candidates)
+
+    def test_supported_formats(self):
+        self.assertEqual(['PNG', 'JPEG'], pillow_transforms.get_supported_formats(['PNG', 'FOO', 'JPEG', 'PNG']))
+        self.assertEqual(['JPEG'], pillow_transforms.get_supported_formats(['FOO']))
+
+
+@override_settings(CKEDITOR_IMAGE_BACKEND='pillow', CKEDITOR_IMAGE_FORMATS=['JPEG', 'WEBP', 'PNG'])
+class AdaptiveFormatUploadTestCase(UploadTestCase):
+
+    def test_extension_follows_format(self):
+        data = BytesIO()
+        make_screenshot().save(data, format='BMP')
+        upload = SimpleUploadedFile('screenshot.bmp', data.getvalue(), content_type='image/bmp')
+        with self.assertLogs('django', 'INFO') as logs:
+            url = self.upload(upload)['url']
+        self.assertTrue(url.endswith('.png'))
+        self.assertTrue(any('Compressed image to PNG' in line for line in logs.output))
@@ -0,0 +1,82 @@
+from __future__ import absolute_import, unicode_literals
+
+import json
+import os.path
+
+from django.contrib.staticfiles.finders import find
+from django.test import SimpleTestCase
+from django.test.utils import override_settings
+
+from ckeditor_uploader.backends import pillow_transforms
+from ckeditor_uploader.processing import ImageProcessor, ProcessingBusy, get_processor
+
+from .utils import IMAGE, UploadTestCase, get_user_upload_directory
+
+try:
+    from django.urls import reverse
+except ImportError:
+    from django.core.urlresolvers import reverse
+
+
+class ImageProcessorTestCase(SimpleTestCase):
+
+    def test_max_in_flight(self):
+        processor = ImageProcessor(max_in_flight=1, retry_after=7)
+        with processor.admit(100):
+            self.assertTrue(processor.is_full())
+            with self.assertRaises(ProcessingBusy) as cm:
+                with processor.admit(100):
+                    pass
+            self.assertEqual(7, cm.exception.retry_after)
+        self.assertFalse(processor.is_full())
+        stats = processor.get_stats()
+        self.assertEqual((0, 0, 1, 1), (stats['in_flight'], stats['pixels'], stats['processed'], stats['rejected']))
+
+    def test_pixel_budget(self):
+        processor = ImageProcessor(pixel_budget=1000)
+        # An image larger than the budget is processed alone.
+        with processor.admit(5000):
+            self.assertEqual(5000, processor.get_stats()['pixels'])
+            with self.assertRaises(ProcessingBusy):
+                with processor.admit(1):
+                    pass
+        with processor.admit(600):
+            with processor.admit(400):
+                self.assertEqual(2, processor.get_stats()['in_flight'])
+                with self.assertRaises(ProcessingBusy):
+                    with processor.admit(1):
+                        pass
+
+    def test_run_in_pool(self):
+        processor = ImageProcessor(pool_size=1)
+        with open(find(IMAGE), 'rb') as fp:
+            data = fp.read()
+        thumbnail = processor.run(pillow_transforms.create_thumbnail, data, (10, 10))
+        self.assertEqual(thumbnail, pillow_transforms.create_thumbnail(data, (10, 10)))
+        self.assertEqual(1, processor.get_stats()['pool_size'])
+
+
+@override_settings(CKEDITOR_IMAGE_BACKEND='pillow')
+class ProcessingViewTestCase(UploadTestCase):
+
+    @override_settings(CKEDITOR_IMAGE_MAX_INFLIGHT=0, CKEDITOR_IMAGE_RETRY_AFTER=3)
+    def test_busy(self):
+        response = self.post_upload()
+        self.assertEqual(503, response.status_code)
+        self.assertEqual('3', response['Retry-After'])
+        self.assertEqual('0', json.loads(response.content)['uploaded'])
+
+        # Files which are not processed are accepted.
+        self.assertEqual('1', self.upload('ckeditor/ckeditor/LICENSE.md')['uploaded'])
+
+    @override_settings(CKEDITOR_IMAGE_PIXEL_BUDGET=1000)
+    def test_pixel_budget_exhausted(self):
+        with get_processor().admit(1000):
+            response = self.post_upload()
+        self.assertEqual(503, response.status_code)
+        self.assertFalse(os.path.exists(get_user_upload_directory()))
+
+        self.assertEqual(200, self.post_upload().status_code)
+        stats = json.loads(self.client.get(reverse('ckeditor_processing_stats')).content)
+        self.assertEqual(1, stats['rejected'])
+        self.assertEqual(0, stats['in_flight'])
@@ -0,0 +1,125 @@
+from __future__ import absolute_import, unicode_literals
+
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from ckeditor_uploader import derivatives, references, utils
+from ckeditor_uploader.models import UploadReference
+
+from ..models import ExampleModel
+from .utils import UploadTestCase
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+
+class ReferencedPathsTestCase(TestCase):
+
+    def test_paths(self):
+        html = (
+            '<p><img src="/media/uploads/1/a_thumb.jpg" '
+            'srcset="https://cdn.example.com/media/uploads/1/a_w640.jpg 640w, /media/uploads/1/b%20c.png 2x">'
+            '<a href="/media/uploads/../secret">x</a><a href="/about/">About</a>'
+            '<span style="background: url(\'/media/uploads/1/d.gif\')"></span>'
+            '<img src="{0}"></p>'
+        ).format(derivatives.get_url('uploads/1/e.jpg', 100, 100))
+        self.assertEqual(
+            {'uploads/1/a.jpg', 'uploads/1/a_thumb.jpg', 'uploads/1/a_w640.jpg', 'uploads/1/b c.png',
+             'uploads/1/d.gif', 'uploads/1/e.jpg'},
+            references.get_referenced_paths(html),
+        )
+
+
+@override_settings(CKEDITOR_UPLOAD_REFERENCES=True, CKEDITOR_IMAGE_BACKEND='pillow')
+class UploadReferenceTestCase(UploadTestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        super(UploadReferenceTestCase, self).setUp()
+
+    def tearDown(self):
+        super(UploadReferenceTestCase, self).tearDown()
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def upload_image(self):
+        url = self.upload()['url']
+        return url, url[len(settings.MEDIA_URL):]
+
+    def get_paths(self):
+        return set(UploadReference.objects.values_list('path', flat=True))
+
+    def test_references_maintained(self):
+        url, path = self.upload_image()
+        obj = ExampleModel.objects.create(content='<p><img src="%s"></p>' % url)
+        self.assertEqual({path}, self.get_paths())
+
+        obj = ExampleModel.objects.defer('content').get(pk=obj.pk)
+        obj.save()
+        self.assertEqual({path}, self.get_paths())
+
+        obj.content = '<p>No image</p>'
+        obj.save()
+        self.assertEqual(set(), self.get_paths())
+
+        obj.content = '<p><img src="%s"></p>' % url
+        obj.save()
+        obj.delete()
+        self.assertEqual(set(), self.get_paths())
+
+    def test_rebuild_references(self):
+        url, path = self.upload_image()
+        with override_settings(CKEDITOR_UPLOAD_REFERENCES=False):
+            ExampleModel.objects.create(content='<p><img src="%s"></p>' % url)
+        self.assertEqual(set(), self.get_paths())
+        self.assertEqual(1, references.rebuild_references(batch_size=1))
+        self.assertEqual({path}, self.get_paths())
+
+    def test_rebuild_failure(self):
+        url, path = self.upload_image()
+        ExampleModel.objects.create(content='<p><img src="%s"></p>' % url)
+        with mock.patch('ckeditor_uploader.references.update_references', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                references.rebuild_references()
+        self.assertEqual({path}, self.get_paths())
+
+    def test_delete_orphans(self):
+        url, path = self.upload_image()
+        orphan_url, orphan_path = self.upload_image()
+        thumbnail_path = utils.get_thumb_filename(orphan_path)
+        self.assertTrue(utils.storage.exists(thumbnail_path))
+        ExampleModel.objects.create(content='<p><img src="%s"></p>' % url)
+
+        self.assertEqual([], list(references.find_orphans()))
+
+        out = StringIO()
+        call_command('deleteckeditororphans', dry_run=True, grace_period=0, stdout=out)
+        self.assertEqual([orphan_path, 'Found 1 orphaned uploads'], out.getvalue().splitlines())
+        self.assertTrue(utils.storage.exists(orphan_path))
+
+        out = StringIO()
+        call_command('deleteckeditororphans', grace_period=0, batch_size=1, stdout=out)
+        self.assertIn('Deleted 1 orphaned uploads', out.getvalue())
+        self.assertFalse(utils.storage.exists(orphan_path))
+        self.assertFalse(utils.storage.exists(thumbnail_path))
+        self.assertTrue(utils.storage.exists(path))
+        self.assertTrue(utils.storage.exists(utils.get_thumb_filename(path)))
+
+    def test_requires_references(self):
+        with override_settings(CKEDITOR_UPLOAD_REFERENCES=False):
+            with self.assertRaises(CommandError):
+                call_command('deleteckeditororphans', stdout=StringIO())
@@ -0,0 +1,147 @@
+from __future__ import absolute_import, unicode_literals
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import override_settings
+
+from ckeditor import sanitizer
+from ckeditor.fields import CanonicalHTML, RichTextFormField
+from ckeditor.sanitizer import canonicalize
+from ckeditor_uploader.fields import RichTextUploadingFormField
+from ckeditor_uploader.widgets import CKEditorUploadingWidget
+
+from ..models import ExampleNonUploadModel
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+CONFIGS = {
+    'default': {},
+    'word': {'allowedContent': 'p; span{font-size}'},
+    'links': {'allowedContent': 'p; a[!href]', 'extraAllowedContent': 'span(highlight)'},
+    'all': {'allowedContent': True},
+}
+
+WORD_HTML = (
+    '<!--[if gte mso 9]><xml><w:WordDocument></w:WordDocument></xml><![endif]-->'
+    '<p class="MsoNormal" style="margin:0cm;mso-line-height-rule:exactly">'
+    '<span style="font-size:12pt;mso-bidi-font-family:Arial">Hello</span><o:p></o:p></p>'
+)
+
+
+@override_settings(CKEDITOR_CONFIGS=CONFIGS)
+class CanonicalizeTestCase(SimpleTestCase):
+
+    def assertCanonical(self, expected, html, config_name='default'):
+        result = canonicalize(html, config_name)
+        self.assertEqual(expected, result)
+        self.assertEqual(result, canonicalize(result, config_name))
+
+    def test_word_markup(self):
+        self.assertCanonical('<p><span style="font-size:12pt">Hello</span></p>', WORD_HTML, 'word')
+
+    def test_editor_markup_kept(self):
+        # Without allowedContent, only the unsafe markup is removed.
+        for html in [
+            '<p><span class="marker">a</span> <i class="fa fa-star"></i></p>',
+            '<h2 style="font-style:italic">a</h2>',
+            '<details open=""><summary>a</summary>b</details>',
+            '<figure class="image"><img class="align-left" src="/a.png" /><figcaption>a</figcaption></figure>',
+            '<iframe src="https://example.com/embed"></iframe><video controls="" src="/a.mp4"></video>',
+        ]:
+            self.assertCanonical(html, html)
+
+    def test_unsafe(self):
+        self.assertCanonical(
+            '<a>x</a><a href="https://example.com">ok</a>',
+            '<script>alert(1)</script><a href=" javascript:alert(1)" onclick="x()">x</a>'
+            '<a href="https://example.com" onmouseover="x()">ok</a>',
+        )
+        self.assertCanonical('<p style="color:red">a</p>', '<p style="color:red;width:expression(x)">a</p>', 'all')
+        self.assertCanonical(
+            '<img alt="" src="data:image/png;base64,AA" />',
+            '<img src="data:image/png;base64,AA" alt>',
+        )
+        self.assertCanonical('<details open="">a</details>', '<details open onToggle="x()">a</details>')
+
+    def test_unsafe_url_attributes(self):
+        self.assertCanonical(
+            '<iframe src="https://example.com/embed"></iframe>',
+            '<iframe src="https://example.com/embed" srcdoc="&lt;script&gt;alert(1)&lt;/script&gt;"></iframe>',
+        )
+        self.assertCanonical('<svg><a>x</a></svg>', '<svg><a xlink:href="javascript:alert(1)">x</a></svg>')
+        self.assertCanonical('<object></object>', '<object data="javascript:alert(1)"></object>')
+        self.assertCanonical(
+            '<img src="/a.png" />',
+            '<img src="/a.png" srcset="/a-2x.png 2x, javascript:alert(1) 3x">',
+        )
+        self.assertCanonical(
+            '<img src="/a.png" srcset="/a-2x.png 2x, /a-3x.png 3x" />',
+            '<img src="/a.png" srcset="/a-2x.png 2x, /a-3x.png 3x">',
+        )
+
+    def test_collapse(self):
+        self.assertCanonical(
+            '<p>Hello <b>big world</b></p><p>x<br />y&nbsp;z</p>',
+            '<p>\n  Hello   <b>big</b><span><b> world</b></span> <em></em>\n</p>\n\n<p>x<br>\n y&nbsp;z</p>',
+        )
+        self.assertCanonical('<pre>  keep\n  this</pre>', '<pre>  keep\n  this</pre>')
+        self.assertCanonical(
+            '<td style="width:20px">a &amp; b</td>',
+            '<td STYLE="width: 10px;  width:20px;height:">a &amp; b</td>',
+        )
+
+    def test_policy(self):
+        self.assertCanonical(
+            '<p><a href="/a">a</a> b <span class="highlight">c</span></p>',
+            '<div><p><a href="/a" title="t">a</a> <a name="b">b</a> <span class="highlight other">c</span></p></div>',
+            'links',
+        )
+        self.assertCanonical(
+            '<section data-x="1"><o:p>a</o:p></section>',
+            '<section data-x="1"><o:p>a</o:p></section>',
+            'all',
+        )
+        self.assertIs(sanitizer.get_policy('links'), sanitizer.get_policy('links'))
+        with override_settings(CKEDITOR_CONFIGS={'default': {'allowedContent': {'p': True}}}):
+            with self.assertRaises(ImproperlyConfigured):
+                canonicalize('<p>a</p>')
+
+    def test_form_field(self):
+        field = RichTextFormField(config_name='links', canonicalize=True)
+        value = field.clean('<p><b>a</b></p>')
+        self.assertIsInstance(value, CanonicalHTML)
+        self.assertEqual('<p>a</p>', value)
+        self.assertEqual('<p><b>a</b></p>', RichTextFormField(config_name='links').clean('<p><b>a</b></p>'))
+
+        field = RichTextUploadingFormField(canonicalize=True)
+        self.assertIsInstance(field.widget, CKEditorUploadingWidget)
+        self.assertEqual('<p>a</p>', field.clean('<p>a<span></span></p>'))
+
+
+class CanonicalizeModelTestCase(TestCase):
+
+    @override_settings(CKEDITOR_CANONICALIZE_HTML=True)
+    def test_save(self):
+        obj = ExampleNonUploadModel.objects.create(content='<p>\n<b>Hello</b><b> world</b><script>x</script></p>')
+        self.assertEqual('<p><b>Hello world</b></p>', obj.content)
+        self.assertEqual(obj.content, ExampleNonUploadModel.objects.get(pk=obj.pk).content)
+
+        # Loaded rows are not canonicalized again unless their content changes.
+        obj = ExampleNonUploadModel.objects.get(pk=obj.pk)
+        with mock.patch('ckeditor.fields.canonicalize', wraps=canonicalize) as patched:
+            obj.save()
+        self.assertFalse(patched.called)
+
+        form_field = ExampleNonUploadModel._meta.get_field('content').formfield()
+        obj.content = form_field.clean('<p>a<script>x</script></p>')
+        with mock.patch('ckeditor.fields.canonicalize', wraps=canonicalize) as patched:
+            obj.save()
+        self.assertFalse(patched.called)
+        self.assertEqual('<p>a</p>', ExampleNonUploadModel.objects.get(pk=obj.pk).content)
+
+    def test_disabled(self):
+        obj = ExampleNonUploadModel.objects.create(content=WORD_HTML)
+        self.assertEqual(WORD_HTML, ExampleNonUploadModel.objects.get(pk=obj.pk).content)
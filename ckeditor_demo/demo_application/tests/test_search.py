@@ -0,0 +1,92 @@
+from __future__ import absolute_import, unicode_literals
+
+import json
+
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import override_settings
+
+from ckeditor_uploader import index, search
+from ckeditor_uploader.models import UploadedFile, UploadedFileTrigram
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+try:
+    from django.urls import reverse
+except ImportError:
+    from django.core.urlresolvers import reverse
+
+PATHS = [
+    'uploads/1/2019/holiday-beach.jpg',
+    'uploads/1/2020/beach-party.png',
+    'uploads/1/2020/report.pdf',
+    'uploads/1/reports/summary.pdf',
+    'uploads/2/2020/beach.jpg',
+]
+
+
+class ParseQueryTestCase(SimpleTestCase):
+
+    def test_parse(self):
+        query = search.parse_query('Beach  ext:JPG,.png rep* *')
+        self.assertEqual(['beach'], query.terms)
+        self.assertEqual(['rep'], query.prefixes)
+        self.assertEqual(['jpg', 'png'], query.extensions)
+        self.assertFalse(search.parse_query('  '))
+
+    def test_matches(self):
+        self.assertTrue(search.matches(PATHS[0], 'day-b', '1'))
+        self.assertTrue(search.matches(PATHS[0], '2019/ ext:jpg', '1'))
+        self.assertFalse(search.matches(PATHS[0], 'uploads', '1'))
+        self.assertFalse(search.matches(PATHS[0], 'beach*', '1'))
+        self.assertTrue(search.matches(PATHS[1], 'beach*', '1'))
+
+
+@override_settings(CKEDITOR_UPLOAD_INDEX=True)
+class IndexedSearchTestCase(TestCase):
+    fixtures = ['test_admin.json']
+
+    def setUp(self):
+        for path in PATHS:
+            index.add_file(path, index.get_user_path_from_path(path))
+
+    def search(self, query, user_path='1'):
+        queryset = search.filter_files(index.get_user_files(user_path), query, user_path)
+        return list(queryset.values_list('path', flat=True))
+
+    def test_substring(self):
+        self.assertEqual([PATHS[0], PATHS[1]], self.search('beach'))
+        self.assertEqual([PATHS[0]], self.search('DAY-BEA'))
+        self.assertEqual([PATHS[2], PATHS[3]], self.search('rep'))
+        self.assertEqual([PATHS[1], PATHS[2]], self.search('2020/'))
+        self.assertEqual([PATHS[4]], self.search('beach', '2'))
+        self.assertEqual([], self.search('beaches'))
+
+    def test_short_term(self):
+        self.assertEqual([PATHS[0], PATHS[1]], self.search('ea'))
+
+    def test_prefix_and_extension(self):
+        self.assertEqual([PATHS[1]], self.search('beach*'))
+        self.assertEqual([PATHS[2], PATHS[3]], self.search('ext:pdf'))
+        self.assertEqual([PATHS[0], PATHS[1]], self.search('ext:jpg,png'))
+        self.assertEqual([PATHS[3]], self.search('ext:pdf sum*'))
+
+    def test_index_maintained(self):
+        entry = UploadedFile.objects.get(path=PATHS[2])
+        self.assertEqual('2020/report.pdf', entry.search_path)
+        self.assertEqual(len(search.get_trigrams(entry.search_path)), entry.trigrams.count())
+
+        index.remove_file(PATHS[2])
+        self.assertFalse(UploadedFileTrigram.objects.filter(uploaded_file=entry).exists())
+        self.assertEqual([PATHS[3]], self.search('rep'))
+
+    def test_browse_search(self):
+        self.client.login(username='test', password='test')
+        with mock.patch('ckeditor_uploader.views.walk_storage', side_effect=AssertionError('storage listed')):
+            response = self.client.get(reverse('ckeditor_browse_json'), {'q': 'beach ext:png'})
+            self.assertEqual([PATHS[1]], [f['path'] for f in json.loads(response.content)['files']])
+
+            response = self.client.post(reverse('ckeditor_browse'), {'q': 'holiday'})
+            self.assertEqual([PATHS[0]], [f['path'] for f in response.context['files']])
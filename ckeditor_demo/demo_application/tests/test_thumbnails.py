@@ -0,0 +1,92 @@
+from __future__ import absolute_import, unicode_literals
+
+import os.path
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from PIL import Image
+
+from ckeditor_uploader import index
+from ckeditor_uploader.models import UploadedFile
+from ckeditor_uploader.utils import get_thumb_filename, storage
+
+ROOT = 'uploads/thumbnails-test/'
+IMAGES = [ROOT + 'a.jpg', ROOT + '2020/b.png']
+
+
+def make_image(size=(400, 200)):
+    data = BytesIO()
+    Image.new('RGB', size, (200, 100, 50)).save(data, format='PNG')
+    return ContentFile(data.getvalue())
+
+
+def run_command(*args):
+    out = StringIO()
+    call_command('generateckeditorthumbnails', *args, stdout=out)
+    return out.getvalue()
+
+
+@override_settings(CKEDITOR_IMAGE_BACKEND='pillow', CKEDITOR_THUMBNAIL_SIZE=(50, 50),
+                   CKEDITOR_UPLOAD_PATH=ROOT)
+class GenerateThumbnailsTestCase(TestCase):
+
+    def setUp(self):
+        self.tearDown()
+        for path in IMAGES:
+            storage.save(path, make_image())
+        storage.save(ROOT + 'notes.txt', ContentFile(b'notes'))
+
+    def tearDown(self):
+        shutil.rmtree(storage.path(ROOT), ignore_errors=True)
+
+    def test_missing_thumbnails(self):
+        out = run_command('--workers', '2')
+        self.assertIn('Processed 2 images (2 created, 0 existing, 0 failed)', out)
+        for path in IMAGES:
+            with Image.open(storage.path(get_thumb_filename(path))) as image:
+                self.assertEqual((50, 25), image.size)
+
+        self.assertIn('Processed 2 images (0 created, 2 existing, 0 failed)', run_command())
+
+    def test_process_pool(self):
+        self.assertIn('2 created', run_command('--processes', '--workers', '1'))
+        self.assertTrue(storage.exists(get_thumb_filename(IMAGES[0])))
+
+    def test_resume_from_checkpoint(self):
+        checkpoint_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, checkpoint_dir)
+        checkpoint = os.path.join(checkpoint_dir, 'checkpoint')
+        with open(checkpoint, 'w') as fp:
+            fp.write('%s\n' % IMAGES[0])
+
+        out = run_command('--checkpoint', checkpoint, '--batch-size', '1')
+        self.assertIn('Resuming, 1 images already processed', out)
+        self.assertIn('Processed 1 images (1 created', out)
+        self.assertFalse(storage.exists(get_thumb_filename(IMAGES[0])))
+        self.assertTrue(storage.exists(get_thumb_filename(IMAGES[1])))
+        self.assertFalse(os.path.exists(checkpoint))
+
+    @override_settings(CKEDITOR_UPLOAD_INDEX=True)
+    def test_index_size_changed(self):
+        run_command()
+        for path in IMAGES:
+            index.add_file(path, '', thumbnail_path=get_thumb_filename(path))
+        self.assertEqual({'50x50'}, set(UploadedFile.objects.values_list('thumbnail_size', flat=True)))
+
+        with override_settings(CKEDITOR_THUMBNAIL_SIZE=(20, 20)):
+            UploadedFile.objects.filter(path=IMAGES[1]).update(thumbnail_size='')
+            out = run_command()
+            self.assertIn('Processed 1 images (1 created', out)
+            entry = UploadedFile.objects.get(path=IMAGES[0])
+            self.assertEqual('20x20', entry.thumbnail_size)
+            self.assertEqual(get_thumb_filename(IMAGES[0]), entry.thumbnail_path)
+            with Image.open(storage.path(entry.thumbnail_path)) as image:
+                self.assertEqual((20, 10), image.size)
+
+            self.assertIn('Processed 0 images', run_command())
@@ -0,0 +1,137 @@
+from __future__ import absolute_import, unicode_literals
+
+import json
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import override_settings
+
+from PIL import Image
+
+from ckeditor_uploader import derivatives
+from ckeditor_uploader.backends import pillow_transforms
+from ckeditor_uploader.utils import storage
+
+from .utils import remove_user_upload_directory
+
+try:
+    from django.urls import reverse
+except ImportError:
+    from django.core.urlresolvers import reverse
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+PATH = 'uploads/1/photo.jpg'
+
+
+def make_image(size=(400, 200)):
+    data = BytesIO()
+    Image.new('RGB', size, (200, 100, 50)).save(data, format='JPEG')
+    return data.getvalue()
+
+
+def open_response(response):
+    return Image.open(BytesIO(b''.join(response.streaming_content)))
+
+
+class TransformImageTestCase(SimpleTestCase):
+
+    def transform(self, width, height, fit):
+        data = pillow_transforms.transform_image(make_image(), width, height, fit, 'PNG', 75)
+        return Image.open(BytesIO(data))
+
+    def test_contain(self):
+        self.assertEqual((100, 50), self.transform(100, 100, 'contain').size)
+        self.assertEqual((200, 100), self.transform(0, 100, 'contain').size)
+
+    def test_cover(self):
+        self.assertEqual((100, 100), self.transform(100, 100, 'cover').size)
+        self.assertEqual((300, 200), self.transform(300, 300, 'cover').size)
+
+    def test_not_enlarged(self):
+        self.assertEqual((400, 200), self.transform(800, 800, 'contain').size)
+
+
+@override_settings(CKEDITOR_IMAGE_BACKEND='pillow')
+class TransformViewTestCase(TestCase):
+    fixtures = ['test_admin.json']
+
+    def setUp(self):
+        remove_user_upload_directory()
+        self.path = storage.save(PATH, ContentFile(make_image()))
+
+    def tearDown(self):
+        remove_user_upload_directory()
+        derivatives.delete(self.path)
+
+    def test_generated_once(self):
+        url = derivatives.get_url(self.path, 100, 100, 'cover', 'PNG')
+        self.assertEqual(url, derivatives.get_url(self.path, 100, 100, 'cover', 'PNG'))
+
+        response = self.client.get(url)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('image/png', response['Content-Type'])
+        with open_response(response) as image:
+            self.assertEqual((100, 100), image.size)
+        etag = response['ETag']
+
+        with mock.patch('ckeditor_uploader.backends.pillow_transforms.transform_image') as transform_image:
+            self.assertEqual(200, self.client.get(url).status_code)
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertFalse(transform_image.called)
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(etag, response['ETag'])
+
+    def test_invalid_signature(self):
+        url = derivatives.get_url(self.path, 100, 100)
+        self.assertEqual(403, self.client.get(url.replace('/transform/', '/transform/x')).status_code)
+        self.assertEqual(404, self.client.get(derivatives.get_url('uploads/1/missing.jpg', 100)).status_code)
+
+    def test_source_rewritten(self):
+        url = derivatives.get_url(self.path, 500)
+        response = self.client.get(url)
+        with open_response(response) as image:
+            self.assertEqual((400, 200), image.size)
+        etag = response['ETag']
+        self.assertNotIn('immutable', response['Cache-Control'])
+
+        storage.delete(self.path)
+        storage.save(self.path, ContentFile(make_image((300, 100))))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(200, response.status_code)
+        self.assertNotEqual(etag, response['ETag'])
+        with open_response(response) as image:
+            self.assertEqual((300, 100), image.size)
+
+    def test_invalid_image(self):
+        path = storage.save('uploads/1/broken.jpg', ContentFile(make_image()[:100]))
+        response = self.client.get(derivatives.get_url(path, 50))
+        self.assertEqual(404, response.status_code)
+        self.assertEqual('Invalid image.', json.loads(response.content)['error'])
+
+    def test_deleted_with_image(self):
+        url = derivatives.get_url(self.path, 50)
+        self.client.get(url).close()
+        derivative_path = derivatives.get_derivative_path(
+            derivatives.get_params(self.path, 50), derivatives.get_source_version(self.path))
+        self.assertTrue(storage.exists(derivative_path))
+
+        self.client.login(username='test', password='test')
+        self.client.delete('%s?path=%s' % (reverse('ckeditor_delete'), self.path))
+        self.assertFalse(storage.exists(derivative_path))
+
+    @override_settings(CKEDITOR_IMAGE_TRANSFORMS=True, CKEDITOR_BROWSE_THUMBNAIL_SIZE=(60, 60))
+    def test_browse_thumbnails(self):
+        self.client.login(username='test', password='test')
+        files = json.loads(self.client.get(reverse('ckeditor_browse_json')).content)['files']
+        self.assertEqual([self.path], [f['path'] for f in files])
+        self.assertEqual(derivatives.get_url(self.path, 60, 60), files[0]['thumb'])
+        self.assertNotIn(settings.MEDIA_URL, files[0]['thumb'])
+
+        with open_response(self.client.get(files[0]['thumb'])) as image:
+            self.assertEqual((60, 30), image.size)
@@ -0,0 +1,116 @@
+from __future__ import absolute_import, unicode_literals
+
+import hashlib
+import zlib
+from io import BytesIO
+
+from django.contrib.staticfiles.finders import find
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import StopUpload
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from PIL import Image
+
+from ckeditor_uploader.upload_handlers import UploadInspectionHandler
+
+from .utils import UploadTestCase
+
+
+def inspect(data, chunk_size=UploadInspectionHandler.chunk_size):
+    handler = UploadInspectionHandler()
+    handler.new_file('upload', 'file', 'application/octet-stream', None)
+    for start in range(0, len(data), chunk_size):
+        handler.receive_data_chunk(data[start:start + chunk_size], start)
+    handler.file_complete(len(data))
+    return handler.get_info('upload')
+
+
+def png_header(width, height):
+    image = BytesIO()
+    Image.new('L', (1, 1)).save(image, format='PNG')
+    data = bytearray(image.getvalue())
+    # Patch the IHDR chunk size, the pixels are never decoded.
+    data[16:24] = width.to_bytes(4, 'big') + height.to_bytes(4, 'big')
+    data[29:33] = zlib.crc32(bytes(data[12:29])).to_bytes(4, 'big')
+    return bytes(data)
+
+
+def padded_jpeg(size):
+    image = BytesIO()
+    Image.new('L', size).save(image, format='JPEG')
+    data = image.getvalue()
+    # Two APP15 segments push the frame header, and the image size, past HEAD_SIZE.
+    segment = b'\xff\xef' + (65000).to_bytes(2, 'big') + b'\x00' * 64998
+    return data[:2] + segment * 2 + data[2:]
+
+
+class UploadInspectionHandlerTestCase(TestCase):
+
+    def test_image(self):
+        with open(find('ckeditor/ckeditor/plugins/codesnippet/lib/highlight/styles/pojoaque.jpg'), 'rb') as fp:
+            data = fp.read()
+        info = inspect(data, chunk_size=100)
+        self.assertEqual('image', info.kind)
+        self.assertEqual('JPEG', info.format)
+        self.assertTrue(info.is_image)
+        self.assertTrue(info.width and info.height)
+        self.assertEqual(len(data), info.size)
+        self.assertEqual(hashlib.sha256(data).hexdigest(), info.content_hash)
+
+    def test_video(self):
+        info = inspect(b'\x00\x00\x00\x18ftypmp42' + b'\x00' * 1000)
+        self.assertEqual('video', info.kind)
+        self.assertFalse(info.is_image)
+
+    def test_file(self):
+        info = inspect(b'just some text')
+        self.assertEqual('file', info.kind)
+        self.assertFalse(info.is_image)
+
+    @override_settings(CKEDITOR_UPLOAD_MAX_SIZE={'video': 1000})
+    def test_size_limit_stops_upload(self):
+        handler = UploadInspectionHandler()
+        handler.new_file('upload', 'file.mp4', 'video/mp4', None)
+        handler.receive_data_chunk(b'\x00\x00\x00\x18ftypmp42' + b'\x00' * 500, 0)
+        with self.assertRaises(StopUpload) as context:
+            handler.receive_data_chunk(b'\x00' * 500, 508)
+        self.assertFalse(context.exception.connection_reset)
+        self.assertEqual('File too large.', handler.error)
+
+    @override_settings(CKEDITOR_UPLOAD_MAX_PIXELS=10 ** 6)
+    def test_pixel_limit_stops_upload(self):
+        with self.assertRaises(StopUpload):
+            inspect(png_header(2000, 2000))
+        info = inspect(png_header(10, 10))
+        self.assertEqual((10, 10), (info.width, info.height))
+
+
+class UploadInspectionViewTestCase(UploadTestCase):
+
+    @override_settings(CKEDITOR_UPLOAD_MAX_SIZE={'file': 100})
+    def test_oversized_upload_rejected(self):
+        self.assertEqual({'uploaded': '0', 'error': {'message': 'File too large.'}},
+                         self.upload('ckeditor/ckeditor/LICENSE.md'))
+
+    @override_settings(CKEDITOR_IMAGE_BACKEND='pillow')
+    def test_corrupt_image_body(self):
+        # The header is valid, the truncated body is found when the image is verified.
+        with open(find('ckeditor/ckeditor/skins/moono/images/hidpi/close.png'), 'rb') as fp:
+            data = fp.read()
+        upload = SimpleUploadedFile('close.png', data[:len(data) // 2], content_type='image/png')
+        self.assertEqual('1', self.upload(upload)['uploaded'])
+        with override_settings(CKEDITOR_ALLOW_NONIMAGE_FILES=False):
+            upload = SimpleUploadedFile('close.png', data[:len(data) // 2], content_type='image/png')
+            response = self.post_upload(upload)
+        self.assertIn(b'Invalid file type.', response.content)
+
+    @override_settings(CKEDITOR_UPLOAD_MAX_PIXELS=10 ** 6, CKEDITOR_IMAGE_BACKEND='pillow')
+    def test_pixel_limit_after_metadata(self):
+        data = padded_jpeg((3000, 3000))
+        self.assertIsNone(inspect(data).width)
+        upload = SimpleUploadedFile('padded.jpg', data, content_type='image/jpeg')
+        self.assertEqual({'uploaded': '0', 'error': {'message': 'Image too large.'}}, self.upload(upload))
+
+        upload = SimpleUploadedFile('padded.jpg', padded_jpeg((300, 300)), content_type='image/jpeg')
+        self.assertEqual('1', self.upload(upload)['uploaded'])
@@ -0,0 +1,80 @@
+from __future__ import absolute_import, unicode_literals
+
+import json
+import os.path
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test.utils import override_settings
+
+from PIL import Image
+
+from ckeditor_uploader import utils
+
+from .utils import UploadTestCase
+
+try:
+    from django.urls import reverse
+except ImportError:
+    from django.core.urlresolvers import reverse
+
+
+def make_upload(size=(800, 600)):
+    data = BytesIO()
+    Image.new('RGB', size, (200, 100, 50)).save(data, format='JPEG')
+    return SimpleUploadedFile('photo.jpg', data.getvalue(), content_type='image/jpeg')
+
+
+@override_settings(CKEDITOR_IMAGE_BACKEND='pillow')
+class ImageVariantsTestCase(UploadTestCase):
+
+    def get_path(self, url):
+        return url[len(settings.MEDIA_URL):]
+
+    @override_settings(CKEDITOR_IMAGE_VARIANTS=[400, 200, 2000])
+    def test_upload_creates_variants(self):
+        data = self.upload(make_upload())
+        self.assertEqual(['200', '400'], sorted(data['variants']))
+        path = self.get_path(data['url'])
+        for width in (200, 400):
+            variant_path = self.get_path(data['variants'][str(width)])
+            self.assertEqual(utils.get_variant_filename(path, width), variant_path)
+            with Image.open(os.path.join(settings.MEDIA_ROOT, variant_path)) as image:
+                self.assertEqual((width, width * 3 // 4), image.size)
+
+        files = json.loads(self.client.get(reverse('ckeditor_browse_json')).content)['files']
+        self.assertEqual([path], [f['path'] for f in files])
+
+        # A file of the user named like a variant of a width not configured is kept.
+        own_path = utils.storage.save(utils.get_variant_filename(path, 300), make_upload())
+        self.assertEqual(
+            [utils.get_variant_filename(path, 400), utils.get_variant_filename(path, 200)],
+            utils.find_variant_filenames(path),
+        )
+        response = self.client.delete('%s?path=%s' % (reverse('ckeditor_delete'), path))
+        self.assertEqual({'success': 1}, json.loads(response.content))
+        for width in (200, 400):
+            self.assertFalse(utils.storage.exists(utils.get_variant_filename(path, width)))
+        self.assertTrue(utils.storage.exists(own_path))
+
+    def test_no_variants_configured(self):
+        self.assertNotIn('variants', self.upload(make_upload()))
+        self.assertFalse(utils.is_variant_filename('uploads/1/logo_w200.png'))
+        with override_settings(CKEDITOR_IMAGE_VARIANTS=[200]):
+            self.assertTrue(utils.is_variant_filename('uploads/1/logo_w200.png'))
+            self.assertFalse(utils.is_variant_filename('uploads/1/logo_w300.png'))
+
+    def test_backfill_command(self):
+        path = self.get_path(self.upload(make_upload())['url'])
+        with override_settings(CKEDITOR_IMAGE_VARIANTS=[300]):
+            out = StringIO()
+            call_command('generateckeditorvariants', stdout=out)
+            # Other tests may leave images in the upload directory.
+            self.assertIn('Creating variants for %s' % path, out.getvalue())
+            self.assertTrue(utils.storage.exists(utils.get_variant_filename(path, 300)))
+
+            out = StringIO()
+            call_command('generateckeditorvariants', stdout=out)
+            self.assertNotIn('Creating variants for %s' % path, out.getvalue())
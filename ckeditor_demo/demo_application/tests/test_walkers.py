@@ -0,0 +1,78 @@
+from __future__ import absolute_import, unicode_literals
+
+import os.path
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.test import SimpleTestCase
+from django.test.utils import override_settings
+
+from ckeditor_uploader import walkers
+from ckeditor_uploader.utils import storage
+
+from .utils import get_absolute_name, remove_user_upload_directory
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+ROOT = os.path.join('uploads', 'walker-test')
+FILES = [
+    os.path.join(ROOT, 'a.png'),
+    os.path.join(ROOT, 'a_thumb.png'),
+    os.path.join(ROOT, '2019', 'b.pdf'),
+    os.path.join(ROOT, '2020', 'c.jpg'),
+    os.path.join(ROOT, '2020', 'sub', 'd.mp4'),
+]
+HIDDEN_FILES = [
+    os.path.join(ROOT, '.hidden'),
+    os.path.join(ROOT, '.cache', 'e.png'),
+]
+
+
+class CustomWalker(walkers.BaseWalker):
+    pass
+
+
+class WalkerTestCase(SimpleTestCase):
+
+    def setUp(self):
+        remove_user_upload_directory('walker-test')
+        for name in FILES + HIDDEN_FILES:
+            storage.save(name, ContentFile(b'content'))
+
+    def tearDown(self):
+        remove_user_upload_directory('walker-test')
+
+    def test_filesystem_walker(self):
+        self.assertEqual(sorted(FILES), sorted(walkers.FileSystemWalker(storage).walk(ROOT)))
+
+    def test_listdir_walker(self):
+        self.assertEqual(sorted(FILES), sorted(walkers.ListdirWalker(storage, max_workers=2).walk(ROOT)))
+
+    def test_missing_directory(self):
+        missing = os.path.join(ROOT, 'missing')
+        self.assertEqual([], list(walkers.FileSystemWalker(storage).walk(missing)))
+        self.assertEqual([], list(walkers.ListdirWalker(storage).walk(missing)))
+
+    def test_prefix_walker(self):
+        fake_storage = mock.Mock(spec=['bucket', '_normalize_name'])
+        fake_storage._normalize_name.side_effect = lambda name: 'media/' + name
+        keys = ['media/' + name.replace(os.sep, '/') for name in FILES + HIDDEN_FILES]
+        keys.append('media/%s/2021/' % ROOT.replace(os.sep, '/'))
+        fake_storage.bucket.objects.filter.return_value = [mock.Mock(key=key) for key in keys]
+
+        walked = list(walkers.S3PrefixWalker(fake_storage).walk(ROOT))
+
+        fake_storage.bucket.objects.filter.assert_called_once_with(Prefix='media/uploads/walker-test/')
+        self.assertEqual(sorted(FILES), sorted(walked))
+
+    def test_walker_selection(self):
+        self.assertIs(walkers.FileSystemWalker, walkers.get_walker_class(storage))
+        self.assertIs(walkers.FileSystemWalker, walkers.get_walker_class(FileSystemStorage()))
+        self.assertIs(walkers.ListdirWalker, walkers.get_walker_class(mock.Mock()))
+
+    @override_settings(CKEDITOR_STORAGE_WALKER=get_absolute_name(CustomWalker))
+    def test_walker_setting(self):
+        self.assertIs(CustomWalker, walkers.get_walker_class(storage))
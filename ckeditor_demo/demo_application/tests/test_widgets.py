@@ -0,0 +1,199 @@
+from __future__ import absolute_import, unicode_literals
+
+import copy
+import json
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase
+from django.test.utils import override_settings
+from django.utils import translation
+from django.utils.html import escape
+
+from ckeditor import widgets
+from ckeditor.widgets import CKEditorWidget, get_resolved_config
+from ckeditor_uploader.widgets import CKEditorUploadingWidget
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+try:
+    from django.urls import reverse
+except ImportError:
+    from django.core.urlresolvers import reverse
+
+CONFIGS = {
+    'default': {'toolbar': 'Basic', 'extra_plugins': ['codesnippet'], 'external_plugin_resources': [
+        ['myplugin', '/static/myplugin/', 'plugin.js'],
+    ]},
+    'small': {'height': 100},
+}
+
+
+def get_rendered_config(widget):
+    html = widget.render('content', '', {'id': 'id_content'})
+    data = html.split('data-config="', 1)[1].split('"', 1)[0]
+    return json.loads(data.replace('&quot;', '"').replace('&amp;', '&'))
+
+
+@override_settings(CKEDITOR_CONFIGS=CONFIGS)
+class CKEditorWidgetTestCase(SimpleTestCase):
+
+    def test_shared_config(self):
+        widget = CKEditorWidget()
+        self.assertIs(widget._resolved_config, CKEditorWidget()._resolved_config)
+        self.assertIsNot(widget._resolved_config, CKEditorWidget(config_name='small')._resolved_config)
+        with self.assertRaises(TypeError):
+            widget._resolved_config.config['height'] = 1
+
+        self.assertEqual('codesnippet', widget.config['extraPlugins'])
+        self.assertNotIn('extra_plugins', widget.config)
+        self.assertEqual(['myplugin', '/static/myplugin/', 'plugin.js'], list(widget.external_plugin_resources[0]))
+        self.assertEqual('other', CKEditorWidget(extra_plugins=['other']).config['extraPlugins'])
+
+    def test_render_language(self):
+        widget = CKEditorWidget()
+        with translation.override('fr'):
+            config = get_rendered_config(widget)
+        self.assertEqual('fr', config['language'])
+        self.assertEqual('Basic', config['toolbar'])
+        with translation.override('zh-hans'):
+            self.assertEqual('zh-cn', get_rendered_config(widget)['language'])
+        # Rendering does not copy the configuration.
+        self.assertIsNone(widget._config)
+
+    def test_changed_config(self):
+        widget = CKEditorWidget()
+        widget.config['height'] = 500
+        copied = copy.deepcopy(widget)
+        copied.config['height'] = 600
+        self.assertEqual(500, get_rendered_config(widget)['height'])
+        self.assertEqual(600, get_rendered_config(copied)['height'])
+        self.assertEqual(291, get_rendered_config(CKEditorWidget())['height'])
+
+    def test_deepcopy_shares_config(self):
+        widget = CKEditorWidget(attrs={'class': 'rich'})
+        copied = copy.deepcopy(widget)
+        self.assertIs(widget._resolved_config, copied._resolved_config)
+        copied.attrs['class'] = 'other'
+        self.assertEqual('rich', widget.attrs['class'])
+
+    def test_setting_changed(self):
+        resolved = get_resolved_config('small')
+        with override_settings(CKEDITOR_CONFIGS={'small': {'height': 200}}):
+            self.assertEqual(200, CKEditorWidget(config_name='small').config['height'])
+        self.assertIsNot(resolved, get_resolved_config('small'))
+
+        with override_settings(CKEDITOR_CONFIGS={'default': []}):
+            with self.assertRaises(ImproperlyConfigured):
+                CKEditorWidget()
+        with self.assertRaises(ImproperlyConfigured):
+            CKEditorWidget(config_name='missing')
+
+    def test_uploading_widget(self):
+        config = get_rendered_config(CKEditorUploadingWidget())
+        self.assertEqual(reverse('ckeditor_upload'), config['filebrowserUploadUrl'])
+        self.assertEqual(reverse('ckeditor_browse'), config['filebrowserBrowseUrl'])
+
+        with override_settings(CKEDITOR_CONFIGS={'default': {'filebrowserBrowseUrl': '/browse/'}}):
+            config = get_rendered_config(CKEditorUploadingWidget())
+            self.assertEqual('/browse/', config['filebrowserBrowseUrl'])
+            self.assertEqual(reverse('ckeditor_upload'), config['filebrowserUploadUrl'])
+
+    def test_legacy_set_config(self):
+        class LegacyWidget(CKEditorWidget):
+            def _set_config(self):
+                super(LegacyWidget, self)._set_config()
+                self.config['height'] = 42
+
+        self.assertEqual(42, get_rendered_config(LegacyWidget())['height'])
+        self.assertNotIn(escape('"height": 42'), CKEditorWidget().render('content', '', {'id': 'id_content'}))
+
+    def test_memoized_json(self):
+        widget = CKEditorUploadingWidget()
+        html = widget.render('content', '', {'id': 'id_content'})
+        with mock.patch('ckeditor.widgets.json_encode', wraps=widgets.json_encode) as json_encode:
+            for i in range(3):
+                self.assertEqual(html, copy.deepcopy(widget).render('content', '', {'id': 'id_content'}))
+            self.assertFalse(json_encode.called)
+            with translation.override('de'):
+                widget.render('content', '', {'id': 'id_content'})
+            self.assertEqual(1, json_encode.call_count)
+
+    def test_lazy_media(self):
+        media = str(CKEditorWidget().media)
+        self.assertIn('ckeditor/ckeditor/ckeditor.js', media)
+        self.assertNotIn('data-lazy', media)
+        with override_settings(CKEDITOR_LAZY_INIT=True):
+            js = CKEditorWidget().media._js
+        self.assertEqual(1, len(js))
+        self.assertEqual('true', js[0].attrs['data-lazy'])
+        self.assertEqual('/static/ckeditor/ckeditor/ckeditor.js', js[0].attrs['data-ckeditor-script'])
+
+    @override_settings(CKEDITOR_RENDER_WITHOUT_TEMPLATE=True)
+    def test_render_without_template(self):
+        widget = CKEditorUploadingWidget(attrs={'class': 'a"b'})
+        value = '<p>Caf\xe9 & "tea"</p>'
+        html = widget.render('content', value, {'id': 'id_content'})
+        with override_settings(CKEDITOR_RENDER_WITHOUT_TEMPLATE=False):
+            self.assertEqual(widget.render('content', value, {'id': 'id_content'}), html)
+
+
+@override_settings(CKEDITOR_CONFIGS=CONFIGS, CKEDITOR_CONFIG_SCRIPTS=True)
+class ConfigScriptTestCase(SimpleTestCase):
+
+    def get_script_url(self, widget):
+        # The config script follows ckeditor-init.js and ckeditor.js.
+        return widget.media._js[2]
+
+    def test_render(self):
+        widget = CKEditorUploadingWidget()
+        html = widget.render('content', '', {'id': 'id_content'})
+        self.assertNotIn('data-config=', html)
+        self.assertIn('data-config-name="default"', html)
+        token, version = widget.get_config_script()
+        self.assertIn('data-config-version="%s"' % version, html)
+        self.assertEqual(reverse('ckeditor_config_script', args=[token, version]), self.get_script_url(widget))
+
+        with override_settings(CKEDITOR_RENDER_WITHOUT_TEMPLATE=True):
+            self.assertEqual(html, widget.render('content', '', {'id': 'id_content'}))
+
+    def test_media_deduplicated(self):
+        media = CKEditorWidget().media + CKEditorWidget().media + CKEditorWidget(config_name='small').media
+        self.assertEqual(4, len(media._js))
+        with translation.override('fr'):
+            self.assertNotEqual(self.get_script_url(CKEditorWidget()), media._js[2])
+
+    def test_script(self):
+        widget = CKEditorUploadingWidget()
+        url = self.get_script_url(widget)
+        response = self.client.get(url)
+        self.assertEqual(200, response.status_code)
+        self.assertIn('immutable', response['Cache-Control'])
+        content = response.content.decode('utf-8')
+        version = widget.get_config_script()[1]
+        prefix = '(window.djangoCKEditorConfigs = window.djangoCKEditorConfigs || {})["%s"] = ' % version
+        self.assertTrue(content.startswith(prefix))
+        data = json.loads(content[len(prefix):].rstrip().rstrip(';'))
+        self.assertEqual(json.loads(widget.get_config_json()), data['config'])
+        self.assertEqual(reverse('ckeditor_upload'), data['config']['filebrowserUploadUrl'])
+        self.assertEqual([['myplugin', '/static/myplugin/', 'plugin.js']], data['externalPluginResources'])
+
+        with override_settings(CKEDITOR_CONFIGS={'default': {'height': 10}}):
+            response = self.client.get(url)
+        self.assertEqual('no-cache', response['Cache-Control'])
+        self.assertEqual(403, self.client.get(url.replace('/config/', '/config/x')).status_code)
+
+    def test_widget_resources(self):
+        resources = [['other', '/static/other/', 'plugin.js']]
+        widget = CKEditorWidget(external_plugin_resources=resources)
+        self.assertNotEqual(CKEditorWidget().get_config_script(), widget.get_config_script())
+        content = self.client.get(self.get_script_url(widget)).content.decode('utf-8')
+        self.assertIn(json.dumps(resources), content)
+
+    def test_changed_config_inline(self):
+        widget = CKEditorWidget()
+        widget.config['height'] = 500
+        self.assertEqual(500, get_rendered_config(widget)['height'])
+        self.assertEqual(2, len(widget.media._js))
@@ -1,11 +1,21 @@
 from __future__ import absolute_import, unicode_literals
 
 import hashlib
+import json
 import os.path
 import shutil
 from datetime import datetime
 
 from django.conf import settings
+from django.contrib.staticfiles.finders import find
+from django.test import TestCase
+
+try:
+    from django.urls import reverse
+except ImportError:
+    from django.core.urlresolvers import reverse
+
+IMAGE = 'ckeditor/ckeditor/plugins/codesnippet/lib/highlight/styles/pojoaque.jpg'
 
 
 def get_upload_directory():
@@ -47,3 +57,36 @@ def get_absolute_media_path(fname):
 
 def get_absolute_name(class_or_function):
     return '%s.%s' % (class_or_function.__module__, class_or_function.__name__)
+
+
+def get_user_upload_directory(user_path='1'):
+    return os.path.join(settings.MEDIA_ROOT, settings.CKEDITOR_UPLOAD_PATH, user_path)
+
+
+def remove_user_upload_directory(user_path='1'):
+    shutil.rmtree(get_user_upload_directory(user_path), ignore_errors=True)
+
+
+class UploadTestCase(TestCase):
+    """
+    Logged in as the user of the fixture, whose upload directory is removed
+    before and after each test.
+    """
+    fixtures = ['test_admin.json']
+
+    def setUp(self):
+        remove_user_upload_directory()
+        self.client.login(username='test', password='test')
+
+    def tearDown(self):
+        remove_user_upload_directory()
+
+    def post_upload(self, upload=IMAGE):
+        # An uploaded file, or the path of a static file.
+        if isinstance(upload, str):
+            with open(find(upload), 'rb') as fp:
+                return self.client.post(reverse('ckeditor_upload'), {'upload': fp})
+        return self.client.post(reverse('ckeditor_upload'), {'upload': upload})
+
+    def upload(self, upload=IMAGE):
+        return json.loads(self.post_upload(upload).content)
@@ -11,6 +11,7 @@ urlpatterns = [
     re_path(r'^$', ckeditor_form_view, name='ckeditor-form'),
     re_path(r'^admin/', admin.site.urls),
     re_path(r'^ckeditor/', include('ckeditor_uploader.urls')),
+    re_path(r'^ckeditor/', include('ckeditor.urls')),
 ] + static(
     settings.STATIC_URL,
     document_root=settings.STATIC_ROOT
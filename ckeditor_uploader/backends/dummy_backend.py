@@ -9,6 +9,7 @@ class DummyBackend(object):
     def __init__(self, storage_engine, file_object):
         self.file_object = file_object
         self.storage_engine = storage_engine
+        self.thumbnail_path = ''
 
     def save_as(self, filepath):
         return self.storage_engine.save(filepath, self.file_object)
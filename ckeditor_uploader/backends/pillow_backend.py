@@ -6,15 +6,15 @@ from io import BytesIO
 from django.conf import settings
 from django.utils.functional import cached_property
 
-from PIL import Image, ExifTags
+from PIL import Image
 
-from ckeditor_uploader import utils
+from ckeditor_uploader import processing, utils
+from ckeditor_uploader.backends import pillow_transforms
 import random
 import logging
 
 logger = logging.getLogger(getattr(settings, 'CKEDITOR_LOGGER', 'django'))
 
-THUMBNAIL_SIZE = getattr(settings, "CKEDITOR_THUMBNAIL_SIZE", (75, 75))
 IMAGE_MAX_WIDTH = getattr(settings, "CKEDITOR_IMAGE_MAX_WIDTH", 1024)
 IMAGE_MAX_HEIGHT = getattr(settings, "CKEDITOR_IMAGE_MAX_HEIGHT", 0)
 
@@ -23,74 +23,72 @@ class PillowBackend(object):
     def __init__(self, storage_engine, file_object):
         self.file_object = file_object
         self.storage_engine = storage_engine
+        self.thumbnail_path = ''
+        self.variant_paths = {}
 
     @cached_property
     def is_image(self):
+        # The header was parsed while the upload was received, only its body is verified here.
+        upload_info = getattr(self.file_object, 'upload_info', None)
+        if upload_info is not None and upload_info.is_image is False:
+            return False
+
         try:
             Image.open(BytesIO(self.file_object.read())).verify()  # verify closes the file
             return True
-        except IOError:
+        except (IOError, SyntaxError):
             return False
         finally:
             self.file_object.seek(0)
 
     def rotate_image(self, image):
-        try:
-            for orientation in ExifTags.TAGS.keys():
-                if ExifTags.TAGS[orientation] == 'Orientation':
-                    break
-
-            if hasattr(image, '_getexif') and image._getexif():
-                exif = dict(image._getexif().items())
-                if orientation in exif:
-                    logger.info("orientation key founded in exif")
-                    if exif[orientation] == 3:
-                        logger.info("rotate image 180 degrees")
-                        image = image.rotate(180, expand=True)
-                    elif exif[orientation] == 6:
-                        logger.info("rotate image 270 degrees")
-                        image = image.rotate(270, expand=True)
-                    elif exif[orientation] == 8:
-                        logger.info("rotate image 90 degrees")
-                        image = image.rotate(90, expand=True)
-            else:
-                logger.info('Image has no exif information. May be a PNG.')
-        except Exception as ex:
-            logger.warning("Error rotating image! " + str(ex))
-            pass
+        return pillow_transforms.rotate_image(image)
 
-        return image
-
-    def _compress_image(self, image):
-        # First, rotate if needed
-        image = self.rotate_image(image)
+    @staticmethod
+    def _get_formats():
+        return pillow_transforms.get_supported_formats(getattr(settings, "CKEDITOR_IMAGE_FORMATS", ['JPEG']))
 
+    def _compress_image(self, data, formats=None):
+        """
+        Return the compressed image and its format, the smallest of the
+        CKEDITOR_IMAGE_FORMATS (or ``formats``) meeting CKEDITOR_IMAGE_MIN_PSNR.
+        """
         quality = getattr(settings, "CKEDITOR_IMAGE_QUALITY", 75)
-        w, h = image.size
-        widthRatio = 1
-        heightRatio = 1
-
-        if IMAGE_MAX_WIDTH > 0:
-            widthRatio = max(w / IMAGE_MAX_WIDTH, 1)
-
-        if IMAGE_MAX_HEIGHT > 0:
-            heightRatio = max(h / IMAGE_MAX_HEIGHT, 1)
+        img_format, compressed, candidates = processing.get_processor().run(
+            pillow_transforms.compress_image, data, IMAGE_MAX_WIDTH, IMAGE_MAX_HEIGHT, quality,
+            getattr(settings, "CKEDITOR_IMAGE_REDUCED_DECODE", False),
+            formats or self._get_formats(),
+            getattr(settings, "CKEDITOR_IMAGE_MIN_PSNR", 35),
+        )
+        if len(candidates) > 1:
+            logger.info("Compressed image to %s among %s" % (img_format, ', '.join(
+                '%s (%d bytes, %.1f dB)' % candidate for candidate in candidates)))
+        return BytesIO(compressed), img_format
+
+    @staticmethod
+    def _read(file_object):
+        file_object.seek(0)
+        return file_object.read()
+
+    @staticmethod
+    def _get_unique_filepath(filepath):
+        # Add a unique ID for the file
+        unique_id = '%032x' % random.getrandbits(16 * 8)
+        filepath = "%s_%s%s" % (os.path.splitext(filepath)[0], unique_id, os.path.splitext(filepath)[1])
+        return filepath.lower()
 
-        ratio = max(widthRatio, heightRatio)
-        newWidth = int(w / ratio)
-        newHeight = int(h / ratio)
-        newSize = (newWidth, newHeight)
+    @staticmethod
+    def _is_processable(image):
+        is_animated = hasattr(image, 'is_animated') and image.is_animated
+        img_format = getattr(image, "format", None)
+        return not is_animated or img_format in ['MPO', 'JPEG', 'PNG']
 
-        image = image.resize(newSize, Image.ANTIALIAS).convert('RGB')
-        image_tmp = BytesIO()
-        image.save(image_tmp, format="JPEG", quality=quality, optimize=True)
-        return image_tmp
+    def _should_compress(self, image):
+        should_compress = getattr(settings, "CKEDITOR_FORCE_JPEG_COMPRESSION", True)
+        return should_compress and self._is_processable(image)
 
     def save_as(self, filepath):
-        # Add a unique ID for the file
-        unique_id = '%32x' % random.getrandbits(16 * 8)
-        filepath = "%s_%s%s" % (os.path.splitext(filepath)[0], unique_id, os.path.splitext(filepath)[1])
-        filepath = filepath.lower()
+        filepath = self._get_unique_filepath(filepath)
 
         if not self.is_image:
             saved_path = self.storage_engine.save(filepath, self.file_object)
@@ -98,24 +96,77 @@ class PillowBackend(object):
 
         image = Image.open(self.file_object)
 
-        should_compress = getattr(settings, "CKEDITOR_FORCE_JPEG_COMPRESSION", True)
-        is_animated = hasattr(image, 'is_animated') and image.is_animated
-        
         img_format = getattr(image, "format", None)
         logger.info("Saving image. Image format is %s" % img_format)
-        
-        if should_compress and (not is_animated or img_format in ['MPO', 'JPEG', 'PNG']):
-            logger.info("Go to compress image")
-            file_object = self._compress_image(image)
-            # Force jpg extension
-            filepath = "%s.jpg" % (os.path.splitext(filepath)[0])
-            saved_path = self.storage_engine.save(filepath, file_object)
-        else:
-            file_object = self.file_object
-            saved_path = self.storage_engine.save(filepath, self.file_object)
 
-        if not is_animated or img_format in ['MPO', 'JPEG', 'PNG']:
-            self.create_thumbnail(file_object, saved_path)
+        # Raises ProcessingBusy when the image cannot be processed now, before anything is stored.
+        with processing.get_processor().admit(image.size[0] * image.size[1]):
+            if self._should_compress(image):
+                logger.info("Go to compress image")
+                file_object, output_format = self._compress_image(self._read(self.file_object))
+                # Force the extension of the chosen format
+                filepath = "%s%s" % (os.path.splitext(filepath)[0],
+                                     pillow_transforms.FORMAT_EXTENSIONS[output_format])
+                saved_path = self.storage_engine.save(filepath, file_object)
+            else:
+                file_object = self.file_object
+                saved_path = self.storage_engine.save(filepath, self.file_object)
+
+            if self._is_processable(image):
+                self.create_thumbnail(file_object, saved_path)
+                self.create_variants(file_object, saved_path)
+
+        image.close()
+        return saved_path
+
+    def save_original(self, filepath):
+        """
+        Store the uploaded file without processing it, under the name that
+        process_saved() keeps. Used when the processing is deferred to a job.
+        """
+        filepath = self._get_unique_filepath(filepath)
+
+        if self.is_image:
+            image = Image.open(self.file_object)
+            if self._should_compress(image):
+                # The URL is returned before the image is compressed in place, so the
+                # first allowed format is used, see process_saved().
+                filepath = "%s%s" % (os.path.splitext(filepath)[0],
+                                     pillow_transforms.FORMAT_EXTENSIONS[self._get_formats()[0]])
+            # Only the header was read, the file is stored as is.
+            self.file_object.seek(0)
+
+        return self.storage_engine.save(filepath, self.file_object)
+
+    def process_saved(self, saved_path, rename=False):
+        """
+        Compress in place and create the thumbnail of an image stored by
+        save_original(). ``file_object`` is the stored file.
+        With ``rename``, the extension follows the chosen format (the URL of
+        the image was not sent yet). Return the path of the processed image.
+        """
+        image = Image.open(self.file_object)
+        logger.info("Processing stored image %s. Image format is %s" % (saved_path, image.format))
+
+        with processing.get_processor().admit(image.size[0] * image.size[1]):
+            if self._should_compress(image):
+                formats = self._get_formats() if rename else self._get_formats()[:1]
+                file_object, output_format = self._compress_image(self._read(self.file_object), formats)
+                new_path = saved_path
+                if rename:
+                    new_path = "%s%s" % (os.path.splitext(saved_path)[0],
+                                         pillow_transforms.FORMAT_EXTENSIONS[output_format])
+                self.storage_engine.delete(saved_path)
+                stored_path = self.storage_engine.save(new_path, file_object)
+                if stored_path != new_path:
+                    logger.warning("Compressed image %s was stored as %s" % (new_path, stored_path))
+                saved_path = stored_path
+            else:
+                file_object = self.file_object
+
+            if self._is_processable(image):
+                self.create_thumbnail(file_object, saved_path)
+                self.create_variants(file_object, saved_path)
 
         image.close()
         return saved_path
@@ -123,14 +174,41 @@ class PillowBackend(object):
     def create_thumbnail(self, file_object, file_path):
         logger.info("Start generating thumbnail for file %s" % file_path)
         thumbnail_filename = utils.get_thumb_filename(file_path)
-        thumbnail_io = BytesIO()
+        data = self._read_saved(file_object, file_path)
+        thumbnail_io = BytesIO(processing.get_processor().run(
+            pillow_transforms.create_thumbnail, data, utils.get_thumbnail_size(),
+            getattr(settings, "CKEDITOR_IMAGE_REDUCED_DECODE", False),
+        ))
+        self.thumbnail_path = self.storage_engine.save(thumbnail_filename, thumbnail_io)
+        return self.thumbnail_path
+
+    def create_variants(self, file_object, file_path, widths=None):
+        """
+        Create the variants of an image resized to the CKEDITOR_IMAGE_VARIANTS
+        widths (or ``widths``). Return a dictionary of their paths by width.
+        """
+        if widths is None:
+            widths = utils.get_variant_widths()
+        self.variant_paths = {}
+        if not widths:
+            return self.variant_paths
+
+        logger.info("Start generating variants for file %s" % file_path)
+        variants = processing.get_processor().run(
+            pillow_transforms.create_variants, self._read_saved(file_object, file_path), widths,
+            getattr(settings, "CKEDITOR_IMAGE_QUALITY", 75),
+            getattr(settings, "CKEDITOR_IMAGE_REDUCED_DECODE", False),
+        )
+        for width, content in sorted(variants.items()):
+            self.variant_paths[width] = self.storage_engine.save(
+                utils.get_variant_filename(file_path, width), BytesIO(content),
+            )
+        return self.variant_paths
+
+    def _read_saved(self, file_object, file_path):
         # File object after saving e.g. to S3 can be closed.
         try:
-            image = Image.open(file_object).convert('RGB')
+            return self._read(file_object)
         except ValueError:
-            file_object = self.storage_engine.open(file_path)
-            image = Image.open(file_object).convert('RGB')
-        image.thumbnail(THUMBNAIL_SIZE, Image.ANTIALIAS)
-        image.save(thumbnail_io, format='JPEG', optimize=True)
-        image.close()
-        return self.storage_engine.save(thumbnail_filename, thumbnail_io)
+            with self.storage_engine.open(file_path) as file_object:
+                return file_object.read()
@@ -0,0 +1,271 @@
+"""
+Image transforms of the Pillow backend.
+
+These are pure functions taking and returning bytes, so that they can run
+in the worker processes of ``ckeditor_uploader.processing``. They must not
+depend on Django settings: every option is passed as an argument.
+"""
+from __future__ import absolute_import
+
+import logging
+import math
+from io import BytesIO
+
+from PIL import ExifTags, Image, ImageChops, ImageOps, ImageStat
+
+logger = logging.getLogger(__name__)
+
+ORIENTATION_TAG = next(tag for tag, name in ExifTags.TAGS.items() if name == 'Orientation')
+ROTATIONS = {3: 180, 6: 270, 8: 90}
+# Formats decoded at a reduced scale by the JPEG decoder (draft mode).
+DRAFT_FORMATS = ('JPEG', 'MPO')
+# Output formats of compressed images and their extensions.
+FORMAT_EXTENSIONS = {'JPEG': '.jpg', 'WEBP': '.webp', 'AVIF': '.avif', 'PNG': '.png'}
+# With a reduced decode, images are decoded at least this many times larger than
+# the target size, then resampled: the quality stays close to a full decode.
+REDUCING_GAP = 2
+
+
+def get_rotation(image):
+    """
+    Return the rotation in degrees required by the EXIF orientation of ``image``.
+    """
+    try:
+        if hasattr(image, '_getexif') and image._getexif():
+            exif = dict(image._getexif().items())
+            return ROTATIONS.get(exif.get(ORIENTATION_TAG), 0)
+        logger.info('Image has no exif information. May be a PNG.')
+    except Exception as ex:
+        logger.warning("Error reading image orientation! " + str(ex))
+    return 0
+
+
+def rotate_image(image, degrees=None):
+    """
+    Rotate ``image`` according to its EXIF orientation.
+    """
+    if degrees is None:
+        degrees = get_rotation(image)
+    if degrees:
+        logger.info("rotate image %d degrees" % degrees)
+        image = image.rotate(degrees, expand=True)
+    return image
+
+
+def reduce_image(image, target_size):
+    """
+    Return ``image`` decoded at the smallest scale keeping it at least
+    REDUCING_GAP times larger than ``target_size``: in draft mode for JPEG,
+    which decodes directly at 1/2, 1/4 or 1/8 scale, else with Image.reduce.
+    """
+    width, height = max(target_size[0], 1), max(target_size[1], 1)
+    factor = int(min(image.size[0] / (width * REDUCING_GAP), image.size[1] / (height * REDUCING_GAP)))
+    if factor < 2:
+        return image
+    if image.format in DRAFT_FORMATS:
+        image.draft(image.mode, (width * REDUCING_GAP, height * REDUCING_GAP))
+    elif image.mode not in ('1', 'P'):
+        image = image.reduce(factor)
+    return image
+
+
+def get_scaled_size(size, max_width, max_height):
+    """
+    Return ``size`` scaled down to fit in ``max_width`` and ``max_height``
+    (0 means no limit), keeping the aspect ratio.
+    """
+    w, h = size
+    widthRatio = 1
+    heightRatio = 1
+
+    if max_width > 0:
+        widthRatio = max(w / max_width, 1)
+
+    if max_height > 0:
+        heightRatio = max(h / max_height, 1)
+
+    ratio = max(widthRatio, heightRatio)
+    return int(w / ratio), int(h / ratio)
+
+
+def get_supported_formats(formats):
+    """
+    Return the output formats of ``formats`` this Pillow build can encode,
+    i.e. AVIF requires a plugin.
+    """
+    Image.init()
+    supported = []
+    for img_format in formats:
+        if img_format in FORMAT_EXTENSIONS and img_format in Image.SAVE and img_format not in supported:
+            supported.append(img_format)
+    return supported or ['JPEG']
+
+
+def has_alpha(image):
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        return image.convert('RGBA').getchannel('A').getextrema()[0] < 255
+    return False
+
+
+def encode_image(image, img_format, quality, alpha=False):
+    """
+    Return the bytes of ``image`` encoded to ``img_format``. PNG images are
+    quantized to a 256 colors palette.
+    """
+    mode = 'RGBA' if alpha else 'RGB'
+    output = BytesIO()
+    if img_format == 'JPEG':
+        image.convert('RGB').save(output, format='JPEG', quality=quality, optimize=True)
+    elif img_format == 'PNG':
+        image.convert(mode).quantize(256, method=Image.FASTOCTREE).save(output, format='PNG', optimize=True)
+    else:
+        image.convert(mode).save(output, format=img_format, quality=quality)
+    return output.getvalue()
+
+
+def get_psnr(image, data, alpha=False):
+    """
+    Return the peak signal-to-noise ratio in dB between ``image`` and the
+    encoded image ``data``.
+    """
+    mode = 'RGBA' if alpha else 'RGB'
+    reference = image.convert(mode)
+    encoded = Image.open(BytesIO(data)).convert(mode)
+    mse = sum(ImageStat.Stat(ImageChops.difference(reference, encoded)).sum2) / (
+        float(len(mode)) * reference.size[0] * reference.size[1])
+    return 10 * math.log10(255 ** 2 / mse) if mse else float('inf')
+
+
+def encode_adaptive(image, formats, quality, min_psnr):
+    """
+    Encode ``image`` to each of ``formats`` and keep the smallest output whose
+    PSNR is at least ``min_psnr``, or the most faithful one if none is.
+    JPEG is skipped for images with transparency.
+    Return the format, the bytes and a list of (format, size, psnr) of the candidates.
+    """
+    if len(formats) == 1:
+        data = encode_image(image, formats[0], quality, formats[0] != 'JPEG' and has_alpha(image))
+        return formats[0], data, [(formats[0], len(data), None)]
+
+    alpha = has_alpha(image)
+    candidates = []
+    for img_format in formats:
+        if img_format == 'JPEG' and alpha:
+            continue
+        data = encode_image(image, img_format, quality, alpha)
+        candidates.append((img_format, data, get_psnr(image, data, alpha)))
+
+    accepted = [c for c in candidates if c[2] >= min_psnr]
+    if accepted:
+        img_format, data, _ = min(accepted, key=lambda c: len(c[1]))
+    else:
+        img_format, data, _ = max(candidates, key=lambda c: c[2])
+    return img_format, data, [(c[0], len(c[1]), c[2]) for c in candidates]
+
+
+def compress_image(data, max_width, max_height, quality, reduced_decode=False, formats=('JPEG',), min_psnr=35):
+    """
+    Rotate, resize and encode an image to the best of ``formats``
+    (see encode_adaptive). Return the format, the bytes and the candidates.
+    With ``reduced_decode``, the image is decoded at a reduced scale.
+    """
+    image = Image.open(BytesIO(data))
+    degrees = get_rotation(image)
+    swap = degrees in (90, 270)
+    width, height = image.size[::-1] if swap else image.size
+    size = get_scaled_size((width, height), max_width, max_height)
+    if reduced_decode:
+        # The target size in the orientation of the stored pixels.
+        image = reduce_image(image, size[::-1] if swap else size)
+    image = rotate_image(image, degrees)
+    if image.mode in ('1', 'P'):
+        # Palette images are resampled in RGBA for a smooth result.
+        image = image.convert('RGBA')
+    image = image.resize(size, Image.ANTIALIAS)
+    return encode_adaptive(image, formats, quality, min_psnr)
+
+
+def create_variants(data, widths, quality, reduced_decode=False):
+    """
+    Return a dictionary of the encoded bytes of an image resized to each of
+    ``widths``, in the format of the image. The image is decoded once and
+    widths larger than the image are skipped.
+    """
+    image = Image.open(BytesIO(data))
+    img_format = 'JPEG' if image.format in DRAFT_FORMATS else image.format
+    degrees = get_rotation(image)
+    swap = degrees in (90, 270)
+    width, height = image.size[::-1] if swap else image.size
+    widths = sorted((w for w in widths if w < width), reverse=True)
+    if not widths:
+        return {}
+
+    if reduced_decode:
+        size = get_scaled_size((width, height), widths[0], 0)
+        image = reduce_image(image, size[::-1] if swap else size)
+    image = rotate_image(image, degrees)
+    if img_format == 'JPEG':
+        image = image.convert('RGB')
+    elif image.mode in ('1', 'P'):
+        # Palette images are resampled in RGBA for a smooth result.
+        image = image.convert('RGBA')
+    image.load()
+
+    variants = {}
+    for w in widths:
+        output = BytesIO()
+        variant = image.resize(get_scaled_size((width, height), w, 0), Image.ANTIALIAS)
+        variant.save(output, format=img_format, quality=quality, optimize=True)
+        variants[w] = output.getvalue()
+    return variants
+
+
+def create_thumbnail(data, size, reduced_decode=False):
+    """
+    Return the JPEG bytes of a thumbnail of an image fitting in ``size``.
+    With ``reduced_decode``, the image is resized before being converted, so
+    that JPEG images are decoded in draft mode.
+    """
+    image = Image.open(BytesIO(data))
+    if reduced_decode and image.mode not in ('1', 'P'):
+        image = reduce_image(image, size)
+        image.thumbnail(size, Image.ANTIALIAS)
+        image = image.convert('RGB')
+    else:
+        # Palette images are resampled in RGB for a smooth result.
+        image = image.convert('RGB')
+        image.thumbnail(size, Image.ANTIALIAS)
+    output = BytesIO()
+    image.save(output, format='JPEG', optimize=True)
+    image.close()
+    return output.getvalue()
+
+
+def transform_image(data, width, height, fit, img_format, quality, reduced_decode=False):
+    """
+    Return the bytes of an image resized for ``width`` and ``height`` (0
+    means no limit) and encoded to ``img_format``. With the ``contain`` fit,
+    the image is scaled down to fit in the box; with ``cover``, it is scaled
+    and cropped around its center to fill the box. Images are never enlarged.
+    """
+    image = Image.open(BytesIO(data))
+    degrees = get_rotation(image)
+    swap = degrees in (90, 270)
+    size = image.size[::-1] if swap else image.size
+    if fit == 'cover' and width and height:
+        scale = max(float(width) / size[0], float(height) / size[1])
+        box = (min(width, size[0]), min(height, size[1]))
+        target = (int(round(size[0] * min(scale, 1))), int(round(size[1] * min(scale, 1))))
+    else:
+        target = box = get_scaled_size(size, width, height)
+    if reduced_decode:
+        image = reduce_image(image, target[::-1] if swap else target)
+    image = rotate_image(image, degrees)
+    if image.mode in ('1', 'P'):
+        # Palette images are resampled in RGBA for a smooth result.
+        image = image.convert('RGBA')
+    if box != target:
+        image = ImageOps.fit(image, box, Image.ANTIALIAS)
+    else:
+        image = image.resize(target, Image.ANTIALIAS)
+    return encode_image(image, img_format, quality, img_format != 'JPEG' and has_alpha(image))
@@ -0,0 +1,81 @@
+from __future__ import absolute_import
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.encoding import force_bytes
+
+# Version keys never expire, so that the cached lists of a user can be
+# invalidated from any app server sharing the cache backend.
+VERSION_KEY = 'ckeditor_browse_version:%s'
+FILES_KEY = 'ckeditor_browse_files:%s:%s'
+
+
+def is_enabled():
+    return get_timeout() != 0
+
+
+def get_timeout():
+    """
+    Return the CKEDITOR_BROWSE_CACHE_TIMEOUT setting. ``0`` (default)
+    disables the cache and ``None`` caches the file lists forever.
+    """
+    return getattr(settings, 'CKEDITOR_BROWSE_CACHE_TIMEOUT', 0)
+
+
+def _get_cache():
+    return caches[getattr(settings, 'CKEDITOR_BROWSE_CACHE_ALIAS', 'default')]
+
+
+def _hash(user_path):
+    return hashlib.md5(force_bytes(user_path)).hexdigest()
+
+
+def _new_version():
+    # Time based, so an evicted version key never resurrects stale file lists.
+    return int(time.time() * 1000)
+
+
+def _get_version(cache, user_path):
+    key = VERSION_KEY % _hash(user_path)
+    version = cache.get(key)
+    if version is None:
+        version = _new_version()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def get_files(user_path):
+    """
+    Return the cached file list of ``user_path``, or None, and the version it
+    was looked up with, passed to set_files() on a miss.
+    """
+    cache = _get_cache()
+    version = _get_version(cache, user_path)
+    return cache.get(FILES_KEY % (_hash(user_path), version)), version
+
+
+def set_files(user_path, files, version):
+    """
+    Cache the file list of ``user_path`` built after get_files() returned
+    ``version``. A list built before an invalidation is then never read.
+    """
+    cache = _get_cache()
+    cache.set(FILES_KEY % (_hash(user_path), version), files, get_timeout())
+
+
+def invalidate(user_path):
+    """
+    Bump the version of the cached file lists of ``user_path``.
+    """
+    if not is_enabled():
+        return
+    cache = _get_cache()
+    key = VERSION_KEY % _hash(user_path)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_version(), None)
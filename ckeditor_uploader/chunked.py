@@ -0,0 +1,155 @@
+from __future__ import absolute_import
+
+import logging
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
+from django.utils import timezone
+
+from ckeditor_uploader.models import ChunkedUpload
+
+logger = logging.getLogger(getattr(settings, 'CKEDITOR_LOGGER', 'django'))
+
+# Size of the blocks copied from the request to the temporary file.
+COPY_BUFFER_SIZE = 64 * 2 ** 10
+
+
+class ChunkError(Exception):
+    """
+    Raised when a chunk cannot be appended. ``status`` is the HTTP status
+    of the response.
+    """
+    def __init__(self, message, status=400):
+        super(ChunkError, self).__init__(message)
+        self.status = status
+
+
+class ChunkedUploadedFile(UploadedFile):
+    """
+    A file assembled from chunks. Like TemporaryUploadedFile, the file is
+    moved into FileSystemStorage instead of being copied.
+    """
+    def __init__(self, path, name, size):
+        super(ChunkedUploadedFile, self).__init__(open(path, 'rb'), name, None, size)
+        self._path = path
+
+    def temporary_file_path(self):
+        return self._path
+
+    def close(self):
+        try:
+            return self.file.close()
+        except FileNotFoundError:
+            # The file was moved to the storage.
+            pass
+
+
+def get_chunk_size():
+    return getattr(settings, 'CKEDITOR_CHUNK_SIZE', 5 * 2 ** 20)
+
+
+def get_temp_dir():
+    """
+    Return the CKEDITOR_CHUNKED_UPLOAD_DIR setting, which must be shared by
+    all the app servers, or a directory of FILE_UPLOAD_TEMP_DIR.
+    """
+    temp_dir = getattr(settings, 'CKEDITOR_CHUNKED_UPLOAD_DIR', None)
+    if temp_dir is None:
+        temp_dir = os.path.join(settings.FILE_UPLOAD_TEMP_DIR or tempfile.gettempdir(), 'ckeditor_chunked')
+    return temp_dir
+
+
+def get_temp_path(upload):
+    return os.path.join(get_temp_dir(), upload.upload_id)
+
+
+def get_max_size():
+    """
+    Return the largest size allowed by CKEDITOR_UPLOAD_MAX_SIZE, as the kind
+    of the file is unknown until it is complete.
+    """
+    max_sizes = getattr(settings, 'CKEDITOR_UPLOAD_MAX_SIZE', None) or {}
+    if not {'image', 'video', 'file'} <= set(max_sizes):
+        return None
+    return max(max_sizes.values())
+
+
+def create(user_path, filename, size):
+    max_size = get_max_size()
+    if max_size and size > max_size:
+        raise ChunkError('File too large.', 413)
+    remove_expired()
+
+    upload = ChunkedUpload(upload_id=uuid.uuid4().hex, user_path=user_path, filename=filename, size=size)
+    os.makedirs(get_temp_dir(), exist_ok=True)
+    open(get_temp_path(upload), 'wb').close()
+    upload.save()
+    return upload
+
+
+def append(upload, offset, stream):
+    """
+    Write the chunk read from ``stream`` at ``offset``, which must be the
+    number of bytes already received. Return the new offset.
+
+    The chunk is received in a part file first, the upload row is only locked
+    to check the offset and copy the part at the end of the temporary file, so
+    a slow client does not hold a transaction open.
+    """
+    if offset != upload.offset:
+        raise ChunkError('Invalid offset, %d bytes were received.' % upload.offset, 409)
+
+    chunk_size = get_chunk_size()
+    part_path = '%s.%s.part' % (get_temp_path(upload), uuid.uuid4().hex)
+    try:
+        written = 0
+        with open(part_path, 'wb') as fp:
+            for data in iter(lambda: stream.read(COPY_BUFFER_SIZE), b''):
+                written += len(data)
+                if written > chunk_size or offset + written > upload.size:
+                    raise ChunkError('Chunk too large.', 413)
+                fp.write(data)
+
+        with transaction.atomic():
+            upload = ChunkedUpload.objects.select_for_update().get(pk=upload.pk)
+            if offset != upload.offset:
+                # Another request appended a chunk meanwhile.
+                raise ChunkError('Invalid offset, %d bytes were received.' % upload.offset, 409)
+            with open(part_path, 'rb') as part, open(get_temp_path(upload), 'r+b') as fp:
+                # Overwrite what a failed request may have written past the offset.
+                fp.seek(offset)
+                shutil.copyfileobj(part, fp, COPY_BUFFER_SIZE)
+                fp.truncate()
+            upload.offset = offset + written
+            upload.save(update_fields=['offset', 'updated'])
+    finally:
+        try:
+            os.remove(part_path)
+        except OSError:
+            pass
+    return upload.offset
+
+
+def remove(upload):
+    try:
+        os.remove(get_temp_path(upload))
+    except OSError:
+        pass
+    upload.delete()
+
+
+def remove_expired():
+    """
+    Remove the uploads not resumed for CKEDITOR_CHUNKED_UPLOAD_EXPIRY seconds
+    (default one day).
+    """
+    expiry = getattr(settings, 'CKEDITOR_CHUNKED_UPLOAD_EXPIRY', 24 * 60 * 60)
+    for upload in ChunkedUpload.objects.filter(updated__lt=timezone.now() - timedelta(seconds=expiry)):
+        logger.info('Removing expired chunked upload %s' % upload.upload_id)
+        remove(upload)
@@ -0,0 +1,103 @@
+from __future__ import absolute_import
+
+import json
+import os
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from ckeditor_uploader import utils
+from ckeditor_uploader.models import DeduplicatedUpload
+
+MODES = ('user', 'global')
+
+
+def get_mode():
+    """
+    Return the CKEDITOR_UPLOAD_DEDUPLICATE setting: ``'user'`` to share the
+    files uploaded by the same user, ``'global'`` to share the files of all
+    users, or ``None`` (default) to disable the deduplication.
+    """
+    mode = getattr(settings, 'CKEDITOR_UPLOAD_DEDUPLICATE', None)
+    if mode and mode not in MODES:
+        raise ValueError('CKEDITOR_UPLOAD_DEDUPLICATE must be one of %s' % ', '.join(MODES))
+    return mode
+
+
+def is_enabled():
+    return bool(get_mode())
+
+
+def _get_scope(user_path):
+    return user_path if get_mode() == 'user' else ''
+
+
+def find(content_hash, user_path):
+    """
+    Return the stored upload of ``content_hash`` visible to ``user_path``,
+    or None. A reference is added with add_reference() when it is shared.
+    """
+    return DeduplicatedUpload.objects.filter(content_hash=content_hash, scope=_get_scope(user_path)).first()
+
+
+def add_reference(entry):
+    """
+    Add a reference to ``entry``. Return False when it was deleted since.
+    """
+    return bool(DeduplicatedUpload.objects.filter(pk=entry.pk).update(references=F('references') + 1))
+
+
+def _copy_file(source_path, path):
+    with utils.storage.open(source_path) as fp:
+        return utils.storage.save(path, fp)
+
+
+def copy(entry, path):
+    """
+    Copy the file of ``entry`` with its thumbnail and variants to ``path``,
+    for a user who cannot delete the files of another one. The copies are not
+    processed again, nor shared. Return the path of the copy, of its
+    thumbnail and a dictionary of the paths of its variants by width.
+    """
+    # The extension of the processed file.
+    saved_path = _copy_file(entry.path, os.path.splitext(path)[0] + os.path.splitext(entry.path)[1])
+    thumbnail_path = ''
+    if utils.storage.exists(utils.get_thumb_filename(entry.path)):
+        thumbnail_path = _copy_file(utils.get_thumb_filename(entry.path), utils.get_thumb_filename(saved_path))
+    variant_paths = {}
+    for width, variant_path in entry.get_variant_paths().items():
+        if utils.storage.exists(variant_path):
+            variant_paths[width] = _copy_file(variant_path, utils.get_variant_filename(saved_path, width))
+    return saved_path, thumbnail_path, variant_paths
+
+
+def add(content_hash, user_path, path, variant_paths=None):
+    """
+    Register the file stored for ``content_hash``.
+    """
+    try:
+        with transaction.atomic():
+            DeduplicatedUpload.objects.create(
+                content_hash=content_hash, scope=_get_scope(user_path), path=path,
+                variants=json.dumps(dict((str(width), p) for width, p in (variant_paths or {}).items())),
+            )
+    except IntegrityError:
+        # The same content was stored concurrently, this copy is not shared.
+        pass
+
+
+def release(path):
+    """
+    Remove a reference to the file stored at ``path``. Return True when no
+    reference remains and the file can be deleted.
+    """
+    with transaction.atomic():
+        entry = DeduplicatedUpload.objects.select_for_update().filter(path=path).first()
+        if entry is None:
+            return True
+        if entry.references > 1:
+            DeduplicatedUpload.objects.filter(pk=entry.pk).update(references=F('references') - 1)
+            return False
+        entry.delete()
+        return True
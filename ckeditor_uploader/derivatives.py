@@ -0,0 +1,176 @@
+from __future__ import absolute_import
+
+import hashlib
+import json
+import logging
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core import signing
+
+from ckeditor_uploader import index, processing, utils
+
+try:
+    from django.urls import reverse
+except ImportError:  # Django < 2.0
+    from django.core.urlresolvers import reverse
+
+logger = logging.getLogger(getattr(settings, 'CKEDITOR_LOGGER', 'django'))
+
+SALT = 'ckeditor_uploader.derivatives'
+FITS = ('contain', 'cover')
+DERIVATIVES_DIR = '.derivatives'
+# Output format of the derivatives by extension of the source image.
+DEFAULT_FORMATS = {'.png': 'PNG', '.gif': 'PNG', '.webp': 'WEBP'}
+
+
+class InvalidImage(Exception):
+    """
+    Raised when the source image of a derivative cannot be decoded.
+    """
+
+
+def is_enabled():
+    """
+    Return the CKEDITOR_IMAGE_TRANSFORMS setting. When enabled, the file
+    browser shows thumbnails generated at the displayed size.
+    """
+    return getattr(settings, 'CKEDITOR_IMAGE_TRANSFORMS', False)
+
+
+def get_browse_thumbnail_size():
+    return tuple(getattr(settings, 'CKEDITOR_BROWSE_THUMBNAIL_SIZE', (75, 75)))
+
+
+def get_params(path, width=0, height=0, fit='contain', img_format=None):
+    """
+    Return the normalized parameters of a derivative of the image at ``path``.
+    """
+    from ckeditor_uploader.backends.pillow_transforms import FORMAT_EXTENSIONS
+
+    if fit not in FITS:
+        raise ValueError('fit must be one of %s' % ', '.join(FITS))
+    if img_format is None:
+        img_format = DEFAULT_FORMATS.get(os.path.splitext(path)[1].lower(), 'JPEG')
+    if img_format not in FORMAT_EXTENSIONS:
+        raise ValueError('Unsupported format %r' % img_format)
+    return {'p': path, 'w': int(width), 'h': int(height), 'f': fit, 'o': img_format}
+
+
+def sign(params):
+    """
+    Return the token of ``params``. The same parameters always give the same
+    token, so the URL of a derivative is stable and cacheable.
+    """
+    payload = signing.b64_encode(json.dumps(params, sort_keys=True, separators=(',', ':')).encode('utf-8'))
+    return signing.Signer(salt=SALT).sign(payload.decode('ascii'))
+
+
+def unsign(token):
+    """
+    Return the parameters signed in ``token``, or None when it is invalid.
+    """
+    try:
+        payload = signing.Signer(salt=SALT).unsign(token)
+        return json.loads(signing.b64_decode(payload.encode('ascii')).decode('utf-8'))
+    except (signing.BadSignature, ValueError, TypeError):
+        return None
+
+
+def get_url(path, width=0, height=0, fit='contain', img_format=None):
+    """
+    Return the URL of the transform view serving a derivative of the image
+    at ``path``, see ``get_params``.
+    """
+    return reverse('ckeditor_transform', args=[sign(get_params(path, width, height, fit, img_format))])
+
+
+def get_source_version(path):
+    """
+    Return the version of the image at ``path``, its size and modification
+    time, which change when the image is processed again in place.
+    """
+    modified = index.get_modified_time(path)
+    return '%d:%s' % (utils.storage.size(path), modified.isoformat() if modified else '')
+
+
+def get_key(params, version=None):
+    if version is not None:
+        params = dict(params, v=version)
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def get_etag(params, version):
+    """
+    Return the strong ETag of a derivative, its content only depends on
+    its parameters and the version of its source image.
+    """
+    return '"%s"' % get_key(params, version)
+
+
+def _get_source_dir(path):
+    return os.path.join(settings.CKEDITOR_UPLOAD_PATH, DERIVATIVES_DIR,
+                        hashlib.sha1(path.encode('utf-8')).hexdigest())
+
+
+def get_derivative_path(params, version=None):
+    """
+    Return the storage path of a derivative of the ``version`` of its source
+    image. The derivatives of an image are stored together in a hidden
+    directory, not listed by the file browser.
+    """
+    from ckeditor_uploader.backends.pillow_transforms import FORMAT_EXTENSIONS
+
+    return os.path.join(_get_source_dir(params['p']), get_key(params, version) + FORMAT_EXTENSIONS[params['o']])
+
+
+def get_or_create(params, version=None):
+    """
+    Return the storage path of a derivative, generated when it does not
+    exist yet. Raise ProcessingBusy when the image cannot be processed now,
+    and InvalidImage when it cannot be decoded.
+    """
+    from PIL import Image
+
+    from ckeditor_uploader.backends import pillow_transforms
+
+    derivative_path = get_derivative_path(params, version)
+    if utils.storage.exists(derivative_path):
+        return derivative_path
+
+    logger.info("Generating derivative %s of %s" % (derivative_path, params['p']))
+    with utils.storage.open(params['p']) as file_object:
+        data = file_object.read()
+    try:
+        with Image.open(BytesIO(data)) as image:
+            pixels = image.size[0] * image.size[1]
+
+        processor = processing.get_processor()
+        with processor.admit(pixels):
+            output = processor.run(
+                pillow_transforms.transform_image, data, params['w'], params['h'], params['f'], params['o'],
+                getattr(settings, 'CKEDITOR_IMAGE_QUALITY', 75),
+                getattr(settings, 'CKEDITOR_IMAGE_REDUCED_DECODE', False),
+            )
+    except (IOError, SyntaxError, ValueError, Image.DecompressionBombError) as e:
+        logger.warning("Cannot generate derivative of %s: %s" % (params['p'], e))
+        raise InvalidImage(str(e))
+    saved_path = utils.storage.save(derivative_path, BytesIO(output))
+    if saved_path != derivative_path:
+        # Generated concurrently by another request.
+        utils.storage.delete(saved_path)
+    return derivative_path
+
+
+def delete(path):
+    """
+    Delete the derivatives of the image at ``path``.
+    """
+    source_dir = _get_source_dir(path)
+    try:
+        _, files = utils.storage.listdir(source_dir)
+    except (NotImplementedError, OSError):
+        return
+    for filename in files:
+        utils.storage.delete(os.path.join(source_dir, filename))
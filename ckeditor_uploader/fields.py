@@ -1,17 +1,17 @@
-from django import forms
-
 from ckeditor import fields
-from ckeditor_uploader import widgets
+from ckeditor_uploader import references, widgets
 
 
 class RichTextUploadingField(fields.RichTextField):
+    def contribute_to_class(self, cls, name, *args, **kwargs):
+        super(RichTextUploadingField, self).contribute_to_class(cls, name, *args, **kwargs)
+        if not cls._meta.abstract:
+            references.connect(cls)
+
     @staticmethod
     def _get_form_class():
         return RichTextUploadingFormField
 
 
-class RichTextUploadingFormField(forms.fields.CharField):
-    def __init__(self, config_name='default', extra_plugins=None, external_plugin_resources=None, *args, **kwargs):
-        kwargs.update({'widget': widgets.CKEditorUploadingWidget(config_name=config_name, extra_plugins=extra_plugins,
-                                                                 external_plugin_resources=external_plugin_resources)})
-        super(RichTextUploadingFormField, self).__init__(*args, **kwargs)
+class RichTextUploadingFormField(fields.RichTextFormField):
+    widget_class = widgets.CKEditorUploadingWidget
@@ -0,0 +1,72 @@
+from __future__ import absolute_import
+
+import os.path
+
+from django.conf import settings
+from django.utils import timezone
+
+from ckeditor_uploader import search, utils
+from ckeditor_uploader.models import UploadedFile
+
+
+def is_enabled():
+    return getattr(settings, 'CKEDITOR_UPLOAD_INDEX', False)
+
+
+def get_user_path_from_path(path):
+    """
+    Return the user path component of a file stored under CKEDITOR_UPLOAD_PATH.
+    """
+    if not getattr(settings, 'CKEDITOR_RESTRICT_BY_USER', 'id'):
+        return ''
+    relative_path = os.path.relpath(path, settings.CKEDITOR_UPLOAD_PATH)
+    parts = relative_path.replace('\\', '/').split('/')
+    return parts[0] if len(parts) > 1 else ''
+
+
+def get_file_size(path):
+    try:
+        return utils.storage.size(path)
+    except (NotImplementedError, OSError):
+        return None
+
+
+def get_modified_time(path):
+    try:
+        return utils.storage.get_modified_time(path)
+    except (NotImplementedError, OSError, AttributeError):
+        return None
+
+
+def add_file(path, user_path, thumbnail_path='', size=None, modified=None, thumbnail_size=None):
+    """
+    Add or update the entry of ``path``. The thumbnail is assumed to be created
+    with the current CKEDITOR_THUMBNAIL_SIZE unless ``thumbnail_size`` is given.
+    """
+    if modified is None:
+        modified = timezone.now()
+    if thumbnail_size is None:
+        thumbnail_size = utils.get_thumbnail_size_key() if thumbnail_path else ''
+    search_path, name, extension = search.get_search_fields(path, user_path)
+    entry, _ = UploadedFile.objects.update_or_create(path=path, defaults={
+        'user_path': user_path,
+        'thumbnail_path': thumbnail_path or '',
+        'thumbnail_size': thumbnail_size,
+        'size': size,
+        'modified': modified,
+        'is_image': utils.is_valid_image_extension(path),
+        'is_video': utils.is_valid_video_extension(path),
+        'search_path': search_path,
+        'name': name,
+        'extension': extension,
+    })
+    search.update_trigrams(entry)
+    return entry
+
+
+def remove_file(path):
+    UploadedFile.objects.filter(path=path).delete()
+
+
+def get_user_files(user_path):
+    return UploadedFile.objects.filter(user_path=user_path).order_by('path')
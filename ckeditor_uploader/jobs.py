@@ -0,0 +1,140 @@
+from __future__ import absolute_import
+
+import logging
+from datetime import timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from ckeditor_uploader import browse_cache, index
+from ckeditor_uploader.backends import registry
+from ckeditor_uploader.models import DeduplicatedUpload, UploadJob
+from ckeditor_uploader.utils import storage
+
+logger = logging.getLogger(getattr(settings, 'CKEDITOR_LOGGER', 'django'))
+
+DEFAULT_JOB_RUNNER = 'ckeditor_uploader.jobs.DatabaseJobRunner'
+
+
+def is_enabled():
+    return getattr(settings, 'CKEDITOR_UPLOAD_ASYNC', False)
+
+
+def process_image(path, user_path):
+    """
+    Compress the stored original of an uploaded image and create its thumbnail.
+    """
+    backend = registry.get_backend()
+    # Read in memory, process_saved() replaces the stored file.
+    with storage.open(path) as file_object:
+        filewrapper = backend(storage, BytesIO(file_object.read()))
+    saved_path = filewrapper.process_saved(path)
+
+    if saved_path != path:
+        # The URL sent to the editor is broken, at least keep the records pointing to the file.
+        logger.error("Processed image %s was stored as %s" % (path, saved_path))
+        DeduplicatedUpload.objects.filter(path=path).update(path=saved_path)
+        if index.is_enabled():
+            index.remove_file(path)
+    if index.is_enabled():
+        index.add_file(saved_path, user_path,
+                       thumbnail_path=getattr(filewrapper, 'thumbnail_path', ''),
+                       size=index.get_file_size(saved_path))
+
+
+TASKS = {
+    'process_image': process_image,
+}
+
+
+def run_task(task, path, user_path):
+    """
+    Run a queued task. Job runners call this from their workers.
+    """
+    try:
+        func = TASKS[task]
+    except KeyError:
+        raise ValueError('Unknown task %r' % task)
+    func(path, user_path)
+    browse_cache.invalidate(user_path)
+
+
+class BaseJobRunner(object):
+    """
+    Queues the post-upload processing of files. A runner backed by a task
+    queue only has to implement enqueue() and call run_task() from its workers.
+    """
+    def enqueue(self, task, path, user_path):
+        raise NotImplementedError
+
+    def get_pending_paths(self, user_path):
+        """
+        Return the paths of the files of ``user_path`` not processed yet,
+        shown with a placeholder thumbnail in the browse views.
+        """
+        return set()
+
+
+class DatabaseJobRunner(BaseJobRunner):
+    """
+    Stores the jobs in the UploadJob table. The ``runckeditorjobs`` management
+    command runs them, no external broker is needed.
+    """
+    def enqueue(self, task, path, user_path):
+        UploadJob.objects.create(task=task, path=path, user_path=user_path)
+
+    def get_pending_paths(self, user_path):
+        return set(UploadJob.objects.filter(
+            user_path=user_path, status__in=[UploadJob.PENDING, UploadJob.RUNNING],
+        ).values_list('path', flat=True))
+
+    def requeue_stale(self, timeout):
+        """
+        Put back in the queue the jobs left running for ``timeout`` seconds
+        by a worker that died.
+        """
+        return UploadJob.objects.filter(
+            status=UploadJob.RUNNING, updated__lt=timezone.now() - timedelta(seconds=timeout),
+        ).update(status=UploadJob.PENDING, updated=timezone.now())
+
+    def _claim(self, job):
+        # Several workers may run concurrently, only one of them gets the job.
+        return UploadJob.objects.filter(pk=job.pk, status=UploadJob.PENDING).update(
+            status=UploadJob.RUNNING, attempts=F('attempts') + 1, updated=timezone.now(),
+        ) == 1
+
+    def run_pending(self, batch_size=10, max_attempts=3):
+        """
+        Run up to ``batch_size`` pending jobs and return the number of jobs run.
+        Successful jobs are deleted, failed ones are retried until
+        ``max_attempts`` is reached.
+        """
+        count = 0
+        for job in UploadJob.objects.filter(status=UploadJob.PENDING)[:batch_size]:
+            if not self._claim(job):
+                continue
+            job.refresh_from_db()
+            count += 1
+            try:
+                run_task(job.task, job.path, job.user_path)
+            except Exception as e:
+                logger.exception('Upload job %s failed' % job)
+                job.status = UploadJob.FAILED if job.attempts >= max_attempts else UploadJob.PENDING
+                job.error = str(e)
+                job.save(update_fields=['status', 'error', 'updated'])
+                if job.status == UploadJob.FAILED:
+                    # The original file is kept unprocessed, stop showing the placeholder.
+                    browse_cache.invalidate(job.user_path)
+            else:
+                job.delete()
+        return count
+
+
+def get_job_runner():
+    runner = getattr(settings, 'CKEDITOR_JOB_RUNNER', DEFAULT_JOB_RUNNER)
+    if isinstance(runner, str):
+        runner = import_string(runner)
+    return runner()
@@ -0,0 +1,64 @@
+from __future__ import absolute_import
+
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ckeditor_uploader import references
+
+
+class Command(BaseCommand):
+    """
+    Deletes the uploads which are not embedded in the content of any
+    RichTextUploadingField, with their thumbnail, variants and derivatives.
+    Requires CKEDITOR_UPLOAD_REFERENCES, the references of the content saved
+    before it was enabled are recorded with --rebuild-references.
+    """
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true', default=False,
+            help='List the orphaned uploads without deleting them.',
+        )
+        parser.add_argument(
+            '--grace-period', type=int, default=None,
+            help='Keep the uploads modified less than this number of seconds ago '
+                 '(default CKEDITOR_ORPHAN_GRACE_PERIOD, one day).',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of files looked up and deleted at a time (default 500).',
+        )
+        parser.add_argument(
+            '--rebuild-references', action='store_true', default=False,
+            help='Record the references of all the content before looking for orphans.',
+        )
+
+    def handle(self, *args, **options):
+        if not references.is_enabled():
+            raise CommandError("CKEDITOR_UPLOAD_REFERENCES must be enabled to find the orphaned uploads")
+        if options['batch_size'] < 1 or (options['grace_period'] or 0) < 0:
+            raise CommandError("--batch-size must be positive and --grace-period must not be negative")
+
+        if options['rebuild_references']:
+            count = references.rebuild_references(batch_size=options['batch_size'])
+            self.stdout.write("Recorded the references of %d objects" % count)
+
+        orphans = references.find_orphans(grace_period=options['grace_period'], batch_size=options['batch_size'])
+        count = 0
+        while True:
+            batch = list(islice(orphans, options['batch_size']))
+            if not batch:
+                break
+            if options['dry_run']:
+                paths = batch
+            else:
+                paths = references.delete_orphans(batch)
+            for path in paths:
+                if options['dry_run'] or options['verbosity'] > 1:
+                    self.stdout.write(path)
+            count += len(paths)
+
+        if options['dry_run']:
+            self.stdout.write("Found %d orphaned uploads" % count)
+        else:
+            self.stdout.write("Deleted %d orphaned uploads" % count)
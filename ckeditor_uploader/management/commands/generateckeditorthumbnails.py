@@ -1,40 +1,168 @@
 from __future__ import absolute_import
 
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
 
 from django.conf import settings
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
 
+from ckeditor_uploader import index
 from ckeditor_uploader.backends import registry
-from ckeditor_uploader.utils import get_thumb_filename
-from ckeditor_uploader.views import get_image_files
+from ckeditor_uploader.models import UploadedFile
+from ckeditor_uploader.utils import get_thumb_filename, get_thumbnail_size_key, is_valid_image_extension, storage
+from ckeditor_uploader.views import walk_storage
+
+CREATED = 'created'
+EXISTS = 'exists'
+FAILED = 'failed'
+
+
+def create_thumbnail(path, replace=False):
+    """
+    Create the thumbnail of the image stored at ``path``, an existing one is
+    kept unless ``replace`` is True. Return the path, the status and the
+    thumbnail path or error message. Runs in the workers.
+    """
+    thumbnail_path = get_thumb_filename(path)
+    try:
+        if storage.exists(thumbnail_path):
+            if not replace:
+                return path, EXISTS, thumbnail_path
+            storage.delete(thumbnail_path)
+        with storage.open(path) as file_object:
+            thumbnail_path = registry.get_backend()(storage, file_object).create_thumbnail(file_object, path)
+    except Exception as e:
+        return path, FAILED, str(e)
+    return path, CREATED, thumbnail_path
 
 
 class Command(BaseCommand):
     """
     Creates thumbnail files for the CKEditor file image browser.
     Useful if starting to use django-ckeditor with existing images.
+
+    The images missing a thumbnail are found with the upload index when
+    CKEDITOR_UPLOAD_INDEX is enabled, which also recreates the thumbnails
+    created with another CKEDITOR_THUMBNAIL_SIZE. Otherwise the storage is
+    walked and each thumbnail is looked up with ``storage.exists``.
     """
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Number of images processed concurrently (default 4).',
+        )
+        parser.add_argument(
+            '--processes', action='store_true', default=False,
+            help='Process the images in a process pool instead of a thread pool.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of images processed between two checkpoints (default 500).',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='File recording the processed images, an interrupted run is resumed from it. '
+                 'It is removed when the run completes.',
+        )
+        parser.add_argument(
+            '--force', action='store_true', default=False,
+            help='Recreate every thumbnail.',
+        )
+
     def handle(self, *args, **options):
-        if getattr(settings, 'CKEDITOR_IMAGE_BACKEND', None):
-            backend = registry.get_backend()
-            for image in get_image_files():
-                if not self._thumbnail_exists(image):
-                    self.stdout.write("Creating thumbnail for %s" % image)
-                    try:
-                        backend.create_thumbnail(image)
-                    except Exception as e:
-                        self.stdout.write("Couldn't create thumbnail for %s: %s" % (image, e))
-            self.stdout.write("Finished")
-        else:
+        if not getattr(settings, 'CKEDITOR_IMAGE_BACKEND', None):
             self.stdout.write("No thumbnail backend is enabled")
+            return
+        if not hasattr(registry.get_backend(), 'create_thumbnail'):
+            raise CommandError("The image backend does not create thumbnails")
+        if options['workers'] < 1 or options['batch_size'] < 1:
+            raise CommandError("--workers and --batch-size must be positive")
 
-    def _thumbnail_exists(self, image_path):
-        thumb_path = self._to_absolute_path(
-            get_thumb_filename(image_path)
-        )
-        return os.path.isfile(thumb_path)
+        checkpoint = options['checkpoint']
+        done = self._read_checkpoint(checkpoint)
+        if done:
+            self.stdout.write("Resuming, %d images already processed" % len(done))
+
+        use_index = index.is_enabled()
+        images = (path for path in self._get_images(use_index, options['force']) if path not in done)
+        executor_class = ProcessPoolExecutor if options['processes'] else ThreadPoolExecutor
+        counts = {CREATED: 0, EXISTS: 0, FAILED: 0}
+        thumbnail_size = get_thumbnail_size_key()
+        start = time.time()
+
+        with executor_class(max_workers=options['workers']) as executor:
+            while True:
+                batch = list(islice(images, options['batch_size']))
+                if not batch:
+                    break
+                # The index only returns the images whose thumbnail must be (re)created.
+                results = executor.map(create_thumbnail, batch, [options['force'] or use_index] * len(batch))
+                for path, status, detail in results:
+                    counts[status] += 1
+                    if status == CREATED:
+                        self.stdout.write("Created thumbnail for %s" % path)
+                        if use_index:
+                            UploadedFile.objects.filter(path=path).update(
+                                thumbnail_path=detail, thumbnail_size=thumbnail_size)
+                    elif status == FAILED:
+                        self.stdout.write("Couldn't create thumbnail for %s: %s" % (path, detail))
+                self._write_checkpoint(checkpoint, batch)
+                self._report(counts, start)
+
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        if not sum(counts.values()):
+            self._report(counts, start)
+        self.stdout.write("Finished")
+
+    def _get_images(self, use_index, force):
+        if use_index:
+            queryset = UploadedFile.objects.filter(is_image=True)
+            if not force:
+                # Thumbnails of an unknown size (indexed from the storage) are kept.
+                queryset = queryset.filter(
+                    Q(thumbnail_path='') |
+                    (~Q(thumbnail_size='') & ~Q(thumbnail_size=get_thumbnail_size_key()))
+                )
+            return self._iter_paths(queryset.order_by('path'))
+        return (path for path in walk_storage(settings.CKEDITOR_UPLOAD_PATH) if is_valid_image_extension(path))
 
     @staticmethod
-    def _to_absolute_path(image_path):
-        return os.path.join(settings.MEDIA_ROOT, image_path)
+    def _iter_paths(queryset, page_size=1000):
+        # Keyset pagination, the entries are updated while they are iterated.
+        last_path = None
+        while True:
+            page = queryset if last_path is None else queryset.filter(path__gt=last_path)
+            paths = list(page.values_list('path', flat=True)[:page_size])
+            for path in paths:
+                yield path
+            if len(paths) < page_size:
+                return
+            last_path = paths[-1]
+
+    @staticmethod
+    def _read_checkpoint(checkpoint):
+        if not checkpoint or not os.path.exists(checkpoint):
+            return set()
+        with open(checkpoint) as fp:
+            return set(line.rstrip('\n') for line in fp if line.strip())
+
+    @staticmethod
+    def _write_checkpoint(checkpoint, paths):
+        if not checkpoint:
+            return
+        with open(checkpoint, 'a') as fp:
+            fp.writelines('%s\n' % path for path in paths)
+            fp.flush()
+            os.fsync(fp.fileno())
+
+    def _report(self, counts, start):
+        elapsed = max(time.time() - start, 1e-6)
+        processed = sum(counts.values())
+        self.stdout.write(
+            "Processed %d images (%d created, %d existing, %d failed) in %.1fs, %.1f images/s" % (
+                processed, counts[CREATED], counts[EXISTS], counts[FAILED], elapsed, processed / elapsed)
+        )
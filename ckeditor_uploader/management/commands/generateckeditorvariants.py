@@ -0,0 +1,38 @@
+from __future__ import absolute_import
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ckeditor_uploader.backends import registry
+from ckeditor_uploader.utils import get_variant_filename, get_variant_widths, is_valid_image_extension, storage
+from ckeditor_uploader.views import walk_storage
+
+
+class Command(BaseCommand):
+    """
+    Creates the missing CKEDITOR_IMAGE_VARIANTS variants of the uploaded images.
+    Useful when adding widths to the setting on an existing installation.
+    """
+    def handle(self, *args, **options):
+        backend = registry.get_backend()
+        widths = get_variant_widths()
+        if not widths or not hasattr(backend, 'create_variants'):
+            self.stdout.write("No image variants are configured")
+            return
+
+        count = 0
+        for image in walk_storage(settings.CKEDITOR_UPLOAD_PATH):
+            if not is_valid_image_extension(image):
+                continue
+            missing = [width for width in widths if not storage.exists(get_variant_filename(image, width))]
+            if not missing:
+                continue
+            self.stdout.write("Creating variants for %s" % image)
+            try:
+                with storage.open(image) as file_object:
+                    variant_paths = backend(storage, file_object).create_variants(file_object, image, missing)
+            except Exception as e:
+                self.stdout.write("Couldn't create variants for %s: %s" % (image, e))
+            else:
+                count += len(variant_paths)
+        self.stdout.write("Created %d variants" % count)
@@ -0,0 +1,46 @@
+from __future__ import absolute_import
+
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ckeditor_uploader import index
+from ckeditor_uploader.models import UploadedFile
+from ckeditor_uploader.utils import get_thumb_filename, is_variant_filename
+from ckeditor_uploader.views import walk_storage
+
+
+class Command(BaseCommand):
+    """
+    Populates the upload index from the files already contained in
+    CKEDITOR_UPLOAD_PATH. Useful when enabling CKEDITOR_UPLOAD_INDEX
+    on an existing installation.
+    """
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clear', action='store_true', default=False,
+            help='Remove all existing index entries before indexing.',
+        )
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            UploadedFile.objects.all().delete()
+
+        paths = set(walk_storage(settings.CKEDITOR_UPLOAD_PATH, include_thumbnails=True))
+        count = 0
+        for path in sorted(paths):
+            if os.path.splitext(path)[0].endswith('_thumb') or is_variant_filename(path):
+                continue
+            thumbnail_path = get_thumb_filename(path)
+            index.add_file(
+                path,
+                index.get_user_path_from_path(path),
+                thumbnail_path=thumbnail_path if thumbnail_path in paths else '',
+                # The size of existing thumbnails is unknown.
+                thumbnail_size='',
+                size=index.get_file_size(path),
+                modified=index.get_modified_time(path),
+            )
+            count += 1
+        self.stdout.write("Indexed %d files" % count)
@@ -0,0 +1,53 @@
+from __future__ import absolute_import
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ckeditor_uploader.jobs import get_job_runner
+
+
+class Command(BaseCommand):
+    """
+    Runs the post-upload processing jobs queued when CKEDITOR_UPLOAD_ASYNC
+    is enabled, with the default database job runner.
+    """
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true', default=False,
+            help='Run the pending jobs and exit instead of polling the queue.',
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=2.0,
+            help='Seconds to wait when the queue is empty (default 2).',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=10,
+            help='Number of jobs claimed at once (default 10).',
+        )
+        parser.add_argument(
+            '--max-attempts', type=int, default=3,
+            help='Number of attempts before a job is marked as failed (default 3).',
+        )
+        parser.add_argument(
+            '--stale-after', type=int, default=600,
+            help='Seconds after which a running job is considered abandoned and queued again (default 600).',
+        )
+
+    def handle(self, *args, **options):
+        runner = get_job_runner()
+        if not hasattr(runner, 'run_pending'):
+            raise CommandError('%s jobs are not run by this command.' % runner.__class__.__name__)
+
+        total = 0
+        while True:
+            runner.requeue_stale(options['stale_after'])
+            count = runner.run_pending(options['batch_size'], options['max_attempts'])
+            total += count
+            if options['once']:
+                if not count:
+                    break
+                continue
+            if not count:
+                time.sleep(options['sleep'])
+        self.stdout.write("Ran %d jobs" % total)
@@ -0,0 +1,36 @@
+# Generated by Django 3.2.25 on 2026-10-18 11:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadedFile',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=255, unique=True, verbose_name='path')),
+                ('user_path', models.CharField(max_length=150, verbose_name='user path')),
+                ('thumbnail_path', models.CharField(blank=True, max_length=255, verbose_name='thumbnail path')),
+                ('size', models.BigIntegerField(blank=True, null=True, verbose_name='size')),
+                ('modified', models.DateTimeField(blank=True, null=True, verbose_name='modified')),
+                ('is_image', models.BooleanField(default=False, verbose_name='is image')),
+                ('is_video', models.BooleanField(default=False, verbose_name='is video')),
+            ],
+            options={
+                'verbose_name': 'uploaded file',
+                'verbose_name_plural': 'uploaded files',
+                'ordering': ('path',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='uploadedfile',
+            index=models.Index(fields=['user_path', 'path'], name='ckeditor_up_user_pa_dd1160_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.2.25 on 2026-10-18 12:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ckeditor_uploader', '0002_uploadjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeduplicatedUpload',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64, verbose_name='content hash')),
+                ('scope', models.CharField(blank=True, max_length=150, verbose_name='scope')),
+                ('path', models.CharField(db_index=True, max_length=255, verbose_name='path')),
+                ('variants', models.TextField(blank=True, verbose_name='variants')),
+                ('references', models.PositiveIntegerField(default=1, verbose_name='references')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='created')),
+            ],
+            options={
+                'verbose_name': 'deduplicated upload',
+                'verbose_name_plural': 'deduplicated uploads',
+                'unique_together': {('content_hash', 'scope')},
+            },
+        ),
+    ]
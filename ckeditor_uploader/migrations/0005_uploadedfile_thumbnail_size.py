@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-18 12:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ckeditor_uploader', '0004_chunkedupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadedfile',
+            name='thumbnail_size',
+            field=models.CharField(blank=True, max_length=20, verbose_name='thumbnail size'),
+        ),
+    ]
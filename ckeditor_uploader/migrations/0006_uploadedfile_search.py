@@ -0,0 +1,58 @@
+# Generated by Django 3.2.25 on 2026-10-18 12:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ckeditor_uploader', '0005_uploadedfile_thumbnail_size'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadedFileTrigram',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_path', models.CharField(max_length=150, verbose_name='user path')),
+                ('trigram', models.CharField(max_length=3, verbose_name='trigram')),
+            ],
+            options={
+                'verbose_name': 'uploaded file trigram',
+                'verbose_name_plural': 'uploaded file trigrams',
+            },
+        ),
+        migrations.AddField(
+            model_name='uploadedfile',
+            name='extension',
+            field=models.CharField(blank=True, max_length=20, verbose_name='extension'),
+        ),
+        migrations.AddField(
+            model_name='uploadedfile',
+            name='name',
+            field=models.CharField(blank=True, max_length=255, verbose_name='name'),
+        ),
+        migrations.AddField(
+            model_name='uploadedfile',
+            name='search_path',
+            field=models.CharField(blank=True, max_length=255, verbose_name='search path'),
+        ),
+        migrations.AddIndex(
+            model_name='uploadedfile',
+            index=models.Index(fields=['user_path', 'name'], name='ckeditor_up_user_pa_267d23_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='uploadedfile',
+            index=models.Index(fields=['user_path', 'extension'], name='ckeditor_up_user_pa_93e509_idx'),
+        ),
+        migrations.AddField(
+            model_name='uploadedfiletrigram',
+            name='uploaded_file',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trigrams', to='ckeditor_uploader.uploadedfile'),
+        ),
+        migrations.AddIndex(
+            model_name='uploadedfiletrigram',
+            index=models.Index(fields=['user_path', 'trigram'], name='ckeditor_up_user_pa_cd0bde_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.2.25 on 2026-10-18 12:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ckeditor_uploader', '0006_uploadedfile_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadReference',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(db_index=True, max_length=255, verbose_name='path')),
+                ('model', models.CharField(max_length=100, verbose_name='model')),
+                ('object_id', models.CharField(max_length=64, verbose_name='object id')),
+                ('field', models.CharField(max_length=100, verbose_name='field')),
+            ],
+            options={
+                'verbose_name': 'upload reference',
+                'verbose_name_plural': 'upload references',
+                'unique_together': {('model', 'object_id', 'field', 'path')},
+            },
+        ),
+    ]
@@ -0,0 +1,172 @@
+from __future__ import absolute_import
+
+import json
+
+from django.db import models
+
+try:
+    from django.utils.translation import gettext_lazy as _
+except ImportError:
+    from django.utils.translation import ugettext_lazy as _
+
+
+class UploadedFile(models.Model):
+    """
+    Index entry for a file stored under CKEDITOR_UPLOAD_PATH.
+    Only maintained when CKEDITOR_UPLOAD_INDEX is enabled.
+    """
+    path = models.CharField(_('path'), max_length=255, unique=True)
+    user_path = models.CharField(_('user path'), max_length=150)
+    thumbnail_path = models.CharField(_('thumbnail path'), max_length=255, blank=True)
+    # CKEDITOR_THUMBNAIL_SIZE when the thumbnail was created, empty if unknown.
+    thumbnail_size = models.CharField(_('thumbnail size'), max_length=20, blank=True)
+    size = models.BigIntegerField(_('size'), null=True, blank=True)
+    modified = models.DateTimeField(_('modified'), null=True, blank=True)
+    is_image = models.BooleanField(_('is image'), default=False)
+    is_video = models.BooleanField(_('is video'), default=False)
+    # Lowercase search fields, see ckeditor_uploader.search.
+    search_path = models.CharField(_('search path'), max_length=255, blank=True)
+    name = models.CharField(_('name'), max_length=255, blank=True)
+    extension = models.CharField(_('extension'), max_length=20, blank=True)
+
+    class Meta:
+        ordering = ('path',)
+        indexes = [
+            models.Index(fields=['user_path', 'path']),
+            models.Index(fields=['user_path', 'name']),
+            models.Index(fields=['user_path', 'extension']),
+        ]
+        verbose_name = _('uploaded file')
+        verbose_name_plural = _('uploaded files')
+
+    def __str__(self):
+        return self.path
+
+
+class UploadedFileTrigram(models.Model):
+    """
+    Trigram of the search path of an indexed file, used to find the files
+    containing a substring without scanning every entry.
+    """
+    uploaded_file = models.ForeignKey(UploadedFile, on_delete=models.CASCADE, related_name='trigrams')
+    user_path = models.CharField(_('user path'), max_length=150)
+    trigram = models.CharField(_('trigram'), max_length=3)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user_path', 'trigram']),
+        ]
+        verbose_name = _('uploaded file trigram')
+        verbose_name_plural = _('uploaded file trigrams')
+
+    def __str__(self):
+        return self.trigram
+
+
+class UploadJob(models.Model):
+    """
+    Post-upload processing job queued when CKEDITOR_UPLOAD_ASYNC is enabled.
+    Run by the ``runckeditorjobs`` management command.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, _('pending')),
+        (RUNNING, _('running')),
+        (FAILED, _('failed')),
+    )
+
+    task = models.CharField(_('task'), max_length=50)
+    path = models.CharField(_('path'), max_length=255)
+    user_path = models.CharField(_('user path'), max_length=150)
+    status = models.CharField(_('status'), max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(_('attempts'), default=0)
+    error = models.TextField(_('error'), blank=True)
+    created = models.DateTimeField(_('created'), auto_now_add=True)
+    updated = models.DateTimeField(_('updated'), auto_now=True)
+
+    class Meta:
+        ordering = ('created',)
+        indexes = [
+            models.Index(fields=['status', 'created']),
+            models.Index(fields=['user_path', 'status']),
+        ]
+        verbose_name = _('upload job')
+        verbose_name_plural = _('upload jobs')
+
+    def __str__(self):
+        return '%s %s' % (self.task, self.path)
+
+
+class DeduplicatedUpload(models.Model):
+    """
+    Stored file shared by the uploads of the same content, when
+    CKEDITOR_UPLOAD_DEDUPLICATE is enabled. The file is deleted with its
+    last reference.
+    """
+    content_hash = models.CharField(_('content hash'), max_length=64)
+    # The user path with per user deduplication, empty with global deduplication.
+    scope = models.CharField(_('scope'), max_length=150, blank=True)
+    path = models.CharField(_('path'), max_length=255, db_index=True)
+    # JSON object of the variant paths by width.
+    variants = models.TextField(_('variants'), blank=True)
+    references = models.PositiveIntegerField(_('references'), default=1)
+    created = models.DateTimeField(_('created'), auto_now_add=True)
+
+    class Meta:
+        unique_together = ('content_hash', 'scope')
+        verbose_name = _('deduplicated upload')
+        verbose_name_plural = _('deduplicated uploads')
+
+    def __str__(self):
+        return self.path
+
+    def get_variant_paths(self):
+        return dict((int(width), path) for width, path in json.loads(self.variants or '{}').items())
+
+
+class ChunkedUpload(models.Model):
+    """
+    File uploaded in several requests with the chunked upload views. The
+    received bytes are stored in a temporary file until the upload is finalized.
+    """
+    upload_id = models.CharField(_('upload id'), max_length=32, unique=True)
+    user_path = models.CharField(_('user path'), max_length=150)
+    filename = models.CharField(_('filename'), max_length=255)
+    size = models.BigIntegerField(_('size'))
+    offset = models.BigIntegerField(_('offset'), default=0)
+    created = models.DateTimeField(_('created'), auto_now_add=True)
+    updated = models.DateTimeField(_('updated'), auto_now=True, db_index=True)
+
+    class Meta:
+        verbose_name = _('chunked upload')
+        verbose_name_plural = _('chunked uploads')
+
+    def __str__(self):
+        return self.filename
+
+    @property
+    def is_complete(self):
+        return self.offset >= self.size
+
+
+class UploadReference(models.Model):
+    """
+    Upload embedded in the content of a RichTextUploadingField, when
+    CKEDITOR_UPLOAD_REFERENCES is enabled. Uploads without references can be
+    deleted with the ``deleteckeditororphans`` management command.
+    """
+    path = models.CharField(_('path'), max_length=255, db_index=True)
+    # Label of the model of the object, i.e. blog.article.
+    model = models.CharField(_('model'), max_length=100)
+    object_id = models.CharField(_('object id'), max_length=64)
+    field = models.CharField(_('field'), max_length=100)
+
+    class Meta:
+        unique_together = ('model', 'object_id', 'field', 'path')
+        verbose_name = _('upload reference')
+        verbose_name_plural = _('upload references')
+
+    def __str__(self):
+        return self.path
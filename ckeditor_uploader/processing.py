@@ -0,0 +1,148 @@
+from __future__ import absolute_import
+
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+
+from django.conf import settings
+
+logger = logging.getLogger(getattr(settings, 'CKEDITOR_LOGGER', 'django'))
+
+
+class ProcessingBusy(Exception):
+    """
+    Raised when an image cannot be admitted for processing, because the
+    maximum number of in-flight images or the decoded-pixel budget is reached.
+    """
+    def __init__(self, message, retry_after):
+        super(ProcessingBusy, self).__init__(message)
+        self.retry_after = retry_after
+
+
+class ImageProcessor(object):
+    """
+    Runs the image transforms of an upload process.
+
+    Transforms run in a pool of ``pool_size`` processes, or in the calling
+    thread when ``pool_size`` is 0. Images are admitted while fewer than
+    ``max_in_flight`` images are processed and their decoded pixels fit in
+    ``pixel_budget`` (``None`` means no limit).
+    """
+    def __init__(self, pool_size=0, max_in_flight=None, pixel_budget=None, retry_after=5):
+        self.pool_size = pool_size
+        self.max_in_flight = max_in_flight
+        self.pixel_budget = pixel_budget
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.pixels = 0
+        self.processed = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def is_full(self):
+        """
+        Return True when no image can be admitted, whatever its size.
+        """
+        with self._lock:
+            return self.max_in_flight is not None and self.in_flight >= self.max_in_flight
+
+    def _reserve(self, pixels):
+        with self._lock:
+            if self.max_in_flight is not None and self.in_flight >= self.max_in_flight:
+                reason = 'Too many images are being processed.'
+            elif (self.pixel_budget is not None and self.in_flight and
+                    self.pixels + pixels > self.pixel_budget):
+                # An image larger than the whole budget is admitted alone.
+                reason = 'The image processing budget is exhausted.'
+            else:
+                self.in_flight += 1
+                self.pixels += pixels
+                return
+            self.rejected += 1
+        logger.warning('Image processing rejected: %s' % reason)
+        raise ProcessingBusy(reason, self.retry_after)
+
+    def _release(self, pixels):
+        with self._lock:
+            self.in_flight -= 1
+            self.pixels -= pixels
+            self.processed += 1
+
+    @contextmanager
+    def admit(self, pixels):
+        """
+        Reserve room for processing an image of ``pixels`` decoded pixels,
+        or raise ProcessingBusy.
+        """
+        self._reserve(pixels)
+        try:
+            yield self
+        finally:
+            self._release(pixels)
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.pool_size)
+            return self._pool
+
+    def run(self, func, *args):
+        """
+        Run ``func(*args)`` in the pool and return its result. ``func`` and
+        its arguments must be picklable.
+        """
+        if not self.pool_size:
+            return func(*args)
+        pool = self._get_pool()
+        try:
+            return pool.submit(func, *args).result()
+        except BrokenProcessPool:
+            # A worker died (i.e. killed when out of memory), start a new pool for the next images.
+            with self._lock:
+                if self._pool is pool:
+                    self._pool = None
+            pool.shutdown(wait=False)
+            raise
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'pool_size': self.pool_size,
+                'in_flight': self.in_flight,
+                'max_in_flight': self.max_in_flight,
+                # Admitted images waiting for a worker of the pool.
+                'queue_depth': max(self.in_flight - self.pool_size, 0) if self.pool_size else 0,
+                'pool_utilisation': min(float(self.in_flight) / self.pool_size, 1.0) if self.pool_size else None,
+                'pixels': self.pixels,
+                'pixel_budget': self.pixel_budget,
+                'processed': self.processed,
+                'rejected': self.rejected,
+            }
+
+
+_processor = None
+_processor_options = None
+_processor_lock = threading.Lock()
+
+
+def get_processor():
+    """
+    Return the image processor of the current process, configured by the
+    CKEDITOR_IMAGE_PROCESS_POOL_SIZE, CKEDITOR_IMAGE_MAX_INFLIGHT,
+    CKEDITOR_IMAGE_PIXEL_BUDGET and CKEDITOR_IMAGE_RETRY_AFTER settings.
+    """
+    global _processor, _processor_options
+    options = (
+        getattr(settings, 'CKEDITOR_IMAGE_PROCESS_POOL_SIZE', 0),
+        getattr(settings, 'CKEDITOR_IMAGE_MAX_INFLIGHT', None),
+        getattr(settings, 'CKEDITOR_IMAGE_PIXEL_BUDGET', None),
+        getattr(settings, 'CKEDITOR_IMAGE_RETRY_AFTER', 5),
+    )
+    with _processor_lock:
+        if _processor is None or _processor_options != options:
+            _processor = ImageProcessor(*options)
+            _processor_options = options
+        return _processor
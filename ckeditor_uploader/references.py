@@ -0,0 +1,303 @@
+"""
+References from the content of rich text fields to the uploaded files.
+
+When CKEDITOR_UPLOAD_REFERENCES is enabled, the HTML of the
+RichTextUploadingFields is parsed when their model is saved and the uploads it
+embeds are recorded as UploadReference rows. The ``deleteckeditororphans``
+management command then deletes the uploads which are not referenced anymore.
+"""
+from __future__ import absolute_import
+
+import os
+import posixpath
+import re
+from datetime import timedelta
+from itertools import islice
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from ckeditor_uploader import browse_cache, derivatives, index, utils
+
+try:
+    from django.urls import Resolver404, resolve
+except ImportError:  # Django < 2.0
+    from django.core.urlresolvers import Resolver404, resolve
+
+try:
+    from html.parser import HTMLParser
+    from urllib.parse import unquote, urlsplit
+except ImportError:
+    from HTMLParser import HTMLParser
+    from urllib import unquote
+    from urlparse import urlsplit
+
+
+# Attributes containing URLs, srcset contains a list of them.
+URL_ATTRIBUTES = frozenset(['src', 'href', 'poster', 'data', 'srcset'])
+
+_css_url_re = re.compile(r'''url\(\s*['"]?([^'")]+)''')
+
+
+def is_enabled():
+    """
+    Return the CKEDITOR_UPLOAD_REFERENCES setting. The references must be
+    maintained, or rebuilt, before deleting the orphaned uploads.
+    """
+    return getattr(settings, 'CKEDITOR_UPLOAD_REFERENCES', False)
+
+
+def get_grace_period():
+    """
+    Return the CKEDITOR_ORPHAN_GRACE_PERIOD setting, the number of seconds
+    an upload is kept without references, i.e. while its content is edited.
+    """
+    return getattr(settings, 'CKEDITOR_ORPHAN_GRACE_PERIOD', 24 * 60 * 60)
+
+
+class _URLExtractor(HTMLParser):
+    def __init__(self):
+        HTMLParser.__init__(self, convert_charrefs=True)
+        self.urls = []
+
+    def handle_starttag(self, tag, attrs):
+        for name, value in attrs:
+            if not value:
+                continue
+            if name == 'srcset':
+                self.urls.extend(candidate.split()[0] for candidate in value.split(',') if candidate.strip())
+            elif name in URL_ATTRIBUTES:
+                self.urls.append(value)
+            elif name == 'style':
+                self.urls.extend(_css_url_re.findall(value))
+
+    handle_startendtag = handle_starttag
+
+
+def get_urls(html):
+    """
+    Return the URLs of the links and embedded resources of ``html``.
+    """
+    extractor = _URLExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return [url.strip() for url in extractor.urls]
+
+
+def get_source_path(path):
+    """
+    Return the path of the uploaded image of a thumbnail or variant at
+    ``path``, or ``path`` itself.
+    """
+    name, extension = os.path.splitext(path)
+    if name.endswith('_thumb'):
+        return name[:-len('_thumb')] + extension
+    # Also the variants of widths no longer configured.
+    if utils.is_valid_image_extension(path) and utils.VARIANT_RE.search(name):
+        return utils.VARIANT_RE.sub('', name) + extension
+    return path
+
+
+def _get_upload_url_path():
+    # The storage URL of a file at the root of the upload directory, without its name.
+    url_path = urlsplit(utils.storage.url(posixpath.join(settings.CKEDITOR_UPLOAD_PATH, 'x'))).path
+    return unquote(url_path[:-1])
+
+
+def _get_transformed_path(url_path):
+    try:
+        match = resolve(url_path)
+    except Resolver404:
+        return None
+    if match.url_name != 'ckeditor_transform':
+        return None
+    params = derivatives.unsign(match.kwargs['token'])
+    return params['p'] if params else None
+
+
+def get_referenced_paths(html):
+    """
+    Return the set of the storage paths of the uploads embedded in ``html``,
+    and of the images of the embedded thumbnails, variants and derivatives. URLs are
+    matched on their path, whatever their host.
+    """
+    if not html:
+        return set()
+    upload_url_path = _get_upload_url_path()
+    paths = set()
+    for url in get_urls(str(html)):
+        url_path = unquote(urlsplit(url).path)
+        if url_path.startswith(upload_url_path):
+            relative_path = posixpath.normpath(url_path[len(upload_url_path):])
+            if relative_path.startswith('..') or relative_path == '.':
+                continue
+            path = os.path.join(settings.CKEDITOR_UPLOAD_PATH, relative_path)
+        else:
+            path = _get_transformed_path(url_path)
+            if path is None:
+                continue
+        # The path itself too, in case it is an image named like a thumbnail or variant.
+        paths.update([path, get_source_path(path)])
+    return paths
+
+
+def get_model_label(model):
+    return model._meta.label_lower
+
+
+def get_reference_fields(model):
+    """
+    Return the RichTextUploadingFields of ``model``.
+    """
+    from ckeditor_uploader.fields import RichTextUploadingField
+
+    return [field for field in model._meta.concrete_fields if isinstance(field, RichTextUploadingField)]
+
+
+def update_references(instance, fields=None):
+    """
+    Record the uploads referenced by the RichTextUploadingFields of
+    ``instance``, or only by ``fields``. Deferred fields and compressed values
+    read from the database and not accessed since are unchanged, and skipped.
+    """
+    from ckeditor.compression import CompressedText
+    from ckeditor_uploader.models import UploadReference
+
+    label = get_model_label(instance.__class__)
+    object_id = str(instance.pk)
+    with transaction.atomic():
+        for field in get_reference_fields(instance.__class__):
+            if fields is not None and field.name not in fields:
+                continue
+            if field.attname not in instance.__dict__:
+                continue
+            value = instance.__dict__[field.attname]
+            if isinstance(value, CompressedText) and not value.decompressed:
+                continue
+            paths = get_referenced_paths(value)
+            references = UploadReference.objects.filter(model=label, object_id=object_id, field=field.name)
+            existing = set(references.values_list('path', flat=True))
+            if existing - paths:
+                references.filter(path__in=existing - paths).delete()
+            UploadReference.objects.bulk_create([
+                UploadReference(path=path, model=label, object_id=object_id, field=field.name)
+                for path in sorted(paths - existing)
+            ], ignore_conflicts=True)
+
+
+def delete_references(instance):
+    from ckeditor_uploader.models import UploadReference
+
+    UploadReference.objects.filter(model=get_model_label(instance.__class__), object_id=str(instance.pk)).delete()
+
+
+def _post_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    if is_enabled():
+        update_references(instance, fields=update_fields)
+
+
+def _post_delete(sender, instance, **kwargs):
+    if is_enabled():
+        delete_references(instance)
+
+
+def connect(model):
+    """
+    Maintain the references of the instances of ``model``, called for each
+    model with a RichTextUploadingField.
+    """
+    label = '%s.%s' % (model.__module__, model.__name__)
+    post_save.connect(_post_save, sender=model, dispatch_uid='ckeditor_uploader.references:%s' % label)
+    post_delete.connect(_post_delete, sender=model, dispatch_uid='ckeditor_uploader.references:%s' % label)
+
+
+def rebuild_references(batch_size=500):
+    """
+    Record the references of all the rows of the models with a
+    RichTextUploadingField, ``batch_size`` rows at a time. Needed when
+    enabling CKEDITOR_UPLOAD_REFERENCES on an existing installation. Return
+    the number of rows parsed.
+    """
+    from ckeditor_uploader.models import UploadReference
+
+    count = 0
+    for model in apps.get_models():
+        fields = get_reference_fields(model)
+        if not fields or model._meta.proxy:
+            continue
+        names = [field.name for field in fields]
+        # The references of the model are not lost when the rebuild fails,
+        # orphans could be deleted meanwhile.
+        with transaction.atomic():
+            UploadReference.objects.filter(model=get_model_label(model)).delete()
+            last_pk = None
+            while True:
+                queryset = model._base_manager.order_by('pk').only('pk', *names)
+                if last_pk is not None:
+                    queryset = queryset.filter(pk__gt=last_pk)
+                rows = list(queryset[:batch_size])
+                if not rows:
+                    break
+                for instance in rows:
+                    # Compressed values must be read to be parsed.
+                    for name in names:
+                        getattr(instance, name)
+                    update_references(instance)
+                count += len(rows)
+                last_pk = rows[-1].pk
+    return count
+
+
+def _get_unreferenced(paths):
+    from ckeditor_uploader.models import UploadJob, UploadReference
+
+    kept = set(UploadReference.objects.filter(path__in=paths).values_list('path', flat=True))
+    # The jobs of the uploads still processed write their thumbnail and variants.
+    kept.update(UploadJob.objects.filter(path__in=paths).values_list('path', flat=True))
+    return [path for path in paths if path not in kept]
+
+
+def find_orphans(grace_period=None, batch_size=500):
+    """
+    Generate the paths of the uploads without references, last modified more
+    than ``grace_period`` seconds ago. The storage is walked lazily and the
+    references of ``batch_size`` files looked up at a time, so the memory used
+    does not depend on the number of uploads. Files of unknown modification
+    time are kept.
+    """
+    from ckeditor_uploader.views import walk_storage
+
+    if grace_period is None:
+        grace_period = get_grace_period()
+    threshold = timezone.now() - timedelta(seconds=grace_period)
+    paths = walk_storage(settings.CKEDITOR_UPLOAD_PATH)
+    while True:
+        batch = list(islice(paths, batch_size))
+        if not batch:
+            return
+        for path in _get_unreferenced(batch):
+            modified = index.get_modified_time(path)
+            if modified is not None and modified <= threshold:
+                yield path
+
+
+def delete_orphans(paths):
+    """
+    Delete the uploads at ``paths`` which are still not referenced, with their
+    thumbnail, variants and derivatives. Return the paths deleted.
+    """
+    from ckeditor_uploader.models import DeduplicatedUpload
+    from ckeditor_uploader.views import delete_upload
+
+    deleted = _get_unreferenced(list(paths))
+    if deleted:
+        # The file is deleted whatever the number of uploads sharing it.
+        DeduplicatedUpload.objects.filter(path__in=deleted).delete()
+    for path in deleted:
+        delete_upload(path)
+    for user_path in set(index.get_user_path_from_path(path) for path in deleted):
+        browse_cache.invalidate(user_path)
+    return deleted
@@ -0,0 +1,115 @@
+"""
+Filename search of the file browser.
+
+A query is made of whitespace separated terms, all of which must match:
+
+- ``ext:pdf`` (or ``ext:jpg,png``) matches the extension of the file,
+- ``term*`` matches the files whose name starts with ``term``,
+- any other term matches the files whose path, relative to the user
+  directory, contains it.
+
+With CKEDITOR_UPLOAD_INDEX, the terms are looked up in the upload index:
+names and extensions are indexed columns and substrings are found with a
+trigram table, so the search does not scan every file.
+"""
+from __future__ import absolute_import
+
+import os
+
+from django.conf import settings
+from django.db.models import Count
+
+from ckeditor_uploader.models import UploadedFileTrigram
+
+EXTENSION_PREFIX = 'ext:'
+
+
+class Query(object):
+    def __init__(self, terms=(), prefixes=(), extensions=()):
+        self.terms = list(terms)
+        self.prefixes = list(prefixes)
+        self.extensions = list(extensions)
+
+    def __bool__(self):
+        return bool(self.terms or self.prefixes or self.extensions)
+
+    __nonzero__ = __bool__
+
+
+def parse_query(query):
+    """
+    Return the Query of a search string.
+    """
+    parsed = Query()
+    for token in (query or '').lower().split():
+        if token.startswith(EXTENSION_PREFIX):
+            parsed.extensions.extend(ext.lstrip('.') for ext in token[len(EXTENSION_PREFIX):].split(',') if ext)
+        elif token.endswith('*'):
+            if token.rstrip('*'):
+                parsed.prefixes.append(token.rstrip('*'))
+        else:
+            parsed.terms.append(token)
+    return parsed
+
+
+def get_trigrams(text):
+    return set(text[i:i + 3] for i in range(len(text) - 2))
+
+
+def get_search_fields(path, user_path):
+    """
+    Return the search path, name and extension of the file at ``path``.
+    """
+    user_directory = os.path.join(settings.CKEDITOR_UPLOAD_PATH, user_path)
+    search_path = os.path.relpath(path, user_directory).replace('\\', '/').lower()
+    name = os.path.basename(search_path)
+    return search_path, name, os.path.splitext(name)[1][1:]
+
+
+def matches(path, query, user_path=''):
+    """
+    Return True when the file at ``path`` matches ``query``, without the index.
+    """
+    if not isinstance(query, Query):
+        query = parse_query(query)
+    search_path, name, extension = get_search_fields(path, user_path)
+    return (
+        (not query.extensions or extension in query.extensions) and
+        all(name.startswith(prefix) for prefix in query.prefixes) and
+        all(term in search_path for term in query.terms)
+    )
+
+
+def update_trigrams(entry):
+    """
+    Replace the trigrams of an UploadedFile by those of its search path.
+    """
+    entry.trigrams.all().delete()
+    UploadedFileTrigram.objects.bulk_create([
+        UploadedFileTrigram(uploaded_file=entry, user_path=entry.user_path, trigram=trigram)
+        for trigram in get_trigrams(entry.search_path)
+    ])
+
+
+def filter_files(queryset, query, user_path):
+    """
+    Filter a queryset of UploadedFile of ``user_path`` by ``query``.
+    """
+    if not isinstance(query, Query):
+        query = parse_query(query)
+    if query.extensions:
+        queryset = queryset.filter(extension__in=query.extensions)
+    for prefix in query.prefixes:
+        queryset = queryset.filter(name__startswith=prefix)
+    for term in query.terms:
+        trigrams = get_trigrams(term)
+        if trigrams:
+            # Candidates containing every trigram of the term, checked with the substring below.
+            candidates = UploadedFileTrigram.objects.filter(
+                user_path=user_path, trigram__in=trigrams,
+            ).values('uploaded_file').annotate(found=Count('trigram', distinct=True)).filter(
+                found=len(trigrams),
+            ).values('uploaded_file')
+            queryset = queryset.filter(pk__in=candidates)
+        queryset = queryset.filter(search_path__contains=term)
+    return queryset
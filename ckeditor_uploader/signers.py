@@ -0,0 +1,59 @@
+from __future__ import absolute_import
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils.module_loading import import_string
+
+try:
+    from django.urls import reverse
+except ImportError:  # Django < 2.0
+    from django.core.urlresolvers import reverse
+
+
+class BaseUploadSigner(object):
+    """
+    Provides the target of direct uploads, which send the file to the
+    storage without passing through Django.
+    """
+    def __init__(self, storage):
+        self.storage = storage
+
+    def get_upload_target(self, request, path, size, token, expires_in):
+        """
+        Return a dictionary describing the request that stores a file of
+        ``size`` bytes at ``path``: its ``method``, ``url`` and ``headers``
+        (and the ``fields`` of a form upload). The target must expire after
+        ``expires_in`` seconds. ``token`` identifies the upload to the views.
+        """
+        raise NotImplementedError
+
+
+class FileSystemUploadSigner(BaseUploadSigner):
+    """
+    Reference signer for FileSystemStorage. The file is sent with a PUT to
+    the ``ckeditor_direct_upload`` view, which checks the signed token and
+    streams the request body to the storage. It does not require a session,
+    so it can be routed to lightweight workers by the front proxy.
+    """
+    def get_upload_target(self, request, path, size, token, expires_in):
+        return {
+            'method': 'PUT',
+            'url': request.build_absolute_uri(reverse('ckeditor_direct_upload', args=[token])),
+            'headers': {'Content-Type': 'application/octet-stream'},
+        }
+
+
+def get_signer(storage):
+    """
+    Return the signer of the CKEDITOR_UPLOAD_SIGNER setting, or the reference
+    signer for FileSystemStorage. Return None when direct uploads are not
+    supported by the storage.
+    """
+    signer = getattr(settings, 'CKEDITOR_UPLOAD_SIGNER', None)
+    if signer is None:
+        if not isinstance(storage, FileSystemStorage):
+            return None
+        signer = FileSystemUploadSigner
+    if isinstance(signer, str):
+        signer = import_string(signer)
+    return signer(storage)
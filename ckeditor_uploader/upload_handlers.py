@@ -0,0 +1,238 @@
+from __future__ import absolute_import
+
+import hashlib
+import logging
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(getattr(settings, 'CKEDITOR_LOGGER', 'django'))
+
+# Number of bytes buffered to read the image header (format and size) with Pillow.
+HEAD_SIZE = 64 * 2 ** 10
+# Number of bytes needed to recognize the signatures below.
+SIGNATURE_SIZE = 16
+
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'JPEG'),
+    (b'\x89PNG\r\n\x1a\n', 'PNG'),
+    (b'GIF87a', 'GIF'),
+    (b'GIF89a', 'GIF'),
+    (b'BM', 'BMP'),
+    (b'II*\x00', 'TIFF'),
+    (b'MM\x00*', 'TIFF'),
+)
+VIDEO_SIGNATURES = (
+    (b'\x1aE\xdf\xa3', 'WEBM'),
+    (b'OggS', 'OGG'),
+    (b'FLV', 'FLV'),
+    (b'\x00\x00\x01\xba', 'MPEG'),
+    (b'\x00\x00\x01\xb3', 'MPEG'),
+    (b'0&\xb2u\x8ef\xcf\x11', 'ASF'),
+    (b'.RMF', 'RM'),
+)
+
+
+def _sniff_signature(head):
+    for signature, fmt in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return 'image', fmt
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image', 'WEBP'
+    if head[:4] == b'RIFF' and head[8:12] == b'AVI ':
+        return 'video', 'AVI'
+    if head[4:8] == b'ftyp':
+        if head[8:12] in (b'avif', b'avis'):
+            return 'image', 'AVIF'
+        return 'video', 'MP4'
+    for signature, fmt in VIDEO_SIGNATURES:
+        if head.startswith(signature):
+            return 'video', fmt
+    return 'file', None
+
+
+def get_max_size(kind):
+    """
+    Return the CKEDITOR_UPLOAD_MAX_SIZE limit of a kind of file, or None.
+    """
+    max_sizes = getattr(settings, 'CKEDITOR_UPLOAD_MAX_SIZE', None) or {}
+    return max_sizes.get(kind)
+
+
+def get_max_pixels():
+    return getattr(settings, 'CKEDITOR_UPLOAD_MAX_PIXELS', None)
+
+
+def _log_rejection(file_name, message, reason):
+    logger.warning('Upload of %s rejected: %s (%s)' % (file_name, message, reason))
+
+
+class UploadInfo(object):
+    """
+    Facts gathered about an uploaded file while its chunks were received.
+    """
+    def __init__(self):
+        self.size = 0
+        self.kind = None
+        self.format = None
+        self.width = None
+        self.height = None
+        self.content_hash = None
+
+    @property
+    def pixels(self):
+        if self.width is None or self.height is None:
+            return None
+        return self.width * self.height
+
+    @property
+    def is_image(self):
+        """
+        True or False when the header was read by Pillow, None when unknown.
+        """
+        if self.kind != 'image':
+            return False
+        if self.width is None:
+            return None
+        return True
+
+
+class UploadInspectionHandler(FileUploadHandler):
+    """
+    Upload handler sniffing the format, hashing the content and enforcing
+    the size limits of each uploaded file while the request body is parsed.
+
+    Oversized files and decompression bombs stop the upload before the
+    rest of the body is read: ``error`` is then set and the file is missing
+    from ``request.FILES``. Chunks are passed on to the next handler, which
+    stores the file.
+    """
+    def __init__(self, request=None):
+        super(UploadInspectionHandler, self).__init__(request)
+        self.infos = {}
+        self.error = None
+
+    def new_file(self, *args, **kwargs):
+        super(UploadInspectionHandler, self).new_file(*args, **kwargs)
+        self.info = UploadInfo()
+        self._hash = hashlib.sha256()
+        self._head = b''
+        self._header_read = False
+
+    def receive_data_chunk(self, raw_data, start):
+        self._hash.update(raw_data)
+        self.info.size += len(raw_data)
+
+        if not self._header_read:
+            self._head += raw_data[:HEAD_SIZE - len(self._head)]
+            if self.info.kind is None and len(self._head) >= SIGNATURE_SIZE:
+                self.info.kind, self.info.format = _sniff_signature(self._head)
+            if len(self._head) >= HEAD_SIZE:
+                self._read_header()
+
+        if self.info.kind is not None:
+            self._check_size()
+        return raw_data
+
+    def file_complete(self, file_size):
+        if self.info.kind is None:
+            self.info.kind, self.info.format = _sniff_signature(self._head)
+        if not self._header_read:
+            self._read_header()
+        self._check_size()
+        self.info.content_hash = self._hash.hexdigest()
+        self.infos[self.field_name] = self.info
+        # Let the next handler build the uploaded file.
+        return None
+
+    def get_info(self, field_name):
+        return self.infos.get(field_name)
+
+    def _read_header(self):
+        self._header_read = True
+        info = self.info
+        if Image is None or info.kind == 'video':
+            return
+        try:
+            # Only the header is read, the image is not decoded.
+            image = Image.open(BytesIO(self._head))
+        except Image.DecompressionBombError as e:
+            self._reject('Image too large.', e)
+        except Exception:
+            # Not an image, or its header does not fit in HEAD_SIZE.
+            return
+        else:
+            info.kind = 'image'
+            info.format = image.format
+            info.width, info.height = image.size
+        finally:
+            self._head = b''
+
+        max_pixels = get_max_pixels()
+        if max_pixels and info.pixels > max_pixels:
+            self._reject('Image too large.', '%d pixels' % info.pixels)
+
+    def _check_size(self):
+        max_size = get_max_size(self.info.kind)
+        if max_size and self.info.size > max_size:
+            self._reject('File too large.', '%d bytes' % self.info.size)
+
+    def _reject(self, message, reason):
+        _log_rejection(self.file_name, message, reason)
+        self.error = message
+        # Keep the connection, so that the client receives the error response.
+        raise StopUpload(connection_reset=False)
+
+
+def inspect_file(file_object, file_name, field_name='upload'):
+    """
+    Inspect a file received by other means than a multipart request body,
+    i.e. assembled from chunks. Return the UploadInfo of the file and the
+    error message when it is rejected.
+    """
+    handler = UploadInspectionHandler()
+    handler.new_file(field_name, file_name, None, None)
+    start = 0
+    try:
+        for chunk in iter(lambda: file_object.read(handler.chunk_size), b''):
+            handler.receive_data_chunk(chunk, start)
+            start += len(chunk)
+        handler.file_complete(start)
+    except StopUpload:
+        return None, handler.error
+    return handler.get_info(field_name), None
+
+
+def read_image_size(info, file_object, file_name):
+    """
+    Read the size of an image whose header did not fit in HEAD_SIZE, i.e.
+    after large metadata, from the whole ``file_object`` and check it against
+    CKEDITOR_UPLOAD_MAX_PIXELS. Return the error message when it is rejected.
+    """
+    if Image is None or info is None or info.kind == 'video' or info.width is not None:
+        return None
+    try:
+        image = Image.open(file_object)
+    except Image.DecompressionBombError as e:
+        _log_rejection(file_name, 'Image too large.', e)
+        return 'Image too large.'
+    except Exception:
+        return None
+    else:
+        info.kind = 'image'
+        info.format = image.format
+        info.width, info.height = image.size
+    finally:
+        file_object.seek(0)
+
+    max_pixels = get_max_pixels()
+    if max_pixels and info.pixels > max_pixels:
+        _log_rejection(file_name, 'Image too large.', '%d pixels' % info.pixels)
+        return 'Image too large.'
+    return None
@@ -10,6 +10,19 @@ urlpatterns = [
     re_path(r'^upload/', staff_member_required(views.upload), name='ckeditor_upload'),
     re_path(r'^browse/', never_cache(staff_member_required(views.browse)), name='ckeditor_browse'),
     re_path(r'^delete/', staff_member_required(views.delete), name='ckeditor_delete'),
-    re_path(r'^browseAllFiles/', never_cache(staff_member_required(views.browseAllFiles)), name='ckeditor_browseAllFiles'),
+    re_path(r'^browseAllFiles/', never_cache(staff_member_required(views.browseAllFiles)),
+            name='ckeditor_browseAllFiles'),
+    re_path(r'^browseJson/', never_cache(staff_member_required(views.browse_json)), name='ckeditor_browse_json'),
     re_path(r'^browseImages/', never_cache(staff_member_required(views.browseImages)), name='ckeditor_browseImages'),
+    re_path(r'^chunked/init/', staff_member_required(views.chunked_init), name='ckeditor_chunked_init'),
+    re_path(r'^chunked/(?P<upload_id>[0-9a-f]{32})/finalize/', staff_member_required(views.chunked_finalize),
+            name='ckeditor_chunked_finalize'),
+    re_path(r'^chunked/(?P<upload_id>[0-9a-f]{32})/', staff_member_required(views.chunked_upload),
+            name='ckeditor_chunked_upload'),
+    re_path(r'^direct/sign/', staff_member_required(views.direct_sign), name='ckeditor_direct_sign'),
+    re_path(r'^direct/confirm/', staff_member_required(views.direct_confirm), name='ckeditor_direct_confirm'),
+    re_path(r'^direct/(?P<token>[\w:-]+)/', views.direct_upload, name='ckeditor_direct_upload'),
+    re_path(r'^transform/(?P<token>[\w:-]+)/', views.transform, name='ckeditor_transform'),
+    re_path(r'^processingStats/', never_cache(staff_member_required(views.processing_stats)),
+            name='ckeditor_processing_stats'),
 ]
@@ -53,9 +53,22 @@ ckeditor_icons = [
 ]
 CKEDITOR_FILEICONS = override_icons + ckeditor_icons
 
-IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif'}
+# Thumbnail shown by the browse views while an uploaded image is processed (CKEDITOR_UPLOAD_ASYNC).
+PENDING_THUMBNAIL = getattr(
+    settings, 'CKEDITOR_PENDING_THUMBNAIL',
+    '{0}/ckeditor/skins/moono-lisa/images/spinner.gif'.format(
+        getattr(settings, 'CKEDITOR_FILEICONS_PATH', '/static/ckeditor')
+    )
+)
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.avif'}
 VIDEO_EXTENSIONS = {'.mp4', '.webm', '.avi', '.mov', '.mkv', '.flv', '.vob', '.ogv', '.ogg', '.drc', '.qt', '.wmv',
-                    '.mpg', '.mp2', '.mpeg', '.mpe', '.mpv', '.m2v', '.m4v', '.svi', '.3gp', '.3g2', '.m4p', '.amv', '.rm', '.rmvb'}
+                    '.mpg', '.mp2', '.mpeg', '.mpe', '.mpv', '.m2v', '.m4v', '.svi', '.3gp', '.3g2', '.m4p', '.amv',
+                    '.rm', '.rmvb'}
+
+
+# Suffix of the image variants created for the CKEDITOR_IMAGE_VARIANTS widths.
+VARIANT_RE = re.compile(r'_w(\d+)$')
 
 
 # Allow for a custom storage backend defined in settings.
@@ -99,6 +112,55 @@ def get_thumb_filename(file_name):
     return force_str('{0}_thumb{1}').format(*os.path.splitext(file_name))
 
 
+def get_thumbnail_size():
+    return tuple(getattr(settings, 'CKEDITOR_THUMBNAIL_SIZE', (75, 75)))
+
+
+def get_thumbnail_size_key():
+    """
+    Return the CKEDITOR_THUMBNAIL_SIZE setting as recorded in the upload index.
+    """
+    return '%dx%d' % get_thumbnail_size()
+
+
+def get_variant_widths():
+    """
+    Return the widths of the CKEDITOR_IMAGE_VARIANTS setting, largest first.
+    """
+    return sorted(set(int(width) for width in getattr(settings, 'CKEDITOR_IMAGE_VARIANTS', ())), reverse=True)
+
+
+def get_variant_filename(file_name, width):
+    """
+    Generate the filename of the variant of an image resized to ``width``
+    by adding _w<width> to end of filename before . (if present)
+    """
+    return force_str('{0}_w{1}{2}').format(os.path.splitext(file_name)[0], width, os.path.splitext(file_name)[1])
+
+
+def is_variant_filename(file_name):
+    """
+    Return True when ``file_name`` is the name of a variant for one of the
+    CKEDITOR_IMAGE_VARIANTS widths, so that the images of users named like
+    variants are still listed.
+    """
+    if not is_valid_image_extension(file_name):
+        return False
+    match = VARIANT_RE.search(os.path.splitext(file_name)[0])
+    return match is not None and int(match.group(1)) in get_variant_widths()
+
+
+def find_variant_filenames(file_name):
+    """
+    Return the stored variants of the image ``file_name`` for the
+    CKEDITOR_IMAGE_VARIANTS widths.
+    """
+    # The directory is not listed: slow on remote storages, and it may hold
+    # the user's own files named like variants.
+    candidates = [get_variant_filename(file_name, width) for width in get_variant_widths()]
+    return [candidate for candidate in candidates if storage.exists(candidate)]
+
+
 def get_media_url(path):
     """
     Determine system file's media URL.
@@ -2,20 +2,39 @@ from __future__ import absolute_import, unicode_literals
 
 import inspect
 import os
+import tempfile
+import uuid
 import warnings
-from datetime import datetime
+from datetime import datetime, timedelta
+from io import BytesIO
 
 from django.conf import settings
-from django.http import HttpResponse, JsonResponse
+from django.core import signing
+from django.core.files import File
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, JsonResponse
 from django.shortcuts import render
+from django.utils import timezone
+from django.utils.encoding import force_bytes, force_str
 from django.utils.html import escape
+from django.utils.http import urlencode, urlsafe_base64_decode, urlsafe_base64_encode
 from django.utils.module_loading import import_string
 from django.views import generic
 from django.views.decorators.csrf import csrf_exempt
 
-from ckeditor_uploader import utils
+try:
+    from django.urls import reverse
+except ImportError:  # Django < 2.0
+    from django.core.urlresolvers import reverse
+
+from ckeditor_uploader import (
+    browse_cache, chunked, dedup, derivatives, index, jobs, processing, search, signers, utils, walkers,
+)
 from ckeditor_uploader.backends import registry
 from ckeditor_uploader.forms import SearchForm
+from ckeditor_uploader.models import ChunkedUpload, UploadJob
+from ckeditor_uploader.upload_handlers import (
+    HEAD_SIZE, UploadInspectionHandler, get_max_size, inspect_file, read_image_size,
+)
 from ckeditor_uploader.utils import storage
 
 from .utils import is_valid_image_extension, is_valid_video_extension
@@ -23,6 +42,11 @@ import logging
 
 logger = logging.getLogger(getattr(settings, 'CKEDITOR_LOGGER', 'django'))
 
+BROWSE_MAX_PAGE_SIZE = 1000
+DIRECT_UPLOAD_SALT = 'ckeditor_uploader.direct'
+# Hidden directory of CKEDITOR_UPLOAD_PATH receiving the direct uploads until they are confirmed.
+DIRECT_UPLOAD_DIR = '.direct'
+
 
 def _get_user_path(user):
     user_path = ''
@@ -91,6 +115,113 @@ def get_upload_filename(upload_name, request):
     )
 
 
+def _is_user_file(path, user_path):
+    # The files a user can delete, see FileDeleteView.
+    full_user_path = os.path.join(settings.CKEDITOR_UPLOAD_PATH, user_path) + '/'
+    return full_user_path in path
+
+
+def _upload_error_response(ck_func_num, message):
+    if ck_func_num:
+        return HttpResponse("""
+            <script type='text/javascript'>
+            window.parent.CKEDITOR.tools.callFunction({0}, '', '{1}');
+            </script>""".format(ck_func_num, escape(message)))
+    return JsonResponse({'uploaded': '0', 'error': {'message': message}})
+
+
+def _busy_response(ck_func_num, retry_after):
+    response = _upload_error_response(ck_func_num, 'Server busy, please retry later.')
+    response.status_code = 503
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def _upload_response(ck_func_num, saved_path, variant_paths=None):
+    url = utils.get_media_url(saved_path)
+
+    if ck_func_num:
+        # Respond with Javascript sending ckeditor upload url.
+        return HttpResponse("""
+        <script type='text/javascript'>
+            window.parent.CKEDITOR.tools.callFunction({0}, '{1}');
+        </script>""".format(ck_func_num, url))
+    else:
+        _, filename = os.path.split(saved_path)
+        retdata = {'url': url, 'uploaded': '1',
+                   'fileName': filename}
+        if utils.get_variant_widths():
+            retdata['variants'] = dict(
+                (str(width), utils.get_media_url(path))
+                for width, path in (variant_paths or {}).items()
+            )
+        return JsonResponse(retdata)
+
+
+def store_upload(request, uploaded_file, ck_func_num=None):
+    """
+    Store an uploaded file with the image backend, register it and return
+    the response sent to CKEditor. ``uploaded_file.upload_info`` holds the
+    facts gathered by UploadInspectionHandler.
+    """
+    upload_info = getattr(uploaded_file, 'upload_info', None)
+    # The pixel limit of images whose header was not read while they were received.
+    error = read_image_size(upload_info, uploaded_file, uploaded_file.name)
+    if error:
+        return _upload_error_response(ck_func_num, error)
+
+    backend = registry.get_backend()
+
+    filewrapper = backend(storage, uploaded_file)
+    allow_nonimages = getattr(settings, 'CKEDITOR_ALLOW_NONIMAGE_FILES', True)
+    # Throws an error when an non-image file are uploaded.
+    if not filewrapper.is_image and not allow_nonimages:
+        return HttpResponse("""
+            <script type='text/javascript'>
+            window.parent.CKEDITOR.tools.callFunction({0}, '', 'Invalid file type.');
+            </script>""".format(ck_func_num))
+
+    user_path = _get_user_path(request.user)
+    # Return the file already stored with the same content, without processing it again.
+    content_hash = getattr(upload_info, 'content_hash', None)
+    existing = None
+    if dedup.is_enabled() and content_hash:
+        existing = dedup.find(content_hash, user_path)
+        if existing is not None and _is_user_file(existing.path, user_path):
+            if dedup.add_reference(existing):
+                return _upload_response(ck_func_num, existing.path, existing.get_variant_paths())
+            existing = None
+
+    filepath = get_upload_filename(uploaded_file.name, request)
+
+    # Defer the image processing to a job, the original is served until it is done.
+    process_later = (existing is None and jobs.is_enabled() and hasattr(filewrapper, 'save_original') and
+                     filewrapper.is_image)
+    if existing is not None:
+        # Stored by another user, who alone can delete it: the processed files are copied.
+        saved_path, thumbnail_path, variant_paths = dedup.copy(existing, filepath)
+    else:
+        try:
+            if process_later:
+                saved_path = filewrapper.save_original(filepath)
+            else:
+                saved_path = filewrapper.save_as(filepath)
+        except processing.ProcessingBusy as e:
+            return _busy_response(ck_func_num, e.retry_after)
+        thumbnail_path = getattr(filewrapper, 'thumbnail_path', '')
+        variant_paths = getattr(filewrapper, 'variant_paths', {})
+        if dedup.is_enabled() and content_hash:
+            dedup.add(content_hash, user_path, saved_path, variant_paths)
+
+    if index.is_enabled():
+        index.add_file(saved_path, user_path, thumbnail_path=thumbnail_path, size=index.get_file_size(saved_path))
+    if process_later:
+        jobs.get_job_runner().enqueue('process_image', saved_path, user_path)
+    browse_cache.invalidate(user_path)
+
+    return _upload_response(ck_func_num, saved_path, variant_paths)
+
+
 class ImageUploadView(generic.View):
     http_method_names = ['post']
 
@@ -98,43 +229,375 @@ class ImageUploadView(generic.View):
         """
         Uploads a file and send back its URL to CKEditor.
         """
-        uploaded_file = request.FILES['upload']
-
-        backend = registry.get_backend()
-
         ck_func_num = request.GET.get('CKEditorFuncNum')
         if ck_func_num:
             ck_func_num = escape(ck_func_num)
 
-        filewrapper = backend(storage, uploaded_file)
-        allow_nonimages = getattr(settings, 'CKEDITOR_ALLOW_NONIMAGE_FILES', True)
-        # Throws an error when an non-image file are uploaded.
-        if not filewrapper.is_image and not allow_nonimages:
-            return HttpResponse("""
-                <script type='text/javascript'>
-                window.parent.CKEDITOR.tools.callFunction({0}, '', 'Invalid file type.');
-                </script>""".format(ck_func_num))
+        # Inspect the file while the body is parsed, must be set before accessing request.FILES.
+        inspector = UploadInspectionHandler(request)
+        request.upload_handlers.insert(0, inspector)
+        files = request.FILES
+        if inspector.error:
+            return _upload_error_response(ck_func_num, inspector.error)
 
-        filepath = get_upload_filename(uploaded_file.name, request)
+        uploaded_file = files['upload']
+        uploaded_file.upload_info = inspector.get_info('upload')
 
-        saved_path = filewrapper.save_as(filepath)
+        return store_upload(request, uploaded_file, ck_func_num)
 
-        url = utils.get_media_url(saved_path)
 
-        if ck_func_num:
-            # Respond with Javascript sending ckeditor upload url.
-            return HttpResponse("""
-            <script type='text/javascript'>
-                window.parent.CKEDITOR.tools.callFunction({0}, '{1}');
-            </script>""".format(ck_func_num, url))
+upload = csrf_exempt(ImageUploadView.as_view())
+
+
+def _get_chunked_upload(request, upload_id):
+    return ChunkedUpload.objects.filter(upload_id=upload_id, user_path=_get_user_path(request.user)).first()
+
+
+def _chunked_status(upload):
+    return {'upload_id': upload.upload_id, 'offset': upload.offset, 'size': upload.size}
+
+
+class ChunkedUploadInitView(generic.View):
+    http_method_names = ['post']
+
+    def post(self, request, **kwargs):
+        """
+        Starts a chunked upload of the ``filename`` file of ``size`` bytes.
+        """
+        filename = request.POST.get('filename', '')
+        try:
+            size = int(request.POST.get('size', ''))
+        except ValueError:
+            size = -1
+        if not filename or size < 0:
+            return JsonResponse({'error': 'Invalid filename or size.'}, status=400)
+
+        try:
+            upload = chunked.create(_get_user_path(request.user), os.path.basename(filename), size)
+        except chunked.ChunkError as e:
+            return JsonResponse({'error': str(e)}, status=e.status)
+        return JsonResponse(dict(_chunked_status(upload), chunk_size=chunked.get_chunk_size()))
+
+
+class ChunkedUploadView(generic.View):
+    http_method_names = ['get', 'put']
+
+    def get(self, request, upload_id, **kwargs):
+        """
+        Returns the number of bytes received, to resume an interrupted upload.
+        """
+        upload = _get_chunked_upload(request, upload_id)
+        if upload is None:
+            return JsonResponse({'error': 'Unknown upload.'}, status=404)
+        return JsonResponse(_chunked_status(upload))
+
+    def put(self, request, upload_id, **kwargs):
+        """
+        Appends the request body at the ``offset`` of the upload.
+        """
+        upload = _get_chunked_upload(request, upload_id)
+        if upload is None:
+            return JsonResponse({'error': 'Unknown upload.'}, status=404)
+        try:
+            offset = int(request.GET.get('offset', ''))
+        except ValueError:
+            return JsonResponse({'error': 'Invalid offset.'}, status=400)
+
+        try:
+            upload.offset = chunked.append(upload, offset, request)
+        except chunked.ChunkError as e:
+            upload.refresh_from_db()
+            return JsonResponse(dict(_chunked_status(upload), error=str(e)), status=e.status)
+        return JsonResponse(_chunked_status(upload))
+
+
+class ChunkedUploadFinalizeView(generic.View):
+    http_method_names = ['post']
+
+    def post(self, request, upload_id, **kwargs):
+        """
+        Stores the assembled file like an upload and send back its URL.
+        """
+        upload = _get_chunked_upload(request, upload_id)
+        if upload is None:
+            return JsonResponse({'error': 'Unknown upload.'}, status=404)
+        if not upload.is_complete:
+            return JsonResponse(dict(_chunked_status(upload), error='Upload incomplete.'), status=400)
+
+        path = chunked.get_temp_path(upload)
+        with open(path, 'rb') as fp:
+            upload_info, error = inspect_file(fp, upload.filename)
+        if error:
+            chunked.remove(upload)
+            return _upload_error_response(None, error)
+
+        uploaded_file = chunked.ChunkedUploadedFile(path, upload.filename, upload.size)
+        uploaded_file.upload_info = upload_info
+        try:
+            response = store_upload(request, uploaded_file)
+        finally:
+            uploaded_file.close()
+        # Keep the chunks when the server is busy, the client retries to finalize.
+        if response.status_code != 503:
+            chunked.remove(upload)
+        return response
+
+
+chunked_init = csrf_exempt(ChunkedUploadInitView.as_view())
+chunked_upload = csrf_exempt(ChunkedUploadView.as_view())
+chunked_finalize = csrf_exempt(ChunkedUploadFinalizeView.as_view())
+
+
+def _get_direct_upload_expiry():
+    return getattr(settings, 'CKEDITOR_DIRECT_UPLOAD_EXPIRY', 60 * 60)
+
+
+def _load_direct_token(token):
+    """
+    Return the path, staging path, user path and size signed in a direct
+    upload token, or None when it is invalid or expired.
+    """
+    try:
+        data = signing.loads(token, salt=DIRECT_UPLOAD_SALT, max_age=_get_direct_upload_expiry())
+    except signing.BadSignature:
+        return None
+    return data['p'], data['t'], data['u'], data['s']
+
+
+def _get_direct_staging_path():
+    # Without extension, so that an unconfirmed upload is not served as a page or an image.
+    return os.path.join(settings.CKEDITOR_UPLOAD_PATH, DIRECT_UPLOAD_DIR, uuid.uuid4().hex)
+
+
+def _remove_expired_direct_uploads():
+    """
+    Remove the direct uploads which were not confirmed before their token
+    expired.
+    """
+    staging_dir = os.path.join(settings.CKEDITOR_UPLOAD_PATH, DIRECT_UPLOAD_DIR)
+    threshold = timezone.now() - timedelta(seconds=_get_direct_upload_expiry())
+    try:
+        _, files = storage.listdir(staging_dir)
+    except (NotImplementedError, OSError):
+        return
+    for filename in files:
+        staging_path = os.path.join(staging_dir, filename)
+        modified = index.get_modified_time(staging_path)
+        if modified is not None and modified < threshold:
+            storage.delete(staging_path)
+
+
+class DirectUploadSignView(generic.View):
+    http_method_names = ['post']
+
+    def post(self, request, **kwargs):
+        """
+        Returns the signed target where the browser sends the ``filename``
+        file of ``size`` bytes, without passing through Django.
+        """
+        signer = signers.get_signer(storage)
+        if signer is None:
+            return JsonResponse({'error': 'Direct uploads are not supported by the storage.'}, status=501)
+
+        filename = os.path.basename(request.POST.get('filename', ''))
+        try:
+            size = int(request.POST.get('size', ''))
+        except ValueError:
+            size = -1
+        if not filename or size < 0:
+            return JsonResponse({'error': 'Invalid filename or size.'}, status=400)
+
+        if is_valid_image_extension(filename):
+            kind = 'image'
+        elif is_valid_video_extension(filename):
+            kind = 'video'
         else:
-            _, filename = os.path.split(saved_path)
-            retdata = {'url': url, 'uploaded': '1',
-                       'fileName': filename}
-            return JsonResponse(retdata)
+            kind = 'file'
+        if kind != 'image' and not getattr(settings, 'CKEDITOR_ALLOW_NONIMAGE_FILES', True):
+            return JsonResponse({'error': 'Invalid file type.'}, status=400)
+        max_size = get_max_size(kind)
+        if max_size and size > max_size:
+            return JsonResponse({'error': 'File too large.'}, status=413)
+
+        _remove_expired_direct_uploads()
+        # The file is sent to a staging path, moved to its path once confirmed.
+        path = get_upload_filename(filename, request)
+        staging_path = _get_direct_staging_path()
+        token = signing.dumps({'p': path, 't': staging_path, 'u': _get_user_path(request.user), 's': size},
+                              salt=DIRECT_UPLOAD_SALT)
+        expires_in = _get_direct_upload_expiry()
+        return JsonResponse({
+            'path': path,
+            'token': token,
+            'expires_in': expires_in,
+            'upload': signer.get_upload_target(request, staging_path, size, token, expires_in),
+        })
+
+
+class DirectUploadView(generic.View):
+    http_method_names = ['put']
+
+    def put(self, request, token, **kwargs):
+        """
+        Stores the request body at the staging path signed in ``token``. This
+        is the upload target of FileSystemUploadSigner, the token is the only
+        credential so no session is loaded.
+        """
+        data = _load_direct_token(token)
+        if data is None:
+            return JsonResponse({'error': 'Invalid or expired upload.'}, status=403)
+        _, path, _, size = data
+        try:
+            content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            content_length = 0
+        if content_length > size:
+            return JsonResponse({'error': 'File too large.'}, status=413)
+        if storage.exists(path):
+            return JsonResponse({'error': 'File already uploaded.'}, status=409)
+
+        with tempfile.SpooledTemporaryFile(max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE,
+                                           dir=settings.FILE_UPLOAD_TEMP_DIR) as fp:
+            written = 0
+            for chunk in iter(lambda: request.read(chunked.COPY_BUFFER_SIZE), b''):
+                written += len(chunk)
+                if written > size:
+                    return JsonResponse({'error': 'File too large.'}, status=413)
+                fp.write(chunk)
+            fp.seek(0)
+            saved_path = storage.save(path, File(fp, os.path.basename(path)))
+
+        if saved_path != path:
+            # Another request stored the file concurrently.
+            storage.delete(saved_path)
+            return JsonResponse({'error': 'File already uploaded.'}, status=409)
+        return JsonResponse({'size': written})
+
+
+class DirectUploadConfirmView(generic.View):
+    http_method_names = ['post']
 
+    def post(self, request, **kwargs):
+        """
+        Checks and registers a file sent to the storage with a signed target,
+        and send back its URL. Images are compressed and their thumbnail is
+        created here, their extension may change with the output format.
+        """
+        data = _load_direct_token(request.POST.get('token', ''))
+        if data is None:
+            return JsonResponse({'error': 'Invalid or expired upload.'}, status=403)
+        path, staging_path, user_path, _ = data
+        if user_path != _get_user_path(request.user):
+            return JsonResponse({'error': 'Invalid or expired upload.'}, status=403)
+        if not storage.exists(staging_path):
+            return JsonResponse({'error': 'Unknown upload.'}, status=404)
+
+        # Only the head is read back, the size comes from the storage.
+        with storage.open(staging_path) as fp:
+            head = fp.read(HEAD_SIZE)
+        upload_info, error = inspect_file(BytesIO(head), os.path.basename(path))
+        size = storage.size(staging_path)
+        max_size = get_max_size(upload_info.kind)
+        if not error and max_size and size > max_size:
+            error = 'File too large.'
+        allow_nonimages = getattr(settings, 'CKEDITOR_ALLOW_NONIMAGE_FILES', True)
+        if not error:
+            with storage.open(staging_path) as fp:
+                error = read_image_size(upload_info, fp, os.path.basename(path))
+        if not error and upload_info.kind != 'image' and not allow_nonimages:
+            error = 'Invalid file type.'
+        if error:
+            storage.delete(staging_path)
+            return _upload_error_response(None, error)
 
-upload = csrf_exempt(ImageUploadView.as_view())
+        backend = registry.get_backend()
+        process = upload_info.kind == 'image' and hasattr(backend, 'process_saved')
+        if process:
+            processor = processing.get_processor()
+            if processor.is_full():
+                return _busy_response(None, processor.retry_after)
+
+        with storage.open(staging_path) as fp:
+            saved_path = storage.save(path, File(fp, os.path.basename(path)))
+        storage.delete(staging_path)
+
+        variant_paths = {}
+        thumbnail_path = ''
+        if process:
+            # Read in memory, process_saved() replaces the stored file.
+            with storage.open(saved_path) as fp:
+                filewrapper = backend(storage, BytesIO(fp.read()))
+            try:
+                saved_path = filewrapper.process_saved(saved_path, rename=True)
+            except processing.ProcessingBusy as e:
+                storage.delete(saved_path)
+                return _busy_response(None, e.retry_after)
+            variant_paths = getattr(filewrapper, 'variant_paths', {})
+            thumbnail_path = getattr(filewrapper, 'thumbnail_path', '')
+
+        if index.is_enabled():
+            index.add_file(saved_path, user_path, thumbnail_path=thumbnail_path,
+                           size=index.get_file_size(saved_path))
+        browse_cache.invalidate(user_path)
+        return _upload_response(None, saved_path, variant_paths)
+
+
+direct_sign = csrf_exempt(DirectUploadSignView.as_view())
+direct_upload = csrf_exempt(DirectUploadView.as_view())
+direct_confirm = csrf_exempt(DirectUploadConfirmView.as_view())
+
+
+def processing_stats(request):
+    """
+    Return the image processing statistics of the current process as JSON.
+    """
+    return JsonResponse(processing.get_processor().get_stats())
+
+
+def transform(request, token):
+    """
+    Serve a derivative of an uploaded image for the parameters signed in
+    ``token``, generated on the first request and stored for the next ones.
+    """
+    params = derivatives.unsign(token)
+    if params is None:
+        return JsonResponse({'error': 'Invalid signature.'}, status=403)
+
+    if not storage.exists(params['p']):
+        return JsonResponse({'error': 'Unknown image.'}, status=404)
+    # The source image may be processed again in place, i.e. by a job, its version is part of the ETag.
+    version = derivatives.get_source_version(params['p'])
+    etag = derivatives.get_etag(params, version)
+    if etag in [tag.strip() for tag in request.META.get('HTTP_IF_NONE_MATCH', '').split(',')]:
+        response = HttpResponseNotModified()
+    else:
+        try:
+            derivative_path = derivatives.get_or_create(params, version)
+        except processing.ProcessingBusy as e:
+            response = JsonResponse({'error': 'Server busy, please retry later.'}, status=503)
+            response['Retry-After'] = str(e.retry_after)
+            return response
+        except derivatives.InvalidImage:
+            return JsonResponse({'error': 'Invalid image.'}, status=404)
+        response = FileResponse(storage.open(derivative_path))
+    response['ETag'] = etag
+    # The URL stays the same when the source image changes, caches revalidate it with the ETag.
+    response['Cache-Control'] = 'public, no-cache'
+    return response
+
+
+def walk_storage(path, include_thumbnails=False):
+    """
+    Recursively walks all dirs under path and generates a list of
+    full paths for each file found.
+    The storage is listed by the walker selected for its class.
+    Thumbnails and image variants are skipped unless include_thumbnails is True.
+    """
+    for filename in walkers.get_walker(storage).walk(path):
+        if not include_thumbnails and (os.path.splitext(filename)[0].endswith('_thumb') or
+                                       utils.is_variant_filename(filename)):
+            continue
+        yield filename
 
 
 def get_image_files(user=None, path=''):
@@ -144,10 +607,6 @@ def get_image_files(user=None, path=''):
     """
     # If a user is provided and CKEDITOR_RESTRICT_BY_USER is True,
     # limit images to user specific path
-    STORAGE_DIRECTORIES = 0
-    STORAGE_FILES = 1
-
-    # use the user path
     user_path = _get_user_path(user)
 
     # Security: do not allow user to see all files
@@ -157,25 +616,26 @@ def get_image_files(user=None, path=''):
 
     browse_path = os.path.join(settings.CKEDITOR_UPLOAD_PATH, user_path, path)
 
-    try:
-        storage_list = storage.listdir(browse_path)
-    except NotImplementedError:
-        return
-    except OSError:
-        return
+    for element in walk_storage(browse_path):
+        yield element
 
-    for filename in storage_list[STORAGE_FILES]:
-        if os.path.splitext(filename)[0].endswith('_thumb') or os.path.basename(filename).startswith('.'):
-            continue
-        filename = os.path.join(browse_path, filename)
-        yield filename
 
-    for directory in storage_list[STORAGE_DIRECTORIES]:
-        if directory.startswith('.'):
-            continue
-        directory_path = os.path.join(path, directory)
-        for element in get_image_files(user=user, path=directory_path):
-            yield element
+def delete_upload(path):
+    """
+    Delete the file stored at ``path`` with its thumbnail, variants and
+    derivatives, its upload index entry and its pending jobs.
+    """
+    if jobs.is_enabled():
+        UploadJob.objects.filter(path=path).delete()
+    if is_valid_image_extension(path):
+        storage.delete(utils.get_thumb_filename(path))
+        for variant_path in utils.find_variant_filenames(path):
+            storage.delete(variant_path)
+        derivatives.delete(path)
+
+    storage.delete(path)
+    if index.is_enabled():
+        index.remove_file(path)
 
 
 class FileDeleteView(generic.View):
@@ -186,16 +646,17 @@ class FileDeleteView(generic.View):
             # Check if user is authenticated
             if request.user and request.user.is_authenticated:
                 file_to_be_deleted = request.GET['path']
-                full_user_path = os.path.join(settings.CKEDITOR_UPLOAD_PATH, _get_user_path(request.user)) + '/'
-                logger.info('User want to delete %s with user path %s' % (file_to_be_deleted, full_user_path))
+                user_path = _get_user_path(request.user)
+                logger.info('User want to delete %s with user path %s' % (file_to_be_deleted, user_path))
 
                 # Secutiry: check if the file is owned by user.
-                if full_user_path and full_user_path in file_to_be_deleted:
-                    if is_valid_image_extension(file_to_be_deleted):
-                        thumbnail_filename_path = utils.get_thumb_filename(file_to_be_deleted)
-                        storage.delete(thumbnail_filename_path)
+                if _is_user_file(file_to_be_deleted, user_path):
+                    # Deduplicated files are kept until their last reference is deleted.
+                    if dedup.is_enabled() and not dedup.release(file_to_be_deleted):
+                        return JsonResponse({'success': 1})
 
-                    storage.delete(file_to_be_deleted)
+                    delete_upload(file_to_be_deleted)
+                    browse_cache.invalidate(_get_user_path(request.user))
                     return JsonResponse({'success': 1})
         except Exception as error:
             pass
@@ -206,141 +667,285 @@ class FileDeleteView(generic.View):
 delete = FileDeleteView.as_view()
 
 
-def get_files_browse_urls(user=None):
+def _get_indexed_files(user=None):
+    user_path = _get_user_path(user)
+
+    # Security: do not allow user to see all files
+    if not user_path:
+        logger.error('User path is empty. Impossible to show files')
+        return
+
+    for entry in index.get_user_files(user_path):
+        yield entry.path, entry.thumbnail_path
+
+
+def get_browse_entry(filename, thumbnail_path=None):
     """
-    Recursively walks all dirs under upload dir and generates a list of
-    thumbnail and full image URL's for each file found.
+    Build the template/JSON representation of one file of the browser.
+    ``thumbnail_path`` comes from the upload index, None means unknown.
     """
-    files = []
-    for filename in get_image_files(user=user):
-        src = utils.get_media_url(filename)
-        if getattr(settings, 'CKEDITOR_IMAGE_BACKEND', None):
-            if is_valid_image_extension(src):
-                thumb = utils.get_media_url(utils.get_thumb_filename(filename))
-            else:
-                thumb = utils.get_icon_filename(filename)
-            visible_filename = os.path.split(filename)[1]
-            if len(visible_filename) > 30:
-                visible_filename = visible_filename[0:29] + "..."
-        else:
+    src = utils.get_media_url(filename)
+    if thumbnail_path is not None:
+        # Indexed entry: the thumbnail path is known (empty if none was created).
+        if thumbnail_path:
+            thumb = utils.get_media_url(thumbnail_path)
+        elif is_valid_image_extension(src) or not getattr(settings, 'CKEDITOR_IMAGE_BACKEND', None):
             thumb = src
-            visible_filename = os.path.split(filename)[1]
-
-        temp, extension = os.path.splitext(filename)
-
-        files.append(
-            {
-                'thumb': thumb,
-                'src': src,
-                'path': filename,
-                'is_image': is_valid_image_extension(src),
-                'is_video': is_valid_video_extension(src),
-                'visible_filename': visible_filename,
-                'extension': extension,
-            }
-        )
+        else:
+            thumb = utils.get_icon_filename(filename)
+        visible_filename = os.path.split(filename)[1]
+        if getattr(settings, 'CKEDITOR_IMAGE_BACKEND', None) and len(visible_filename) > 30:
+            visible_filename = visible_filename[0:29] + "..."
+    elif getattr(settings, 'CKEDITOR_IMAGE_BACKEND', None):
+        if is_valid_image_extension(src):
+            thumb = utils.get_media_url(utils.get_thumb_filename(filename))
+        else:
+            thumb = utils.get_icon_filename(filename)
+        visible_filename = os.path.split(filename)[1]
+        if len(visible_filename) > 30:
+            visible_filename = visible_filename[0:29] + "..."
+    else:
+        thumb = src
+        visible_filename = os.path.split(filename)[1]
+
+    if derivatives.is_enabled() and is_valid_image_extension(filename):
+        # Generated at the displayed size on the first request, also when the thumbnail is missing.
+        thumb = derivatives.get_url(filename, *derivatives.get_browse_thumbnail_size())
+
+    temp, extension = os.path.splitext(filename)
+
+    return {
+        'thumb': thumb,
+        'src': src,
+        'path': filename,
+        'is_image': is_valid_image_extension(src),
+        'is_video': is_valid_video_extension(src),
+        'visible_filename': visible_filename,
+        'extension': extension,
+    }
+
 
+def _mark_pending(files, user=None):
+    """
+    Show a placeholder thumbnail for the files whose processing job has not run yet.
+    """
+    if not jobs.is_enabled() or not files:
+        return files
+    pending_paths = jobs.get_job_runner().get_pending_paths(_get_user_path(user))
+    for f in files:
+        if f['path'] in pending_paths:
+            f['thumb'] = utils.PENDING_THUMBNAIL
+            f['pending'] = True
     return files
 
 
-def browse(request):
-    files = get_files_browse_urls(request.user)
-    if request.method == 'POST':
-        form = SearchForm(request.POST)
-        if form.is_valid():
-            query = form.cleaned_data.get('q', '').lower()
-            files = list(filter(lambda d: query in d['path'].lower(), files))
+def get_files_browse_urls(user=None):
+    """
+    Recursively walks all dirs under upload dir and generates a list of
+    thumbnail and full image URL's for each file found.
+
+    When CKEDITOR_UPLOAD_INDEX is enabled, the list is read from the
+    upload index instead of the storage. When CKEDITOR_BROWSE_CACHE_TIMEOUT
+    is set, the list is cached per user path, it is invalidated when the
+    processing job of an upload finishes.
+    """
+    use_cache = browse_cache.is_enabled()
+    if use_cache:
+        user_path = _get_user_path(user)
+        files, version = browse_cache.get_files(user_path)
+        if files is not None:
+            return files
+
+    if index.is_enabled():
+        entries = _get_indexed_files(user=user)
     else:
-        form = SearchForm()
+        entries = ((filename, None) for filename in get_image_files(user=user))
 
-    # Filter by type file
-    if 'type' in request.GET:
-        typeOfFile = request.GET['type']
-        if typeOfFile == "video":
-            files = list(filter(lambda d: d['is_video'], files))
-        if typeOfFile == "image":
-            files = list(filter(lambda d: d['is_image'], files))
+    files = _mark_pending([get_browse_entry(filename, thumbnail_path) for filename, thumbnail_path in entries], user)
+    if use_cache:
+        browse_cache.set_files(user_path, files, version)
+    return files
 
-    show_dirs = getattr(settings, 'CKEDITOR_BROWSE_SHOW_DIRS', False)
-    dir_list = sorted(set(os.path.dirname(f['src'])
-                          for f in files), reverse=True)
 
+def _path_matches(path, query=None, file_type=None):
+    if query and not search.matches(path, query, index.get_user_path_from_path(path)):
+        return False
+    if file_type == 'video' and not is_valid_video_extension(path):
+        return False
+    if file_type == 'image' and not is_valid_image_extension(path):
+        return False
     # Ensures there are no objects created from Thumbs.db files - ran across
     # this problem while developing on Windows
-    if os.name == 'nt':
-        files = [f for f in files if os.path.basename(f['src']) != 'Thumbs.db']
+    if os.name == 'nt' and os.path.basename(path) == 'Thumbs.db':
+        return False
+    return True
 
-    context = {
-        'show_dirs': show_dirs,
-        'dirs': dir_list,
-        'files': files,
-        'form': form
-    }
-    return render(request, 'ckeditor/browse.html', context)
 
+def filter_browse_files(files, query=None, file_type=None):
+    """
+    Apply the search query and the type filter (``image`` or ``video``)
+    to a list of browse entries.
+    """
+    return [f for f in files if _path_matches(f['path'], query, file_type)]
 
-def browseAllFiles(request):
-    files = get_files_browse_urls(request.user)
-    if request.method == 'POST':
-        form = SearchForm(request.POST)
-        if form.is_valid():
-            query = form.cleaned_data.get('q', '').lower()
-            files = list(filter(lambda d: query in d['path'].lower(), files))
-    else:
-        form = SearchForm()
 
-    # Filter by type file
-    if 'type' in request.GET:
-        typeOfFile = request.GET['type']
-        if typeOfFile == "video":
-            files = list(filter(lambda d: d['is_video'], files))
-        if typeOfFile == "image":
-            files = list(filter(lambda d: d['is_image'], files))
+def _encode_cursor(path):
+    return force_str(urlsafe_base64_encode(force_bytes(path)))
 
-    show_dirs = getattr(settings, 'CKEDITOR_BROWSE_SHOW_DIRS', False)
-    dir_list = sorted(set(os.path.dirname(f['src'])
-                          for f in files), reverse=True)
 
-    # Ensures there are no objects created from Thumbs.db files - ran across
-    # this problem while developing on Windows
-    if os.name == 'nt':
-        files = [f for f in files if os.path.basename(f['src']) != 'Thumbs.db']
+def _decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        return force_str(urlsafe_base64_decode(cursor))
+    except (TypeError, UnicodeDecodeError):
+        raise ValueError('Invalid cursor')
 
-    context = {
-        'show_dirs': show_dirs,
-        'dirs': dir_list,
-        'files': files,
-        'form': form
-    }
-    return render(request, 'ckeditor/browseAllFiles.html', context)
 
+def _paginate(items, limit, get_path):
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = _encode_cursor(get_path(items[-1]))
+    return items, next_cursor
 
-def browseImages(request):
-    files = get_files_browse_urls(request.user)
+
+def _get_indexed_queryset(user_path, query=None, file_type=None):
+    queryset = index.get_user_files(user_path)
+    if query:
+        queryset = search.filter_files(queryset, query, user_path)
+    if file_type == 'video':
+        queryset = queryset.filter(is_video=True)
+    elif file_type == 'image':
+        queryset = queryset.filter(is_image=True)
+    return queryset
+
+
+def search_indexed_files(user=None, query=None, file_type=None):
+    """
+    Return the browse entries matching the search query and the type filter,
+    looked up in the upload index.
+    """
+    user_path = _get_user_path(user)
+    # Security: do not allow user to see all files
+    if not user_path:
+        logger.error('User path is empty. Impossible to show files')
+        return []
+    rows = _get_indexed_queryset(user_path, query, file_type).values_list('path', 'thumbnail_path')
+    return _mark_pending([get_browse_entry(filename, thumbnail_path) for filename, thumbnail_path in rows], user)
+
+
+def get_files_browse_page(user=None, query=None, file_type=None, cursor=None, limit=100):
+    """
+    Return one page of browse entries and the cursor of the next page
+    (None on the last page). Entries are ordered by descending path, so
+    the most recent year directories come first.
+    """
+    if index.is_enabled():
+        user_path = _get_user_path(user)
+        # Security: do not allow user to see all files
+        if not user_path:
+            logger.error('User path is empty. Impossible to show files')
+            return [], None
+
+        queryset = _get_indexed_queryset(user_path, query, file_type).order_by('-path')
+        if cursor:
+            queryset = queryset.filter(path__lt=cursor)
+        rows = list(queryset.values_list('path', 'thumbnail_path')[:limit + 1])
+        rows, next_cursor = _paginate(rows, limit, lambda row: row[0])
+        files = [get_browse_entry(filename, thumbnail_path) for filename, thumbnail_path in rows]
+        return _mark_pending(files, user), next_cursor
+
+    if browse_cache.is_enabled():
+        # The cached list holds the entries of every file, no storage call is needed.
+        files = sorted(
+            (f for f in get_files_browse_urls(user=user)
+             if _path_matches(f['path'], query, file_type) and (not cursor or f['path'] < cursor)),
+            key=lambda f: f['path'],
+            reverse=True,
+        )
+        return _paginate(files, limit, lambda f: f['path'])
+
+    paths = sorted(
+        (path for path in get_image_files(user=user)
+         if _path_matches(path, query, file_type) and (not cursor or path < cursor)),
+        reverse=True,
+    )
+    paths, next_cursor = _paginate(paths, limit, lambda path: path)
+    return _mark_pending([get_browse_entry(filename) for filename in paths], user), next_cursor
+
+
+def _render_browse(request, template_name, file_type=None):
+    query = ''
     if request.method == 'POST':
         form = SearchForm(request.POST)
         if form.is_valid():
-            query = form.cleaned_data.get('q', '').lower()
-            files = list(filter(lambda d: query in d['path'].lower(), files))
+            query = form.cleaned_data.get('q', '')
     else:
         form = SearchForm()
 
-    # Filter by type file
-    files = list(filter(lambda d: d['is_image'], files))
+    page_size = getattr(settings, 'CKEDITOR_BROWSE_PAGE_SIZE', None)
+    next_cursor = None
+    if page_size:
+        files, next_cursor = get_files_browse_page(request.user, query, file_type, limit=page_size)
+    elif query and index.is_enabled():
+        files = search_indexed_files(request.user, query, file_type)
+    else:
+        files = filter_browse_files(get_files_browse_urls(request.user), query, file_type)
 
     show_dirs = getattr(settings, 'CKEDITOR_BROWSE_SHOW_DIRS', False)
     dir_list = sorted(set(os.path.dirname(f['src'])
                           for f in files), reverse=True)
 
-    # Ensures there are no objects created from Thumbs.db files - ran across
-    # this problem while developing on Windows
-    if os.name == 'nt':
-        files = [f for f in files if os.path.basename(f['src']) != 'Thumbs.db']
+    browse_json_url = reverse('ckeditor_browse_json')
+    params = dict((key, value) for key, value in (('type', file_type), ('q', query)) if value)
+    if params:
+        browse_json_url += '?' + urlencode(params)
 
     context = {
         'show_dirs': show_dirs,
         'dirs': dir_list,
         'files': files,
-        'form': form
+        'form': form,
+        'next_cursor': next_cursor,
+        'browse_json_url': browse_json_url,
     }
-    return render(request, 'ckeditor/browseImages.html', context)
+    return render(request, template_name, context)
+
+
+def browse(request):
+    return _render_browse(request, 'ckeditor/browse.html', request.GET.get('type'))
+
+
+def browseAllFiles(request):
+    return _render_browse(request, 'ckeditor/browseAllFiles.html', request.GET.get('type'))
+
+
+def browseImages(request):
+    return _render_browse(request, 'ckeditor/browseImages.html', 'image')
+
+
+def browse_json(request):
+    """
+    Return one page of the file browser as JSON, with the cursor of the next page.
+    Accepts the ``type`` and ``q`` filters of the browse views.
+    """
+    page_size = getattr(settings, 'CKEDITOR_BROWSE_PAGE_SIZE', None) or 100
+    try:
+        limit = int(request.GET.get('limit', page_size))
+        cursor = _decode_cursor(request.GET.get('cursor'))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid pagination parameters.'}, status=400)
+    if limit < 1:
+        return JsonResponse({'error': 'Invalid pagination parameters.'}, status=400)
+    limit = min(limit, BROWSE_MAX_PAGE_SIZE)
+
+    files, next_cursor = get_files_browse_page(
+        request.user,
+        query=request.GET.get('q', ''),
+        file_type=request.GET.get('type'),
+        cursor=cursor,
+        limit=limit,
+    )
+    files = [dict(f, name=os.path.basename(f['path'])) for f in files]
+    return JsonResponse({'files': files, 'next': next_cursor})
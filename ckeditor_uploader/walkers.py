@@ -0,0 +1,162 @@
+from __future__ import absolute_import
+
+import os
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+# Walkers selected by storage class, the first class of the storage MRO found here wins.
+DEFAULT_WALKERS = {
+    'django.core.files.storage.FileSystemStorage': 'ckeditor_uploader.walkers.FileSystemWalker',
+    'django.core.files.storage.filesystem.FileSystemStorage': 'ckeditor_uploader.walkers.FileSystemWalker',
+    'storages.backends.s3boto3.S3Boto3Storage': 'ckeditor_uploader.walkers.S3PrefixWalker',
+    'storages.backends.s3.S3Storage': 'ckeditor_uploader.walkers.S3PrefixWalker',
+}
+DEFAULT_WALKER = 'ckeditor_uploader.walkers.ListdirWalker'
+
+
+def _is_hidden(name):
+    return name.startswith('.')
+
+
+class BaseWalker(object):
+    """
+    Lists every file stored under a path of a storage.
+    Hidden files and directories (starting with a dot) are skipped.
+    """
+    def __init__(self, storage):
+        self.storage = storage
+
+    def walk(self, path):
+        """
+        Generate the storage name of each file found under ``path``.
+        """
+        raise NotImplementedError
+
+
+class ListdirWalker(BaseWalker):
+    """
+    Generic walker based on ``storage.listdir``. The directories of one
+    level of the tree are listed concurrently in a bounded thread pool.
+    """
+    def __init__(self, storage, max_workers=None):
+        super(ListdirWalker, self).__init__(storage)
+        if max_workers is None:
+            max_workers = getattr(settings, 'CKEDITOR_WALKER_MAX_WORKERS', 8)
+        self.max_workers = max(int(max_workers), 1)
+
+    def _listdir(self, path):
+        try:
+            return self.storage.listdir(path)
+        except (NotImplementedError, OSError):
+            return [], []
+
+    def walk(self, path):
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            level = [path]
+            while level:
+                next_level = []
+                for directory, (directories, files) in zip(level, executor.map(self._listdir, level)):
+                    for filename in files:
+                        if not _is_hidden(os.path.basename(filename)):
+                            yield os.path.join(directory, filename)
+                    next_level.extend(os.path.join(directory, d) for d in directories if not _is_hidden(d))
+                level = next_level
+
+
+class FileSystemWalker(BaseWalker):
+    """
+    Walker for ``FileSystemStorage`` based on ``os.scandir``, which returns
+    the type of each entry without an additional ``stat`` call.
+    """
+    def walk(self, path):
+        stack = [path]
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(self.storage.path(directory)) as entries:
+                    entries = list(entries)
+            except OSError:
+                continue
+
+            directories = []
+            for entry in entries:
+                if _is_hidden(entry.name):
+                    continue
+                if entry.is_dir():
+                    directories.append(os.path.join(directory, entry.name))
+                else:
+                    yield os.path.join(directory, entry.name)
+            stack.extend(reversed(directories))
+
+
+class PrefixWalker(BaseWalker):
+    """
+    Walker for object storages able to list every key under a prefix in a
+    few paginated calls, instead of one call per directory.
+    """
+    def get_key(self, path):
+        """
+        Return the storage key of ``path``.
+        """
+        return path.replace('\\', '/')
+
+    def list_keys(self, prefix):
+        """
+        Generate every key starting with ``prefix``.
+        """
+        raise NotImplementedError
+
+    def walk(self, path):
+        prefix = self.get_key(path).rstrip('/')
+        if prefix:
+            prefix += '/'
+        for key in self.list_keys(prefix):
+            relative_name = key[len(prefix):]
+            if not relative_name or relative_name.endswith('/'):
+                # Directory markers created by some tools.
+                continue
+            if any(_is_hidden(part) for part in relative_name.split('/')):
+                continue
+            yield os.path.join(path, *relative_name.split('/'))
+
+
+class S3PrefixWalker(PrefixWalker):
+    """
+    Prefix walker for the S3 storages of django-storages.
+    """
+    def get_key(self, path):
+        name = super(S3PrefixWalker, self).get_key(path).strip('/')
+        normalize_name = getattr(self.storage, '_normalize_name', None)
+        if normalize_name is not None:
+            return normalize_name(name)
+        return posixpath.join(getattr(self.storage, 'location', ''), name)
+
+    def list_keys(self, prefix):
+        for obj in self.storage.bucket.objects.filter(Prefix=prefix):
+            yield obj.key
+
+
+def get_walker_class(storage):
+    """
+    Return the walker class for ``storage``: the CKEDITOR_STORAGE_WALKER
+    setting if defined, else the walker registered for the storage class.
+    """
+    walker = getattr(settings, 'CKEDITOR_STORAGE_WALKER', None)
+    if walker is None:
+        walker = DEFAULT_WALKER
+        # storage.__class__ is the wrapped class for lazy storages (DefaultStorage).
+        for cls in storage.__class__.__mro__:
+            name = '%s.%s' % (cls.__module__, cls.__name__)
+            if name in DEFAULT_WALKERS:
+                walker = DEFAULT_WALKERS[name]
+                break
+    if isinstance(walker, str):
+        walker = import_string(walker)
+    return walker
+
+
+def get_walker(storage):
+    return get_walker_class(storage)(storage)
@@ -7,9 +7,8 @@ from ckeditor import widgets
 
 
 class CKEditorUploadingWidget(widgets.CKEditorWidget):
-    def _set_config(self):
-        if 'filebrowserUploadUrl' not in self.config:
-            self.config.setdefault('filebrowserUploadUrl', reverse('ckeditor_upload'))
-        if 'filebrowserBrowseUrl' not in self.config:
-            self.config.setdefault('filebrowserBrowseUrl', reverse('ckeditor_browse'))
-        super(CKEditorUploadingWidget, self)._set_config()
+    def get_config_defaults(self):
+        return (
+            ('filebrowserUploadUrl', reverse('ckeditor_upload')),
+            ('filebrowserBrowseUrl', reverse('ckeditor_browse')),
+        )